@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Local mock of an OpenAI-compatible chat completions API, for load tests.
+
+Serves POST /chat/completions (plain and streamed, with usage blocks) and
+GET /models, with configurable latency distributions and injected 429/500
+errors, so the game engine can be driven at full speed without spending
+API credits. Point the engine at it with:
+
+    LLM_BASE_URL=http://127.0.0.1:8787 MODELS_URL=http://127.0.0.1:8787/models
+
+Usage:
+    python benchmarks/mock_openai_server.py --latency lognormal:0.8,0.4 --error-429 0.02
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MOCK_MODELS = ["mock/fast", "mock/slow", "mock/participant", "mock/interrogator"]
+
+_WORDS = ("well honestly I think that depends on the day but mostly I would say yes because "
+          "it reminds me of something from when I was a kid and we used to go there every summer").split()
+
+
+def parse_distribution(spec):
+    """
+    Parses a latency distribution spec into a sampler returning seconds.
+
+    fixed:S | uniform:LO,HI | normal:MEAN,STDDEV | lognormal:MEDIAN,SIGMA | exponential:MEAN
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "normal" and len(values) == 2:
+        return lambda: max(random.gauss(values[0], values[1]), 0.0)
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(values[0]) if values[0] > 0 else 0.0
+        return lambda: random.lognormvariate(mu, values[1])
+    if kind == "exponential" and len(values) == 1:
+        return lambda: random.expovariate(1.0 / values[0]) if values[0] > 0 else 0.0
+    raise ValueError(f"Invalid latency distribution: {spec!r}")
+
+
+class MockConfig:
+    """Behaviour of the mock server; shared by all request handler threads."""
+
+    def __init__(self, latency="lognormal:0.5,0.5", ttft="lognormal:0.2,0.5", tokens_per_second=80.0,
+                 completion_tokens=40, error_429=0.0, error_500=0.0, retry_after=1.0, seed=None):
+        self.latency = parse_distribution(latency)
+        self.ttft = parse_distribution(ttft)
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.error_429 = error_429
+        self.error_500 = error_500
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.injected_429 = 0
+        self.injected_500 = 0
+
+    def roll(self):
+        """Returns 429, 500 or None for the next request, counting what was injected."""
+        with self.lock:
+            self.requests += 1
+            draw = self.random.random()
+            if draw < self.error_429:
+                self.injected_429 += 1
+                return 429
+            if draw < self.error_429 + self.error_500:
+                self.injected_500 += 1
+                return 500
+            return None
+
+    def stats(self):
+        with self.lock:
+            return {"requests": self.requests, "injected_429": self.injected_429, "injected_500": self.injected_500}
+
+
+def _reply_text(messages, completion_tokens):
+    """
+    Builds a plausible reply. Judgment prompts get a JSON verdict (or a
+    verdict line for the older free-text prompt) and confidence checks
+    (adaptive games) a JSON estimate, so games complete normally.
+    """
+    last = messages[-1]["content"] if messages else ""
+    words = [random.choice(_WORDS) for _ in range(max(completion_tokens - 3, 1))]
+    text = " ".join(words).capitalize() + "."
+    if isinstance(last, list):  # Content parts, e.g. with cache_control markers
+        last = "".join(part.get("text", "") for part in last)
+    if re.search(r'"leaning"', last):
+        return json.dumps({"leaning": random.choice(["human", "ai"]), "confidence": round(random.uniform(0.5, 1.0), 2)})
+    if re.search(r'"verdict"', last):
+        return json.dumps({"reasoning": text, "verdict": random.choice(["Human", "AI"]),
+                           "confidence": round(random.uniform(0.5, 1.0), 2)})
+    if re.search(r"final verdict", last, re.IGNORECASE):
+        text += f"\nFinal Verdict: {random.choice(['Human', 'AI'])}"
+    return text
+
+
+def _usage(messages, text):
+    prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+    completion_tokens = len(text.split())
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, so client connection pooling behaves as in production
+    config = None  # Set by make_server
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            models = [{"id": model_id, "name": f"Mock {model_id.split('/')[1].title()}", "context_length": 32768,
+                       "architecture": {"input_modalities": ["text"], "output_modalities": ["text"]},
+                       "pricing": {"prompt": "0.000001", "completion": "0.000002"},
+                       "supported_parameters": ["max_tokens", "temperature", "response_format", "structured_outputs"]}
+                      for model_id in MOCK_MODELS]
+            self._send_json(200, {"data": models})
+        elif self.path.rstrip("/").endswith("/stats"):
+            self._send_json(200, self.config.stats())
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        config = self.config
+
+        error = config.roll()
+        if error == 429:
+            self._send_json(429, {"error": {"message": "Rate limit exceeded (mock)", "code": 429}},
+                            {"Retry-After": f"{config.retry_after:g}"})
+            return
+        if error == 500:
+            time.sleep(config.latency() / 4)
+            self._send_json(500, {"error": {"message": "Internal error (mock)", "code": 500}})
+            return
+
+        messages = request.get("messages", [])
+        model = request.get("model", "mock/unknown")
+        text = _reply_text(messages, config.completion_tokens)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        if not request.get("stream"):
+            time.sleep(config.latency())
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": _usage(messages, text),
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def event(payload):
+            self._write_chunk(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+
+        def chunk(delta, finish_reason=None):
+            return {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+        try:
+            time.sleep(config.ttft())
+            words = text.split(" ")
+            interval = 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+            for i, word in enumerate(words):
+                if i:
+                    time.sleep(interval)
+                event(chunk({"role": "assistant", "content": word if i == 0 else " " + word}))
+            event(chunk({}, "stop"))
+            if (request.get("stream_options") or {}).get("include_usage"):
+                event({"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                       "choices": [], "usage": _usage(messages, text)})
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def make_server(config, host="127.0.0.1", port=0):
+    """Creates (but does not start) a mock server; port 0 picks a free port. Returns (server, base_url)."""
+    handler = type("ConfiguredMockHandler", (MockHandler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def start_mock_server(config, host="127.0.0.1", port=0):
+    """Starts a mock server on a daemon thread. Returns (server, base_url); call server.shutdown() to stop it."""
+    server, url = make_server(config, host, port)
+    threading.Thread(target=server.serve_forever, name="mock-openai-server", daemon=True).start()
+    return server, url
+
+
+def add_config_arguments(parser):
+    parser.add_argument("--latency", default="lognormal:0.5,0.5",
+                        help="Non-streamed response time distribution (seconds), e.g. fixed:0.5, "
+                             "uniform:0.2,1.5, normal:1,0.3, lognormal:MEDIAN,SIGMA, exponential:MEAN")
+    parser.add_argument("--ttft", default="lognormal:0.2,0.5", help="Time-to-first-token distribution when streaming")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="Streaming speed after the first token")
+    parser.add_argument("--completion-tokens", type=int, default=40, help="Approximate words per reply")
+    parser.add_argument("--error-429", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--error-500", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with injected 429s")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for error injection")
+
+
+def config_from_args(args):
+    return MockConfig(latency=args.latency, ttft=args.ttft, tokens_per_second=args.tokens_per_second,
+                      completion_tokens=args.completion_tokens, error_429=args.error_429,
+                      error_500=args.error_500, retry_after=args.retry_after, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a mock OpenAI-compatible chat completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server, url = make_server(config_from_args(args), args.host, args.port)
+    print(f"Mock OpenAI-compatible server listening on {url}")
+    print(f"  LLM_BASE_URL={url} MODELS_URL={url}/models")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the game engine, run against the local mock server.
+
+Plays N games with C running at a time, either directly on the engine
+(play_turing_test_game_async) or end to end through /api/play, and reports
+games/sec, per-turn latency percentiles, SSE delivery lag (HTTP mode) and
+SQLite write timings (how long checkpoint, event and metrics writes take,
+including waiting on the write lock). Everything runs against a throwaway
+database in a temporary directory; no API credits are spent.
+
+Usage:
+    python benchmarks/run_benchmark.py --mode engine --games 50 --concurrency 10
+    python benchmarks/run_benchmark.py --mode http --games 20 --concurrency 5 --stream --latency fixed:0.2
+    python benchmarks/run_benchmark.py --mode http --url http://127.0.0.1:5001   # an already running server
+"""
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "webapp"))
+
+from mock_openai_server import add_config_arguments, config_from_args, start_mock_server
+
+
+def percentiles(values, scale=1000.0):
+    """Nearest-rank p50/p95/p99/max of `values` (seconds), in milliseconds."""
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def rank(p):
+        return ordered[max(math.ceil(p * len(ordered)) - 1, 0)]
+
+    return {
+        "count": len(ordered),
+        "p50_ms": round(rank(0.50) * scale, 1),
+        "p95_ms": round(rank(0.95) * scale, 1),
+        "p99_ms": round(rank(0.99) * scale, 1),
+        "max_ms": round(ordered[-1] * scale, 1),
+    }
+
+
+class WriteTimer:
+    """Times calls to the engine's SQLite write functions, from whichever thread makes them."""
+
+    def __init__(self):
+        self.durations = {}
+        self._lock = threading.Lock()
+
+    def wrap(self, module, name):
+        original = getattr(module, name)
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self.durations.setdefault(name, []).append(elapsed)
+
+        setattr(module, name, timed)
+
+    def report(self):
+        with self._lock:
+            everything = [d for durations in self.durations.values() for d in durations]
+            report = percentiles(everything) or {"count": 0}
+            report["total_ms"] = round(sum(everything) * 1000, 1)
+            report["by_function"] = {name: percentiles(durations) for name, durations in sorted(self.durations.items())}
+            return report
+
+
+def configure_engine(args, mock_url, workdir):
+    """Points the engine at the mock server and a scratch database, then instruments its writes."""
+    os.environ["LLM_BASE_URL"] = mock_url
+    os.environ["MODELS_URL"] = f"{mock_url}/models"
+    os.environ["MODELS_CACHE_FILE"] = os.path.join(workdir, "models_cache.json")
+    os.environ["OPENROUTER_API_KEY"] = "benchmark"
+    os.environ["LLM_CACHE_MODE"] = "off"
+    os.environ["LLM_CACHE_FILE"] = os.path.join(workdir, "llm_cache.sqlite")
+    # The mock has no rate limits of its own unless 429s are injected; don't let the scheduler be the bottleneck
+    os.environ.setdefault("LLM_MODEL_RATE_LIMIT", "1000")
+    os.environ.setdefault("LLM_MODEL_BURST", "1000")
+    os.environ.setdefault("LLM_PROVIDER_RATE_LIMIT", "1000")
+    os.environ.setdefault("LLM_PROVIDER_BURST", "1000")
+    os.environ.setdefault("GAME_WORKERS", str(args.concurrency))
+    os.environ.setdefault("GAME_QUEUE_SIZE", str(max(args.games, 100)))
+
+    import database
+    database.DB_FILE = os.path.join(workdir, "benchmark.sqlite")
+    database.create_table_if_not_exists()
+
+    import game
+    import jobs
+    import metrics
+    timer = WriteTimer()
+    for module, name in ((game, "start_game_run"), (game, "append_game_turn"), (game, "complete_game_run"),
+                         (game, "set_game_status"), (jobs, "append_game_event"), (metrics, "insert_llm_call")):
+        timer.wrap(module, name)
+    return timer
+
+
+async def run_engine(args):
+    """Plays games directly on the engine. Returns (elapsed, failures, turn latencies)."""
+    from game import play_turing_test_game_async
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    turn_latencies = []
+
+    async def play_one():
+        async with semaphore:
+            last = time.perf_counter()
+            async for message in play_turing_test_game_async(
+                args.participant, args.interrogator, args.num_questions, stream=args.stream, run_by="benchmark"
+            ):
+                if json.loads(message).get("type") == "turn_complete":
+                    now = time.perf_counter()
+                    turn_latencies.append(now - last)
+                    last = now
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(play_one() for _ in range(args.games)), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    failures = [r for r in results if isinstance(r, BaseException)]
+    for failure in failures[:3]:
+        print(f"Game failed: {failure}")
+    return elapsed, len(failures), turn_latencies
+
+
+def _follow_sse(response, on_event):
+    """Parses a text/event-stream response, calling on_event(data_dict, received_at) per event."""
+    data_lines = []
+    for line in response.iter_lines(decode_unicode=True):
+        if line:
+            if line.startswith("data:"):
+                data_lines.append(line[5:].lstrip())
+            continue
+        if data_lines:
+            on_event(json.loads("\n".join(data_lines)), time.time())
+            data_lines = []
+
+
+def run_http(args, base_url):
+    """Plays games through /api/play from C client threads. Returns (elapsed, failures, turn latencies, SSE lags)."""
+    import requests
+
+    lock = threading.Lock()
+    remaining = [args.games]
+    failures = [0]
+    turn_latencies = []
+    lags = []
+
+    def client():
+        session = requests.Session()
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+
+            state = {"last": time.perf_counter(), "failed": True}
+
+            def on_event(event, received_at):
+                if "ts" in event:
+                    with lock:
+                        lags.append(max(received_at - event["ts"], 0.0))
+                if event.get("type") == "turn_complete":
+                    now = time.perf_counter()
+                    with lock:
+                        turn_latencies.append(now - state["last"])
+                    state["last"] = now
+                elif event.get("type") == "game_complete":
+                    state["failed"] = False
+
+            try:
+                with session.get(f"{base_url}/api/play", stream=True, timeout=(5, 600), params={
+                    "participant_model": args.participant,
+                    "interrogator_model": args.interrogator,
+                    "num_questions": args.num_questions,
+                    "stream": str(args.stream).lower(),
+                }) as response:
+                    response.raise_for_status()
+                    _follow_sse(response, on_event)
+            except requests.RequestException as e:
+                print(f"Request failed: {e}")
+            if state["failed"]:
+                with lock:
+                    failures[0] += 1
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(args.concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, failures[0], turn_latencies, lags
+
+
+def start_webapp():
+    """Serves the Flask app on a free local port from a background thread. Returns its base URL."""
+    from werkzeug.serving import make_server
+    from app import app
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)  # No per-request access log lines
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="benchmark-webapp", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def print_report(report):
+    print("\n=== Benchmark results ===")
+    print(f"mode: {report['mode']}  games: {report['games']}  concurrency: {report['concurrency']}  "
+          f"stream: {report['stream']}")
+    print(f"elapsed: {report['elapsed_s']}s  games/sec: {report['games_per_sec']}  failed: {report['failed']}")
+    for label, key in (("turn latency", "turn_latency"), ("SSE delivery lag", "sse_lag"), ("SQLite writes", "db_writes")):
+        stats = report.get(key)
+        if stats and stats.get("count"):
+            line = f"{label}: p50 {stats['p50_ms']}ms  p95 {stats['p95_ms']}ms  p99 {stats['p99_ms']}ms  " \
+                   f"max {stats['max_ms']}ms  (n={stats['count']})"
+            if "total_ms" in stats:
+                line += f"  total {stats['total_ms']}ms"
+            print(line)
+    if report.get("db_writes", {}).get("by_function"):
+        for name, stats in report["db_writes"]["by_function"].items():
+            print(f"  {name}: p50 {stats['p50_ms']}ms  p95 {stats['p95_ms']}ms  max {stats['max_ms']}ms  (n={stats['count']})")
+    if report.get("mock"):
+        print(f"mock server: {report['mock']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Turing test engine against a local mock model server.")
+    parser.add_argument("--mode", choices=("engine", "http"), default="engine",
+                        help="engine: call the game engine directly; http: go through /api/play")
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--num-questions", type=int, default=3)
+    parser.add_argument("--stream", action="store_true", help="Stream completions (measures TTFT and SSE deltas)")
+    parser.add_argument("--participant", default="mock/participant")
+    parser.add_argument("--interrogator", default="mock/interrogator")
+    parser.add_argument("--url", help="HTTP mode: benchmark this running server instead of an in-process one "
+                                      "(it must already point at a mock; no SQLite timings)")
+    parser.add_argument("--json", help="Also write the report to this file")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    if args.url and args.mode != "http":
+        parser.error("--url only applies to --mode http")
+
+    mock_config = mock_server = None
+    if not args.url:
+        mock_config = config_from_args(args)
+        mock_server, mock_url = start_mock_server(mock_config)
+    with tempfile.TemporaryDirectory(prefix="turing-benchmark-") as workdir:
+        timer = None if args.url else configure_engine(args, mock_url, workdir)
+        lags = []
+        if args.mode == "engine":
+            elapsed, failed, turn_latencies = asyncio.run(run_engine(args))
+        else:
+            base_url = args.url or start_webapp()
+            elapsed, failed, turn_latencies, lags = run_http(args, base_url)
+
+        report = {
+            "mode": args.mode,
+            "games": args.games,
+            "concurrency": args.concurrency,
+            "stream": args.stream,
+            "elapsed_s": round(elapsed, 2),
+            "games_per_sec": round((args.games - failed) / elapsed, 3) if elapsed > 0 else 0.0,
+            "failed": failed,
+            "turn_latency": percentiles(turn_latencies),
+            "sse_lag": percentiles(lags),
+            "db_writes": timer.report() if timer else None,
+            "mock": mock_config.stats() if mock_config else None,
+        }
+    if mock_server:
+        mock_server.shutdown()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Context-window management for model calls.
+
+Every turn resends the whole transcript, so prompt tokens grow
+quadratically with the number of questions, and long games can overflow
+small-context models. A ContextManager decides what is actually sent for
+each call, according to CONTEXT_STRATEGY:
+
+    full    - the whole transcript (default)
+    window  - the system prompt, a running summary of earlier turns and the
+              last CONTEXT_WINDOW_MESSAGES messages
+    cache   - the whole transcript, with provider prompt-caching markers on
+              the stable prefix (system prompt and earlier turns), so only
+              the newest message is billed at the full input rate
+
+Whatever the strategy, the prompt is kept within the model's context_length
+(from the model catalogue, less CONTEXT_RESERVE_TOKENS for the reply): the
+oldest turns are folded into the summary until it fits.
+"""
+import asyncio
+import math
+import os
+
+from get_models import get_model
+from prompts import get_summary_prompt
+
+CONTEXT_STRATEGIES = ("full", "window", "cache")
+
+CONTEXT_STRATEGY = os.getenv("CONTEXT_STRATEGY", "full").lower()
+CONTEXT_WINDOW_MESSAGES = int(os.getenv("CONTEXT_WINDOW_MESSAGES", "8"))
+CONTEXT_RESERVE_TOKENS = int(os.getenv("CONTEXT_RESERVE_TOKENS", "1024"))
+# Model used to summarize turns that leave the window; defaults to the model whose context it is.
+CONTEXT_SUMMARY_MODEL = os.getenv("CONTEXT_SUMMARY_MODEL") or None
+
+# Providers that need explicit cache_control breakpoints. Others (OpenAI, DeepSeek, ...) cache
+# stable prefixes automatically, which the 'cache' strategy preserves by never sliding the window.
+CACHE_CONTROL_PROVIDERS = {"anthropic", "google"}
+
+# Rough token estimate without a tokenizer: characters per token, plus per-message overhead
+CHARS_PER_TOKEN = 3.5
+MESSAGE_OVERHEAD_TOKENS = 4
+CONTEXT_SAFETY_RATIO = 0.9
+
+# How each side labels the two roles when summarizing its own transcript
+_SPEAKER_LABELS = {
+    "interrogator": {"assistant": "Interrogator (you)", "user": "Participant"},
+    "human": {"assistant": "You", "user": "Interrogator"},
+}
+
+
+def estimate_tokens(messages):
+    """Approximates the prompt tokens of a message list."""
+    total = 0
+    for message in messages:
+        content = message["content"]
+        if isinstance(content, list):
+            content = "".join(part.get("text", "") for part in content)
+        total += math.ceil(len(content) / CHARS_PER_TOKEN) + MESSAGE_OVERHEAD_TOKENS
+    return total
+
+
+def _with_cache_marker(message):
+    return {
+        "role": message["role"],
+        "content": [{"type": "text", "text": message["content"], "cache_control": {"type": "ephemeral"}}],
+    }
+
+
+class ContextManager:
+    """
+    Prepares one side's transcript for each of its model calls in a game.
+
+    `summarize` is an async callable taking a message list and returning the
+    summary text; it is only called when turns leave the context.
+    """
+
+    def __init__(self, model, role, summarize, strategy=None, window_messages=CONTEXT_WINDOW_MESSAGES):
+        strategy = (strategy or CONTEXT_STRATEGY).lower()
+        if strategy not in CONTEXT_STRATEGIES:
+            raise ValueError(f"Unknown context strategy {strategy!r}; expected one of {', '.join(CONTEXT_STRATEGIES)}")
+        self.model = model
+        self.role = role
+        self.strategy = strategy
+        self.window_messages = max(window_messages - window_messages % 2, 2)
+        self._summarize = summarize
+        self._budget = None
+        self._budget_loaded = False
+        self.summary = None
+        self.summarized = 0  # Number of history messages covered by the summary
+
+    async def budget(self):
+        """Returns the prompt token budget for this model, or None if its context length is unknown."""
+        if not self._budget_loaded:
+            # The catalogue lookup may hit the network on a cold cache, so keep it off the event loop
+            entry = await asyncio.get_running_loop().run_in_executor(None, get_model, self.model)
+            context_length = (entry or {}).get("context_length")
+            if context_length:
+                self._budget = max(int(context_length * CONTEXT_SAFETY_RATIO) - CONTEXT_RESERVE_TOKENS, 256)
+            self._budget_loaded = True
+        return self._budget
+
+    def _system_message(self, system):
+        if not self.summary:
+            return system
+        return {
+            "role": system["role"],
+            "content": f"{system['content']}\n\nSummary of the earlier part of the conversation:\n{self.summary}",
+        }
+
+    async def prepare(self, messages):
+        """Returns the messages to send for the next call, summarizing turns that no longer fit."""
+        system, history = messages[0], messages[1:]
+        if self.strategy == "window":
+            keep = len(history) if len(history) <= self.window_messages else self.window_messages
+        else:
+            keep = len(history)
+        # Never split before the summarized point: those messages are already in the summary
+        keep = min(keep, len(history) - self.summarized) if self.summarized else keep
+
+        budget = await self.budget()
+        if budget is not None:
+            while keep > 1 and estimate_tokens([self._system_message(system)] + history[-keep:]) > budget:
+                keep -= 2 if keep > 2 else 1
+
+        dropped = len(history) - keep
+        if dropped > self.summarized:
+            await self._update_summary(history[self.summarized:dropped])
+            self.summarized = dropped
+
+        prepared = [self._system_message(system)] + history[dropped:]
+        if self.strategy == "cache" and self.model.split("/")[0] in CACHE_CONTROL_PROVIDERS:
+            # Breakpoints on the system prompt and the last message already sent: both are stable prefixes
+            prepared[0] = _with_cache_marker(prepared[0])
+            if len(prepared) > 2:
+                prepared[-2] = _with_cache_marker(prepared[-2])
+        return prepared
+
+    async def _update_summary(self, messages):
+        labels = _SPEAKER_LABELS.get(self.role, {"assistant": "Assistant", "user": "User"})
+        transcript = "\n".join(f"{labels.get(m['role'], m['role'])}: {m['content']}" for m in messages)
+        request = get_summary_prompt(self.summary, transcript)
+        self.summary = await self._summarize([{"role": "user", "content": request}])
@@ -1,84 +1,1863 @@
 
 import sqlite3
 import os
+import json
+import base64
+import hashlib
+import re
+import zlib
+import sys
+import threading
+
+from dotenv import load_dotenv
+
+# Settings below are read at import time, which for the web app and CLIs comes before they load .env
+load_dotenv()
 
 DB_FILE = "turing_test_db.sqlite"
 
+# Reusable connections, one per thread (sqlite3 connections must not be shared across threads)
+_local = threading.local()
+
+# How long a writer waits for a lock held by another connection before failing
+BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+
+# Ratings are on the Elo scale; between full refits (ratings.py) each saved game moves them by an Elo step of RATING_K
+RATING_BASE = 1500.0
+RATING_K = float(os.getenv("RATING_K", "16"))
+
+
 def get_db_connection():
-    """Establishes a connection to the SQLite database."""
+    """
+    Returns this thread's connection to the SQLite database.
+
+    The connection is opened once per thread and reused. It runs in WAL mode,
+    so readers (the battles/leaderboard endpoints) never block the writer
+    saving a game, and waits up to BUSY_TIMEOUT_MS for locks instead of
+    failing with "database is locked". Callers must not close it.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        return conn
     try:
-        conn = sqlite3.connect(DB_FILE)
+        conn = sqlite3.connect(DB_FILE, timeout=BUSY_TIMEOUT_MS / 1000)
         conn.row_factory = sqlite3.Row  # This allows accessing columns by name
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL; fsyncs at checkpoints only
+        conn.execute("PRAGMA foreign_keys=ON")
+        _local.conn = conn
         return conn
     except sqlite3.Error as e:
         print(f"Error connecting to SQLite: {e}")
         return None
 
+
+def close_db_connection():
+    """Closes this thread's connection, if any (e.g. at shutdown or in scripts)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+# --- Schema migrations ---
+# Each migration runs once, in order, inside its own transaction. The schema
+# version is tracked with PRAGMA user_version. Append new migrations to the end.
+
+def _column_names(cursor, table):
+    return {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+
+
+def _migration_1_game_runs(cursor):
+    """Creates game_runs, adding columns missing from databases created before versioning."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS game_runs (
+            run_id TEXT PRIMARY KEY,
+            interrogator_model TEXT,
+            participant_model TEXT,
+            interrogator_system_prompt TEXT,
+            participant_system_prompt TEXT,
+            conversation TEXT, -- Storing JSON as a TEXT field in SQLite
+            judgment TEXT,
+            verdict TEXT,
+            run_by TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    columns = _column_names(cursor, "game_runs")
+    for column in ("participant_model", "participant_system_prompt"):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE game_runs ADD COLUMN {column} TEXT")
+
+
+def _migration_2_leaderboard_aggregates(cursor):
+    """Creates per-model and per-pair leaderboard aggregate tables and backfills them."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS participant_stats (
+            participant_model TEXT PRIMARY KEY,
+            total_games INTEGER NOT NULL DEFAULT 0,
+            fooled_count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS interrogator_stats (
+            interrogator_model TEXT PRIMARY KEY,
+            total_games INTEGER NOT NULL DEFAULT 0,
+            correct_count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS pair_stats (
+            participant_model TEXT NOT NULL,
+            interrogator_model TEXT NOT NULL,
+            total_games INTEGER NOT NULL DEFAULT 0,
+            human_verdicts INTEGER NOT NULL DEFAULT 0,
+            ai_verdicts INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (participant_model, interrogator_model)
+        )
+    """)
+    _rebuild_leaderboard_aggregates(cursor, completed_only=False)
+
+
+def _migration_3_battle_indexes(cursor):
+    """Adds indexes for keyset pagination and filtering of past battles."""
+    # The recent-battles index carries the filter columns so filtered scans can skip rows without a table lookup
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_game_runs_recent
+        ON game_runs (created_at, run_id, participant_model, interrogator_model, verdict)
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_game_runs_participant ON game_runs (participant_model, created_at, run_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_game_runs_interrogator ON game_runs (interrogator_model, created_at, run_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_game_runs_verdict ON game_runs (verdict, created_at, run_id)")
+
+
+def _migration_4_normalized_transcripts(cursor):
+    """Adds deduplicated prompt storage and a per-turn transcript table."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS prompts (
+            prompt_hash TEXT PRIMARY KEY,
+            content BLOB NOT NULL,
+            compressed INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS turns (
+            run_id TEXT NOT NULL REFERENCES game_runs (run_id) ON DELETE CASCADE,
+            seq INTEGER NOT NULL,
+            speaker TEXT NOT NULL, -- 'interrogator' (question) or 'participant' (answer)
+            content BLOB NOT NULL,
+            compressed INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (run_id, seq)
+        ) WITHOUT ROWID
+    """)
+    columns = _column_names(cursor, "game_runs")
+    for column in ("interrogator_prompt_hash", "participant_prompt_hash", "judgment_prompt_hash"):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE game_runs ADD COLUMN {column} TEXT")
+    if "storage_format" not in columns:
+        # NULL: legacy row with the conversation JSON inline; 1: prompts/turns tables
+        cursor.execute("ALTER TABLE game_runs ADD COLUMN storage_format INTEGER")
+
+
+def _migration_5_game_events(cursor):
+    """Adds the per-game event log used to resume SSE streams."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS game_events (
+            run_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            data TEXT NOT NULL, -- JSON event as sent to the browser
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (run_id, seq)
+        ) WITHOUT ROWID
+    """)
+
+
+def _migration_6_game_status(cursor):
+    """Adds run status and checkpoint columns so in-progress games are saved turn by turn."""
+    columns = _column_names(cursor, "game_runs")
+    if "status" not in columns:
+        # Rows saved before checkpointing were only ever written once complete
+        cursor.execute("ALTER TABLE game_runs ADD COLUMN status TEXT NOT NULL DEFAULT 'complete'")
+    if "num_questions" not in columns:
+        cursor.execute("ALTER TABLE game_runs ADD COLUMN num_questions INTEGER")
+    if "error" not in columns:
+        cursor.execute("ALTER TABLE game_runs ADD COLUMN error TEXT")
+    if "updated_at" not in columns:
+        cursor.execute("ALTER TABLE game_runs ADD COLUMN updated_at DATETIME")
+    # Listings only show complete runs, so the battle indexes only need to cover those
+    for name, columns_sql in (
+        ("idx_game_runs_recent", "created_at, run_id, participant_model, interrogator_model, verdict"),
+        ("idx_game_runs_participant", "participant_model, created_at, run_id"),
+        ("idx_game_runs_interrogator", "interrogator_model, created_at, run_id"),
+        ("idx_game_runs_verdict", "verdict, created_at, run_id"),
+    ):
+        cursor.execute(f"DROP INDEX IF EXISTS {name}")
+        cursor.execute(f"CREATE INDEX {name} ON game_runs ({columns_sql}) WHERE status = 'complete'")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_game_runs_status ON game_runs (status) WHERE status != 'complete'")
+
+
+def _migration_7_llm_calls(cursor):
+    """Adds per-call latency, token and cost records."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS llm_calls (
+            id INTEGER PRIMARY KEY,
+            run_id TEXT, -- NULL for calls made outside a game
+            model TEXT NOT NULL,
+            role TEXT, -- 'interrogator', 'human' or 'judgment'
+            turn INTEGER,
+            started_at REAL NOT NULL, -- Unix time
+            latency_ms REAL NOT NULL,
+            ttft_ms REAL, -- Time to first token; streamed calls only
+            prompt_tokens INTEGER,
+            completion_tokens INTEGER,
+            cost_usd REAL,
+            status TEXT NOT NULL -- 'ok', 'error' or 'cached'
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_llm_calls_run ON llm_calls (run_id) WHERE run_id IS NOT NULL")
+    # Ordered by latency within each model, so percentiles are read without a sort
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_llm_calls_model_latency ON llm_calls (model, status, latency_ms)")
+
+
+def _migration_8_adaptive_games(cursor):
+    """Records adaptive-stopping settings and how many questions each game actually used."""
+    columns = _column_names(cursor, "game_runs")
+    for column, column_type in (("turns_used", "INTEGER"), ("min_questions", "INTEGER"),
+                                ("confidence_threshold", "REAL")):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE game_runs ADD COLUMN {column} {column_type}")
+    for table in ("participant_stats", "interrogator_stats"):
+        stats_columns = _column_names(cursor, table)
+        for column in ("turns_used_total", "turns_used_games"):
+            if column not in stats_columns:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+
+    # Backfill: every game so far asked all its questions, so count them
+    cursor.execute(f"""
+        UPDATE game_runs
+        SET turns_used = ({_QUESTIONS_ASKED_SQL})
+        WHERE status = 'complete' AND storage_format = ?
+    """, (STORAGE_FORMAT_NORMALIZED,))
+    legacy = cursor.execute(
+        "SELECT run_id, conversation FROM game_runs WHERE storage_format IS NULL AND conversation IS NOT NULL"
+    ).fetchall()
+    for row in legacy:
+        try:
+            normalized = _normalize_conversation(json.loads(row["conversation"]))
+        except ValueError:
+            continue
+        if normalized is not None:
+            questions = sum(1 for turn in normalized[3] if turn["speaker"] == "interrogator")
+            cursor.execute("UPDATE game_runs SET turns_used = ? WHERE run_id = ?", (questions, row["run_id"]))
+    _rebuild_leaderboard_aggregates(cursor)
+
+
+def _migration_9_judgment_confidence(cursor):
+    """Adds the judgment confidence column and repairs verdicts stored with the wrong casing."""
+    if "confidence" not in _column_names(cursor, "game_runs"):
+        cursor.execute("ALTER TABLE game_runs ADD COLUMN confidence REAL")
+    # Verdicts used to be saved with str.capitalize(), turning "AI" into "Ai", which no statistic counted
+    cursor.execute("UPDATE game_runs SET verdict = 'AI' WHERE lower(verdict) = 'ai' AND verdict != 'AI'")
+    cursor.execute("UPDATE game_runs SET verdict = 'Human' WHERE lower(verdict) = 'human' AND verdict != 'Human'")
+    _rebuild_leaderboard_aggregates(cursor)
+
+
+def _migration_10_judge_panels(cursor):
+    """Adds per-judge verdicts for multi-judge panels and the panel settings of each run."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS judgments (
+            id INTEGER PRIMARY KEY,
+            run_id TEXT NOT NULL REFERENCES game_runs (run_id) ON DELETE CASCADE,
+            judge_model TEXT NOT NULL,
+            sample INTEGER NOT NULL DEFAULT 0, -- Nth judgment by the same model for this run
+            verdict TEXT, -- 'Human', 'AI', 'Unknown', or NULL if the judge failed
+            confidence REAL,
+            reasoning BLOB,
+            compressed INTEGER NOT NULL DEFAULT 0,
+            source TEXT NOT NULL DEFAULT 'game',
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_judgments_run ON judgments (run_id)")
+    columns = _column_names(cursor, "game_runs")
+    if "judge_panel" not in columns:
+        # JSON list of the extra judges; NULL when the interrogator judged alone
+        cursor.execute("ALTER TABLE game_runs ADD COLUMN judge_panel TEXT")
+    if "aggregation" not in columns:
+        cursor.execute("ALTER TABLE game_runs ADD COLUMN aggregation TEXT")
+
+
+def _migration_11_model_ratings(cursor):
+    """Adds Bradley-Terry/Elo ratings per model and role, with bootstrap confidence intervals."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS model_ratings (
+            model TEXT NOT NULL,
+            role TEXT NOT NULL, -- 'participant' or 'interrogator'
+            rating REAL NOT NULL, -- Elo scale
+            games INTEGER NOT NULL DEFAULT 0,
+            ci_low REAL, -- 95% bootstrap interval from the last full fit
+            ci_high REAL,
+            fitted_at DATETIME,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (model, role)
+        ) WITHOUT ROWID
+    """)
+
+
+def _migration_12_search_index(cursor):
+    """Adds the full-text search index over turns and judgments (filled by `python database.py rebuild-search-index`)."""
+    # Turn and judgment texts are stored compressed, so the index gets its own plain-text copy, which doubles
+    # as the FTS5 external content table for snippets; the triggers keep the two in step.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS search_docs (
+            id INTEGER PRIMARY KEY,
+            run_id TEXT NOT NULL REFERENCES game_runs (run_id) ON DELETE CASCADE,
+            source TEXT NOT NULL, -- 'turn' or 'judgment'
+            ref INTEGER NOT NULL, -- turns.seq, judgments.id, or 0 for game_runs.judgment
+            speaker TEXT NOT NULL, -- 'interrogator', 'participant' or 'judge'
+            model TEXT, -- Model that wrote the text
+            content TEXT NOT NULL,
+            UNIQUE (run_id, source, ref)
+        )
+    """)
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+            content, content='search_docs', content_rowid='id', tokenize='porter unicode61'
+        )
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS search_docs_ai AFTER INSERT ON search_docs BEGIN
+            INSERT INTO search_index (rowid, content) VALUES (new.id, new.content);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS search_docs_ad AFTER DELETE ON search_docs BEGIN
+            INSERT INTO search_index (search_index, rowid, content) VALUES ('delete', old.id, old.content);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS search_docs_au AFTER UPDATE OF content ON search_docs BEGIN
+            INSERT INTO search_index (search_index, rowid, content) VALUES ('delete', old.id, old.content);
+            INSERT INTO search_index (rowid, content) VALUES (new.id, new.content);
+        END
+    """)
+
+
+def _migration_13_export_watermark(cursor):
+    """Indexes complete runs by (updated_at, run_id) for incremental exports, backfilling updated_at."""
+    cursor.execute("UPDATE game_runs SET updated_at = created_at WHERE updated_at IS NULL")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_game_runs_updated ON game_runs (updated_at, run_id) WHERE status = 'complete'
+    """)
+
+
+def _create_change_triggers(cursor, scope, table):
+    """Creates the triggers bumping the `scope` change counter whenever `table` changes (see get_change_version)."""
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        condition = ""
+        if table == "game_runs":
+            # Battle listings only show complete runs; checkpoints of running games don't change them
+            row = {"INSERT": "new", "DELETE": "old"}.get(event)
+            condition = (f"WHEN {row}.status = 'complete'" if row
+                         else "WHEN new.status = 'complete' OR old.status = 'complete'")
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_changed AFTER {event} ON {table} {condition}
+            BEGIN
+                UPDATE change_counters SET version = version + 1, changed_at = CURRENT_TIMESTAMP
+                WHERE scope = '{scope}';
+            END
+        """)
+
+
+def _migration_14_change_counters(cursor):
+    """Adds per-scope change counters, bumped by triggers, for HTTP ETags and Last-Modified."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS change_counters (
+            scope TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0,
+            changed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+    """)
+    scopes = {
+        "battles": ("game_runs",),
+        "leaderboard": ("participant_stats", "interrogator_stats", "pair_stats", "model_ratings"),
+    }
+    for scope, tables in scopes.items():
+        cursor.execute("INSERT OR IGNORE INTO change_counters (scope) VALUES (?)", (scope,))
+        for table in tables:
+            _create_change_triggers(cursor, scope, table)
+
+
+def _migration_15_model_latency_stats(cursor):
+    """Adds per-model latency percentiles, refreshed in the background from llm_calls."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS model_latency_stats (
+            model TEXT PRIMARY KEY,
+            calls INTEGER NOT NULL,
+            p50_latency_ms REAL,
+            p95_latency_ms REAL,
+            avg_ttft_ms REAL,
+            total_tokens INTEGER NOT NULL DEFAULT 0,
+            total_cost_usd REAL NOT NULL DEFAULT 0,
+            last_call_id INTEGER, -- Newest llm_calls row included
+            refreshed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+    """)
+
+
+def _migration_16_leaderboard_latency_version(cursor):
+    """Versions the leaderboard by its background latency refresh instead of by every model call."""
+    # Databases migrated before this bumped the leaderboard counter on each llm_calls insert
+    cursor.execute("DROP TRIGGER IF EXISTS llm_calls_insert_changed")
+    _create_change_triggers(cursor, "leaderboard", "model_latency_stats")
+
+
+def _migration_17_battle_call_version(cursor):
+    """Bumps the battles change counter for model calls logged against complete runs (re-judging)."""
+    # Battle versions include the run's newest call; calls made while a game is played leave listings alone
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS llm_calls_complete_run_changed AFTER INSERT ON llm_calls
+        WHEN (SELECT status FROM game_runs WHERE run_id = new.run_id) = 'complete'
+        BEGIN
+            UPDATE change_counters SET version = version + 1, changed_at = CURRENT_TIMESTAMP
+            WHERE scope = 'battles';
+        END
+    """)
+
+
+MIGRATIONS = [
+    _migration_1_game_runs,
+    _migration_2_leaderboard_aggregates,
+    _migration_3_battle_indexes,
+    _migration_4_normalized_transcripts,
+    _migration_5_game_events,
+    _migration_6_game_status,
+    _migration_7_llm_calls,
+    _migration_8_adaptive_games,
+    _migration_9_judgment_confidence,
+    _migration_10_judge_panels,
+    _migration_11_model_ratings,
+    _migration_12_search_index,
+    _migration_13_export_watermark,
+    _migration_14_change_counters,
+    _migration_15_model_latency_stats,
+    _migration_16_leaderboard_latency_version,
+    _migration_17_battle_call_version,
+]
+
+
+def run_migrations():
+    """Applies any pending schema migrations. Returns the resulting schema version."""
+    conn = get_db_connection()
+    if conn is None:
+        return None
+
+    cursor = conn.cursor()
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS, start=1):
+        if number <= version:
+            continue
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            # Re-check under the write lock in case another process just migrated
+            if cursor.execute("PRAGMA user_version").fetchone()[0] >= number:
+                conn.rollback()
+                continue
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+            print(f"Applied database migration {number}: {migration.__doc__}")
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"Error applying database migration {number}: {e}")
+            break
+    return cursor.execute("PRAGMA user_version").fetchone()[0]
+
+
 def create_table_if_not_exists():
-    """Creates the 'game_runs' table in SQLite if it doesn't already exist."""
+    """Brings the database schema up to date (kept under its original name for callers)."""
+    run_migrations()
+
+
+# --- Transcript storage ---
+# Runs are stored normalized (storage_format = 1): system and judgment prompts
+# are deduplicated by content hash into `prompts`, and each question/answer is
+# stored once in `turns`. Texts above COMPRESS_MIN_BYTES are zlib-compressed.
+# Both role-specific transcripts are rebuilt from these on read.
+
+STORAGE_FORMAT_NORMALIZED = 1
+COMPRESS_TEXT = os.getenv("DB_COMPRESS_TEXT", "true").lower() == "true"
+COMPRESS_MIN_BYTES = 512
+
+
+def _pack_text(text):
+    """Returns (value, compressed) for storing `text`, compressing it when that pays off."""
+    data = text.encode("utf-8")
+    if COMPRESS_TEXT and len(data) >= COMPRESS_MIN_BYTES:
+        packed = zlib.compress(data, 6)
+        if len(packed) < len(data):
+            return packed, 1
+    return text, 0
+
+
+def _unpack_text(value, compressed):
+    if compressed:
+        return zlib.decompress(value).decode("utf-8")
+    return value
+
+
+def _store_prompt(cursor, text):
+    """Stores a prompt once per distinct content and returns its hash."""
+    prompt_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    content, compressed = _pack_text(text)
+    cursor.execute(
+        "INSERT OR IGNORE INTO prompts (prompt_hash, content, compressed) VALUES (?, ?, ?)",
+        (prompt_hash, content, compressed),
+    )
+    return prompt_hash
+
+
+def _load_prompts(cursor, hashes):
+    hashes = [h for h in set(hashes) if h]
+    if not hashes:
+        return {}
+    placeholders = ",".join("?" * len(hashes))
+    rows = cursor.execute(
+        f"SELECT prompt_hash, content, compressed FROM prompts WHERE prompt_hash IN ({placeholders})", hashes
+    ).fetchall()
+    return {row["prompt_hash"]: _unpack_text(row["content"], row["compressed"]) for row in rows}
+
+
+def build_conversation(interrogator_prompt, participant_prompt, judgment_prompt, turns):
+    """Rebuilds the interrogator and participant transcripts from prompts and turns."""
+    interrogator_transcript = [{"role": "system", "content": interrogator_prompt}]
+    participant_transcript = [{"role": "system", "content": participant_prompt}]
+    for turn in turns:
+        if turn["speaker"] == "interrogator":
+            interrogator_transcript.append({"role": "assistant", "content": turn["content"]})
+            participant_transcript.append({"role": "user", "content": turn["content"]})
+        else:
+            interrogator_transcript.append({"role": "user", "content": turn["content"]})
+            participant_transcript.append({"role": "assistant", "content": turn["content"]})
+    if judgment_prompt is not None:
+        interrogator_transcript.append({"role": "user", "content": judgment_prompt})
+    return {
+        "interrogator_transcript": interrogator_transcript,
+        "participant_transcript": participant_transcript,
+    }
+
+
+def _normalize_conversation(conversation):
+    """
+    Splits a conversation into (interrogator_prompt, participant_prompt, judgment_prompt, turns).
+
+    Returns None if the conversation does not have the standard game shape,
+    in which case it must be stored as-is.
+    """
+    try:
+        interrogator_transcript = conversation["interrogator_transcript"]
+        participant_transcript = conversation["participant_transcript"]
+        interrogator_prompt = interrogator_transcript[0]["content"]
+        participant_prompt = participant_transcript[0]["content"]
+        turns = [
+            {"speaker": "interrogator" if message["role"] == "user" else "participant", "content": message["content"]}
+            for message in participant_transcript[1:]
+        ]
+        judgment_prompt = None
+        if len(interrogator_transcript) == len(turns) + 2:
+            judgment_prompt = interrogator_transcript[-1]["content"]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+    rebuilt = build_conversation(interrogator_prompt, participant_prompt, judgment_prompt, turns)
+    if rebuilt != {"interrogator_transcript": interrogator_transcript, "participant_transcript": participant_transcript}:
+        return None
+    return interrogator_prompt, participant_prompt, judgment_prompt, turns
+
+
+def _write_normalized_transcript(cursor, run_id, conversation):
+    """
+    Writes a run's prompts and turns. Returns the prompt hashes
+    (interrogator, participant, judgment), or None if the conversation has to
+    be stored inline instead.
+    """
+    normalized = _normalize_conversation(conversation)
+    if normalized is None:
+        return None
+    interrogator_prompt, participant_prompt, judgment_prompt, turns = normalized
+
+    hashes = (
+        _store_prompt(cursor, interrogator_prompt),
+        _store_prompt(cursor, participant_prompt),
+        _store_prompt(cursor, judgment_prompt) if judgment_prompt is not None else None,
+    )
+    cursor.executemany(
+        "INSERT INTO turns (run_id, seq, speaker, content, compressed) VALUES (?, ?, ?, ?, ?)",
+        [(run_id, seq, turn["speaker"], *_pack_text(turn["content"])) for seq, turn in enumerate(turns, start=1)],
+    )
+    for seq, turn in enumerate(turns, start=1):
+        _index_text(cursor, run_id, "turn", seq, turn["speaker"], turn["content"])
+    return hashes
+
+
+def _insert_judgments(cursor, run_id, judgments, source):
+    for j in judgments:
+        # Imported judgments keep their original created_at, which identifies them when merging later imports
+        cursor.execute("""
+            INSERT INTO judgments (run_id, judge_model, sample, verdict, confidence, reasoning, compressed, source,
+                                   created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+        """, (run_id, j["judge_model"], j.get("sample", 0), j.get("verdict"), j.get("confidence"),
+              *_pack_text(j.get("reasoning") or ""), source, j.get("created_at")))
+        _index_text(cursor, run_id, "judgment", cursor.lastrowid, "judge", j.get("reasoning"), j["judge_model"])
+
+
+def _load_judgments(cursor, run_id):
+    rows = cursor.execute("""
+        SELECT judge_model, sample, verdict, confidence, reasoning, compressed, source, created_at
+        FROM judgments
+        WHERE run_id = ?
+        ORDER BY id
+    """, (run_id,)).fetchall()
+    judgments = []
+    for row in rows:
+        judgment = dict(row)
+        judgment["reasoning"] = _unpack_text(judgment["reasoning"], judgment.pop("compressed")) or None
+        judgments.append(judgment)
+    return judgments
+
+
+# Questions asked in a normalized run, correlated on game_runs.run_id
+_QUESTIONS_ASKED_SQL = "SELECT COUNT(*) FROM turns WHERE turns.run_id = game_runs.run_id AND speaker = 'interrogator'"
+
+
+def _count_questions(cursor, run_id):
+    return cursor.execute(
+        "SELECT COUNT(*) FROM turns WHERE run_id = ? AND speaker = 'interrogator'", (run_id,)
+    ).fetchone()[0]
+
+
+def insert_game_run(run_id, interrogator_model, participant_model, interrogator_system_prompt,
+                    participant_system_prompt, conversation, judgment, verdict, run_by):
+    """
+    Inserts a completed game run in normalized form and updates the
+    leaderboard aggregates, all in one transaction. Returns True on success.
+    """
     conn = get_db_connection()
     if conn is None:
-        return
+        return False
 
     try:
         cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS game_runs (
-                run_id TEXT PRIMARY KEY,
-                interrogator_model TEXT,
-                participant_model TEXT,
-                interrogator_system_prompt TEXT,
-                participant_system_prompt TEXT,
-                conversation TEXT, -- Storing JSON as a TEXT field in SQLite
-                judgment TEXT,
-                verdict TEXT,
-                run_by TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Migration: Add missing columns if they don't exist (for existing databases)
-        try:
-            cursor.execute("ALTER TABLE game_runs ADD COLUMN participant_model TEXT")
-        except sqlite3.OperationalError:
-            pass  # Column already exists
-            
+            INSERT INTO game_runs (run_id, interrogator_model, participant_model, judgment, verdict, run_by, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """, (run_id, interrogator_model, participant_model, judgment, verdict, run_by))
+
+        hashes = _write_normalized_transcript(cursor, run_id, conversation)
+        turns_used = None
+        if hashes is not None:
+            turns_used = _count_questions(cursor, run_id)
+            cursor.execute("""
+                UPDATE game_runs
+                SET interrogator_prompt_hash = ?, participant_prompt_hash = ?, judgment_prompt_hash = ?, storage_format = ?,
+                    turns_used = ?
+                WHERE run_id = ?
+            """, (*hashes, STORAGE_FORMAT_NORMALIZED, turns_used, run_id))
+        else:
+            # Non-standard conversation shape: keep the original inline representation
+            cursor.execute("""
+                UPDATE game_runs
+                SET interrogator_system_prompt = ?, participant_system_prompt = ?, conversation = ?
+                WHERE run_id = ?
+            """, (interrogator_system_prompt, participant_system_prompt, json.dumps(conversation), run_id))
+
+        _index_text(cursor, run_id, "judgment", 0, "judge", judgment, interrogator_model)
+
+        # Keep the leaderboard aggregates in step with game_runs, in the same transaction
+        update_leaderboard_aggregates(cursor, participant_model, interrogator_model, verdict, turns_used)
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error saving game run to SQLite: {e}")
+        return False
+
+
+# --- Checkpointing of in-progress games ---
+# A game's row is created with status 'running' when it starts, each question
+# and answer is appended to `turns` as soon as it arrives, and the judgment,
+# verdict and leaderboard update are written when it completes. A run that
+# dies part-way keeps its turns and can be resumed from them.
+
+def start_game_run(run_id, interrogator_model, participant_model, interrogator_system_prompt,
+                   participant_system_prompt, num_questions, run_by, min_questions=None, confidence_threshold=None,
+                   judges=None, aggregation=None):
+    """
+    Creates the checkpoint row for a game that is starting. Returns True on success.
+
+    `num_questions` is the most questions the game may ask; adaptive games
+    also store their `min_questions` and stopping `confidence_threshold`.
+    Games judged by a panel store the extra `judges` and how their verdicts
+    are combined (`aggregation`).
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return False
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("""
+            INSERT INTO game_runs (run_id, interrogator_model, participant_model, run_by, status, num_questions,
+                                   min_questions, confidence_threshold, judge_panel, aggregation,
+                                   interrogator_prompt_hash, participant_prompt_hash, storage_format, updated_at)
+            VALUES (?, ?, ?, ?, 'running', ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """, (run_id, interrogator_model, participant_model, run_by, num_questions, min_questions, confidence_threshold,
+              json.dumps(judges) if judges else None, aggregation if judges else None,
+              _store_prompt(cursor, interrogator_system_prompt), _store_prompt(cursor, participant_system_prompt),
+              STORAGE_FORMAT_NORMALIZED))
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error creating game run checkpoint: {e}")
+        return False
+
+
+def append_game_turn(run_id, seq, speaker, content):
+    """Checkpoints one question ('interrogator') or answer ('participant'). Returns True on success."""
+    conn = get_db_connection()
+    if conn is None:
+        return False
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute(
+            "INSERT OR REPLACE INTO turns (run_id, seq, speaker, content, compressed) VALUES (?, ?, ?, ?, ?)",
+            (run_id, seq, speaker, *_pack_text(content)),
+        )
+        _index_text(cursor, run_id, "turn", seq, speaker, content)
+        cursor.execute("UPDATE game_runs SET updated_at = CURRENT_TIMESTAMP WHERE run_id = ?", (run_id,))
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error checkpointing game turn: {e}")
+        return False
+
+
+def complete_game_run(run_id, judgment_prompt, judgment, verdict, confidence=None, judgments=()):
+    """
+    Records the judgment (reasoning, verdict and the interrogator's stated
+    confidence, if any) of a checkpointed game, marks it complete and updates
+    the leaderboard aggregates, all in one transaction. The number of
+    questions actually asked is stored as turns_used. `judgments` are the
+    individual judges' results ({judge_model, sample, verdict, confidence,
+    reasoning}), stored in the judgments table. Returns True on success.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return False
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        row = cursor.execute(
+            "SELECT participant_model, interrogator_model, status FROM game_runs WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        if row is None or row["status"] == "complete":
+            conn.rollback()
+            print(f"Game run {run_id} is missing or already complete; not saving it again.")
+            return False
+        turns_used = _count_questions(cursor, run_id)
+        cursor.execute("""
+            UPDATE game_runs
+            SET judgment_prompt_hash = ?, judgment = ?, verdict = ?, confidence = ?, turns_used = ?, status = 'complete',
+                error = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE run_id = ?
+        """, (_store_prompt(cursor, judgment_prompt), judgment, verdict, confidence, turns_used, run_id))
+        _insert_judgments(cursor, run_id, judgments, "game")
+        if not judgments:
+            # Without a judges list the interrogator's judgment is only in game_runs
+            _index_text(cursor, run_id, "judgment", 0, "judge", judgment, row["interrogator_model"])
+        update_leaderboard_aggregates(cursor, row["participant_model"], row["interrogator_model"], verdict, turns_used)
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error saving game run to SQLite: {e}")
+        return False
+
+
+def set_game_status(run_id, status, error=None):
+    """Marks a checkpointed, not yet complete game as 'running' or 'failed'. Returns True on success."""
+    conn = get_db_connection()
+    if conn is None:
+        return False
+
+    try:
+        conn.execute("""
+            UPDATE game_runs SET status = ?, error = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE run_id = ? AND status != 'complete'
+        """, (status, error, run_id))
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error updating game status: {e}")
+        return False
+
+
+def load_game_checkpoint(run_id):
+    """
+    Loads what is needed to resume a game: models, system prompts,
+    num_questions, the adaptive-stopping settings (min_questions and
+    confidence_threshold, NULL for fixed-length games), the judge panel
+    (judges and aggregation), run_by, status and the turns played so far.
+    Returns None
+    if the run does not exist or was not checkpointed.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return None
+
+    try:
+        cursor = conn.cursor()
+        row = cursor.execute("""
+            SELECT run_id, interrogator_model, participant_model, run_by, status, error, num_questions,
+                   min_questions, confidence_threshold, judge_panel, aggregation,
+                   interrogator_prompt_hash, participant_prompt_hash, storage_format
+            FROM game_runs
+            WHERE run_id = ?
+        """, (run_id,)).fetchone()
+        if row is None or row["storage_format"] != STORAGE_FORMAT_NORMALIZED or row["num_questions"] is None:
+            return None
+        checkpoint = dict(row)
+        prompts = _load_prompts(cursor, [checkpoint.pop("interrogator_prompt_hash"),
+                                         checkpoint.pop("participant_prompt_hash")])
+        checkpoint["interrogator_system_prompt"] = prompts.get(row["interrogator_prompt_hash"])
+        checkpoint["participant_system_prompt"] = prompts.get(row["participant_prompt_hash"])
+        checkpoint["turns"] = _load_turns(cursor, run_id)
+        checkpoint["judges"] = json.loads(checkpoint.pop("judge_panel") or "[]")
+        del checkpoint["storage_format"]
+        return checkpoint
+    except (sqlite3.Error, ValueError, zlib.error) as e:
+        print(f"Error loading game checkpoint: {e}")
+        return None
+
+
+def get_unfinished_game_runs():
+    """Returns [{run_id, status, updated_at}] for checkpointed games that never completed."""
+    conn = get_db_connection()
+    if conn is None:
+        return []
+
+    try:
+        rows = conn.execute("""
+            SELECT run_id, status, error, updated_at FROM game_runs
+            WHERE status != 'complete'
+            ORDER BY updated_at
+        """).fetchall()
+        return [dict(row) for row in rows]
+    except sqlite3.Error as e:
+        print(f"Error fetching unfinished game runs: {e}")
+        return []
+
+
+def migrate_transcripts(batch_size=500):
+    """
+    Converts legacy rows (conversation JSON and system prompts inline) to the
+    normalized prompts/turns storage, one batch per transaction. Rows whose
+    conversation does not have the standard shape are left untouched.
+    Returns the number of rows converted.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return 0
+
+    converted = 0
+    last_run_id = ""
+    try:
+        cursor = conn.cursor()
+        while True:
+            rows = cursor.execute("""
+                SELECT run_id, conversation FROM game_runs
+                WHERE storage_format IS NULL AND conversation IS NOT NULL AND run_id > ?
+                ORDER BY run_id
+                LIMIT ?
+            """, (last_run_id, batch_size)).fetchall()
+            if not rows:
+                break
+            last_run_id = rows[-1]["run_id"]
+
+            cursor.execute("BEGIN IMMEDIATE")
+            for row in rows:
+                try:
+                    conversation = json.loads(row["conversation"])
+                except ValueError:
+                    continue
+                hashes = _write_normalized_transcript(cursor, row["run_id"], conversation)
+                if hashes is None:
+                    continue
+                cursor.execute("""
+                    UPDATE game_runs
+                    SET interrogator_prompt_hash = ?, participant_prompt_hash = ?, judgment_prompt_hash = ?,
+                        storage_format = ?, conversation = NULL,
+                        interrogator_system_prompt = NULL, participant_system_prompt = NULL
+                    WHERE run_id = ?
+                """, (*hashes, STORAGE_FORMAT_NORMALIZED, row["run_id"]))
+                converted += 1
+            conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error migrating transcripts: {e}")
+    return converted
+
+
+# --- Re-judging stored games ---
+# A stored transcript can be judged again by other models without replaying
+# the conversation; the results are added to `judgments` with source
+# 'rejudge' and leave the run's own verdict (and the leaderboard) alone.
+
+def get_rejudge_run_ids(participant_model=None, interrogator_model=None, verdict=None, created_after=None,
+                        created_before=None, limit=None):
+    """Returns the run_ids of complete runs matching the filters, oldest first."""
+    conn = get_db_connection()
+    if conn is None:
+        return []
+
+    # Literal (not a bound parameter) so the planner can use the partial indexes
+    conditions = ["status = 'complete'"]
+    params = []
+    for condition, value in (("participant_model = ?", participant_model),
+                             ("interrogator_model = ?", interrogator_model), ("verdict = ?", verdict),
+                             ("created_at >= ?", created_after), ("created_at < ?", created_before)):
+        if value:
+            conditions.append(condition)
+            params.append(value)
+    try:
+        rows = conn.execute(f"""
+            SELECT run_id FROM game_runs
+            WHERE {' AND '.join(conditions)}
+            ORDER BY created_at, run_id
+            LIMIT ?
+        """, (*params, limit if limit else -1)).fetchall()
+        return [row["run_id"] for row in rows]
+    except sqlite3.Error as e:
+        print(f"Error selecting runs to re-judge: {e}")
+        return []
+
+
+def load_judgment_transcript(run_id):
+    """
+    Loads what a judge of a complete run sees. Returns {"messages": the
+    interrogator's transcript without the judgment prompt, "verdict": the
+    run's verdict, "judgments": {judge_model: {"total": n, "rejudge": n}}},
+    or None if the run is missing, not complete or not in the standard shape.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return None
+
+    try:
+        cursor = conn.cursor()
+        row = cursor.execute("""
+            SELECT verdict, conversation, interrogator_prompt_hash, storage_format
+            FROM game_runs WHERE run_id = ? AND status = 'complete'
+        """, (run_id,)).fetchone()
+        if row is None:
+            return None
+        if row["storage_format"] == STORAGE_FORMAT_NORMALIZED:
+            prompt = _load_prompts(cursor, [row["interrogator_prompt_hash"]]).get(row["interrogator_prompt_hash"])
+            turns = _load_turns(cursor, run_id)
+        else:
+            normalized = _normalize_conversation(json.loads(row["conversation"])) if row["conversation"] else None
+            if normalized is None:
+                return None
+            prompt, turns = normalized[0], normalized[3]
+        counts = {
+            judgment["judge_model"]: {"total": judgment["total"], "rejudge": judgment["rejudge"]}
+            for judgment in cursor.execute("""
+                SELECT judge_model, COUNT(*) AS total, SUM(source = 'rejudge') AS rejudge
+                FROM judgments WHERE run_id = ? GROUP BY judge_model
+            """, (run_id,))
+        }
+        messages = build_conversation(prompt or "", "", None, turns)["interrogator_transcript"]
+        return {"messages": messages, "verdict": row["verdict"], "judgments": counts}
+    except (sqlite3.Error, ValueError, zlib.error) as e:
+        print(f"Error loading transcript of {run_id} for re-judging: {e}")
+        return None
+
+
+def add_judgments(run_id, judgments, source="rejudge"):
+    """
+    Stores extra judgments ({judge_model, sample, verdict, confidence,
+    reasoning}) for a run without changing its verdict, and bumps its
+    updated_at so incremental exports pick them up. Returns True on success.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return False
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        _insert_judgments(cursor, run_id, judgments, source)
+        cursor.execute("UPDATE game_runs SET updated_at = CURRENT_TIMESTAMP WHERE run_id = ?", (run_id,))
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error saving judgments for {run_id}: {e}")
+        return False
+
+
+def get_judge_stats(source=None):
+    """
+    Per judge model: judgments made, AI verdicts (correct, since the
+    participant is always a model) and agreement with the runs' own
+    verdicts. `source` ('game' or 'rejudge') narrows which judgments count.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return []
+
+    try:
+        rows = conn.execute(f"""
+            SELECT j.judge_model, COUNT(*) AS judgments,
+                   SUM(j.verdict = 'AI') AS ai_verdicts,
+                   SUM(j.verdict = g.verdict) AS agreements
+            FROM judgments j JOIN game_runs g ON g.run_id = j.run_id
+            WHERE j.verdict IS NOT NULL {"AND j.source = ?" if source else ""}
+            GROUP BY j.judge_model
+            ORDER BY ai_verdicts * 1.0 / COUNT(*) DESC
+        """, (source,) if source else ()).fetchall()
+        return [dict(row, accuracy=round(row["ai_verdicts"] / row["judgments"] * 100, 1),
+                     agreement=round(row["agreements"] / row["judgments"] * 100, 1)) for row in rows]
+    except sqlite3.Error as e:
+        print(f"Error fetching judge stats: {e}")
+        return []
+
+
+# --- Full-text search ---
+# Every question, answer and judgment is indexed in `search_index` (FTS5, via
+# the plain-text `search_docs` table) in the same transaction that stores it.
+# Runs saved before the index existed are added by rebuild_search_index().
+
+SEARCH_SNIPPET_TOKENS = 16
+SEARCH_HIGHLIGHT = ("<mark>", "</mark>")
+
+
+def _index_text(cursor, run_id, source, ref, speaker, content, model=None):
+    """Adds or replaces one searchable text; turns take their model from the run."""
+    if not content:
+        return
+    cursor.execute("""
+        INSERT INTO search_docs (run_id, source, ref, speaker, model, content)
+        SELECT run_id, ?, ?, ?,
+               COALESCE(?, CASE ? WHEN 'interrogator' THEN interrogator_model
+                                  WHEN 'participant' THEN participant_model END), ?
+        FROM game_runs WHERE run_id = ?
+        ON CONFLICT (run_id, source, ref) DO UPDATE SET
+            speaker = excluded.speaker, model = excluded.model, content = excluded.content
+    """, (source, ref, speaker, model, speaker, content, run_id))
+
+
+def _index_run(cursor, run):
+    """(Re)indexes the turns and judgments of one game_runs row."""
+    cursor.execute("DELETE FROM search_docs WHERE run_id = ?", (run["run_id"],))
+    if run["storage_format"] == STORAGE_FORMAT_NORMALIZED:
+        turns = _load_turns(cursor, run["run_id"])
+    else:
         try:
-            cursor.execute("ALTER TABLE game_runs ADD COLUMN participant_system_prompt TEXT")
-        except sqlite3.OperationalError:
-            pass  # Column already exists
+            normalized = _normalize_conversation(json.loads(run["conversation"] or "null"))
+        except ValueError:
+            normalized = None
+        turns = normalized[3] if normalized else []
+    for seq, turn in enumerate(turns, start=1):
+        _index_text(cursor, run["run_id"], "turn", seq, turn["speaker"], turn["content"])
+
+    judgments = cursor.execute(
+        "SELECT id, judge_model, reasoning, compressed FROM judgments WHERE run_id = ?", (run["run_id"],)
+    ).fetchall()
+    for judgment in judgments:
+        _index_text(cursor, run["run_id"], "judgment", judgment["id"], "judge",
+                    _unpack_text(judgment["reasoning"], judgment["compressed"]), judgment["judge_model"])
+    if not judgments:
+        _index_text(cursor, run["run_id"], "judgment", 0, "judge", run["judgment"], run["interrogator_model"])
+
+
+def rebuild_search_index(batch_size=500):
+    """
+    Rebuilds the full-text index from all stored runs, one batch per
+    transaction, then merges the index for fast queries. Returns the number
+    of runs indexed.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return 0
+
+    indexed = 0
+    last_run_id = ""
+    try:
+        cursor = conn.cursor()
+        while True:
+            rows = cursor.execute("""
+                SELECT run_id, interrogator_model, judgment, storage_format, conversation FROM game_runs
+                WHERE run_id > ?
+                ORDER BY run_id
+                LIMIT ?
+            """, (last_run_id, batch_size)).fetchall()
+            if not rows:
+                break
+            last_run_id = rows[-1]["run_id"]
+
+            cursor.execute("BEGIN IMMEDIATE")
+            for row in rows:
+                _index_run(cursor, row)
+            conn.commit()
+            indexed += len(rows)
+        conn.execute("INSERT INTO search_index (search_index) VALUES ('optimize')")
         conn.commit()
     except sqlite3.Error as e:
-        print(f"Error creating table: {e}")
+        conn.rollback()
+        print(f"Error rebuilding search index: {e}")
+    return indexed
+
+
+def _fts_query(query):
+    """
+    Turns free text into an FTS5 query matching all of its words: each word
+    is quoted, so punctuation cannot raise syntax errors, and a trailing *
+    is kept as a prefix search. "Double-quoted phrases" are kept together.
+    """
+    terms = []
+    for match in re.finditer(r'"([^"]*)"|(\S+)', query):
+        phrase, word = match.groups()
+        if phrase is not None:
+            if phrase.strip():
+                terms.append(f'"{phrase}"')
+            continue
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def search_transcripts(query, limit=20, offset=0, model=None, participant_model=None, interrogator_model=None,
+                       verdict=None, speaker=None, source=None):
+    """
+    Full-text search over questions, answers and judgments, best match (BM25) first.
+
+    `model` is the model that wrote the text; `participant_model`,
+    `interrogator_model` and `verdict` filter on the game, `speaker`
+    ('interrogator', 'participant' or 'judge') and `source` ('turn' or
+    'judgment') on the text. Each hit carries a snippet with the matches
+    wrapped in SEARCH_HIGHLIGHT.
+
+    Returns:
+        dict: {"hits": [...], "offset": int, "limit": int, "next_offset": int or None}
+    """
+    page = {"hits": [], "offset": offset, "limit": limit, "next_offset": None}
+    match = _fts_query(query)
+    if not match:
+        return page
+    conn = get_db_connection()
+    if conn is None:
+        return page
+
+    conditions = ["search_index MATCH ?"]
+    params = [match]
+    for column, value in (("d.model", model), ("d.speaker", speaker), ("d.source", source),
+                          ("g.participant_model", participant_model), ("g.interrogator_model", interrogator_model),
+                          ("g.verdict", verdict)):
+        if value:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+
+    try:
+        rows = conn.execute(f"""
+            SELECT d.run_id, d.source, d.ref, d.speaker, d.model,
+                   snippet(search_index, 0, ?, ?, '…', ?) AS snippet, bm25(search_index) AS score,
+                   g.participant_model, g.interrogator_model, g.verdict, g.status, g.created_at
+            FROM search_index
+            JOIN search_docs d ON d.id = search_index.rowid
+            JOIN game_runs g ON g.run_id = d.run_id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY score
+            LIMIT ? OFFSET ?
+        """, (*SEARCH_HIGHLIGHT, SEARCH_SNIPPET_TOKENS, *params, limit + 1, offset)).fetchall()
+    except sqlite3.Error as e:
+        print(f"Error searching transcripts: {e}")
+        return page
+
+    hits = [dict(row, score=round(-row["score"], 3)) for row in rows[:limit]]
+    page["hits"] = hits
+    if len(rows) > limit:
+        page["next_offset"] = offset + limit
+    return page
+
+
+# --- Bulk export / import ---
+# Complete runs are exported as self-contained records (prompts, turns and
+# judgments inlined) in (updated_at, run_id) order, so an export can resume
+# from the watermark of the previous one. Completing or re-judging a run
+# bumps updated_at, which puts it back into the next incremental export.
+
+EXPORT_FIELDS = (
+    "run_id", "participant_model", "interrogator_model", "status", "verdict", "confidence", "judgment",
+    "turns_used", "num_questions", "min_questions", "confidence_threshold", "judge_panel", "aggregation",
+    "run_by", "created_at", "updated_at", "interrogator_prompt", "participant_prompt", "judgment_prompt",
+    "conversation", "turns", "judgments",
+)
+
+
+def _export_records(cursor, rows):
+    """Builds export records for a chunk of game_runs rows, loading their turns and judgments in one query each."""
+    run_ids = [row["run_id"] for row in rows]
+    placeholders = ",".join("?" * len(run_ids))
+    prompts = _load_prompts(cursor, [row[column] for row in rows for column in
+                                     ("interrogator_prompt_hash", "participant_prompt_hash", "judgment_prompt_hash")])
+    turns = {}
+    for turn in cursor.execute(f"""
+        SELECT run_id, speaker, content, compressed FROM turns WHERE run_id IN ({placeholders}) ORDER BY run_id, seq
+    """, run_ids):
+        turns.setdefault(turn["run_id"], []).append(
+            {"speaker": turn["speaker"], "content": _unpack_text(turn["content"], turn["compressed"])})
+    judgments = {}
+    for judgment in cursor.execute(f"""
+        SELECT run_id, judge_model, sample, verdict, confidence, reasoning, compressed, source, created_at
+        FROM judgments WHERE run_id IN ({placeholders}) ORDER BY id
+    """, run_ids):
+        judgment = dict(judgment)
+        judgment["reasoning"] = _unpack_text(judgment["reasoning"], judgment.pop("compressed")) or None
+        judgments.setdefault(judgment.pop("run_id"), []).append(judgment)
+
+    records = []
+    for row in rows:
+        record = {field: row[field] for field in EXPORT_FIELDS if field in row.keys()}
+        record["judge_panel"] = json.loads(row["judge_panel"]) if row["judge_panel"] else None
+        record["conversation"] = None
+        if row["storage_format"] == STORAGE_FORMAT_NORMALIZED:
+            record["interrogator_prompt"] = prompts.get(row["interrogator_prompt_hash"])
+            record["participant_prompt"] = prompts.get(row["participant_prompt_hash"])
+            record["judgment_prompt"] = prompts.get(row["judgment_prompt_hash"])
+            record["turns"] = turns.get(row["run_id"], [])
+        else:
+            # Legacy row: split the inline conversation, or pass it through if it has a non-standard shape
+            conversation = json.loads(row["conversation"]) if row["conversation"] else None
+            normalized = _normalize_conversation(conversation) if conversation else None
+            if normalized:
+                (record["interrogator_prompt"], record["participant_prompt"], record["judgment_prompt"],
+                 record["turns"]) = normalized
+            else:
+                record["interrogator_prompt"] = row["interrogator_system_prompt"]
+                record["participant_prompt"] = row["participant_system_prompt"]
+                record["judgment_prompt"] = None
+                record["turns"] = []
+                record["conversation"] = row["conversation"]
+        record["judgments"] = judgments.get(row["run_id"], [])
+        records.append({field: record[field] for field in EXPORT_FIELDS})
+    return records
+
+
+def iter_game_run_records(since=None, until=None, batch_size=500):
+    """
+    Yields complete runs as export records (see EXPORT_FIELDS), in lists of
+    up to `batch_size`, ordered by (updated_at, run_id).
+
+    `since` is an exclusive (updated_at, run_id) watermark and `until` an
+    exclusive updated_at bound. The rows are read through one cursor on a
+    dedicated connection, so memory stays bounded by the batch and the
+    export sees a consistent snapshot while games keep being saved.
+    Raises sqlite3.Error if the database cannot be read.
+    """
+    conn = sqlite3.connect(DB_FILE, timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.row_factory = sqlite3.Row
+    try:
+        # Literal status so the planner uses the partial (updated_at, run_id) index
+        conditions = ["status = 'complete'"]
+        params = []
+        if since is not None:
+            conditions.append("(updated_at, run_id) > (?, ?)")
+            params.extend(since)
+        if until is not None:
+            conditions.append("updated_at < ?")
+            params.append(until)
+        conn.execute("BEGIN")
+        rows = conn.execute(f"""
+            SELECT run_id, participant_model, interrogator_model, status, verdict, confidence, judgment, turns_used,
+                   num_questions, min_questions, confidence_threshold, judge_panel, aggregation, run_by, created_at,
+                   updated_at, interrogator_system_prompt, participant_system_prompt, conversation,
+                   interrogator_prompt_hash, participant_prompt_hash, judgment_prompt_hash, storage_format
+            FROM game_runs
+            WHERE {' AND '.join(conditions)}
+            ORDER BY updated_at, run_id
+        """, params)
+        lookup = conn.cursor()
+        while True:
+            chunk = rows.fetchmany(batch_size)
+            if not chunk:
+                break
+            yield _export_records(lookup, chunk)
     finally:
-        if conn:
-            conn.close()
+        conn.close()
+
+
+def _merge_judgments(cursor, run_id, judgments):
+    """
+    Adds the judgments of an imported record that an existing run does not
+    have yet, keyed on (judge_model, sample, source, created_at), and bumps
+    its updated_at so incremental exports pass them on. Returns 1 if any
+    were added, else 0. Runs in the caller's transaction.
+    """
+    stored = {
+        tuple(row) for row in cursor.execute(
+            "SELECT judge_model, sample, source, created_at FROM judgments WHERE run_id = ?", (run_id,)
+        )
+    }
+    new = [j for j in judgments
+           if (j["judge_model"], j.get("sample", 0), j.get("source") or "game", j.get("created_at")) not in stored]
+    if not new:
+        return 0
+    for judgment in new:
+        _insert_judgments(cursor, run_id, [judgment], judgment.get("source") or "game")
+    cursor.execute("UPDATE game_runs SET updated_at = CURRENT_TIMESTAMP WHERE run_id = ?", (run_id,))
+    return 1
 
-def get_past_battles(limit=50):
-    """Fetches past battles from the database."""
+
+def import_game_run_records(records):
+    """
+    Inserts a batch of export records in one transaction, with their
+    prompts, turns, judgments, search index entries and leaderboard
+    updates. Runs whose run_id already exists are not inserted again, but
+    their judgments that are not stored yet (such as re-judgments exported
+    incrementally) are merged in, so re-importing an overlapping export is
+    safe and keeps databases in sync. Returns (runs inserted, runs with
+    merged judgments), or None if the batch failed (and was rolled back).
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return None
+
+    inserted = merged = 0
+    try:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        for record in records:
+            run_id = record["run_id"]
+            judge_panel = record.get("judge_panel")
+            cursor.execute("""
+                INSERT OR IGNORE INTO game_runs (run_id, interrogator_model, participant_model, judgment, verdict,
+                                                 confidence, run_by, status, num_questions, turns_used, min_questions,
+                                                 confidence_threshold, judge_panel, aggregation, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP),
+                        COALESCE(?, CURRENT_TIMESTAMP))
+            """, (run_id, record["interrogator_model"], record["participant_model"], record.get("judgment"),
+                  record.get("verdict"), record.get("confidence"), record.get("run_by"),
+                  record.get("status") or "complete", record.get("num_questions"), record.get("turns_used"),
+                  record.get("min_questions"), record.get("confidence_threshold"),
+                  json.dumps(judge_panel) if judge_panel else None, record.get("aggregation"),
+                  record.get("created_at"), record.get("updated_at")))
+            if cursor.rowcount == 0:
+                merged += _merge_judgments(cursor, run_id, record.get("judgments") or [])
+                continue
+
+            turns = record.get("turns") or []
+            if record.get("conversation") and not turns:
+                cursor.execute("""
+                    UPDATE game_runs
+                    SET interrogator_system_prompt = ?, participant_system_prompt = ?, conversation = ?
+                    WHERE run_id = ?
+                """, (record.get("interrogator_prompt"), record.get("participant_prompt"), record["conversation"],
+                      run_id))
+            else:
+                judgment_prompt = record.get("judgment_prompt")
+                cursor.execute("""
+                    UPDATE game_runs
+                    SET interrogator_prompt_hash = ?, participant_prompt_hash = ?, judgment_prompt_hash = ?,
+                        storage_format = ?
+                    WHERE run_id = ?
+                """, (_store_prompt(cursor, record.get("interrogator_prompt") or ""),
+                      _store_prompt(cursor, record.get("participant_prompt") or ""),
+                      _store_prompt(cursor, judgment_prompt) if judgment_prompt is not None else None,
+                      STORAGE_FORMAT_NORMALIZED, run_id))
+                cursor.executemany(
+                    "INSERT INTO turns (run_id, seq, speaker, content, compressed) VALUES (?, ?, ?, ?, ?)",
+                    [(run_id, seq, turn["speaker"], *_pack_text(turn["content"]))
+                     for seq, turn in enumerate(turns, start=1)],
+                )
+                for seq, turn in enumerate(turns, start=1):
+                    _index_text(cursor, run_id, "turn", seq, turn["speaker"], turn["content"])
+
+            judgments = record.get("judgments") or []
+            for judgment in judgments:
+                _insert_judgments(cursor, run_id, [judgment], judgment.get("source") or "game")
+            if not judgments:
+                _index_text(cursor, run_id, "judgment", 0, "judge", record.get("judgment"),
+                            record["interrogator_model"])
+
+            if (record.get("status") or "complete") == "complete":
+                update_leaderboard_aggregates(cursor, record["participant_model"], record["interrogator_model"],
+                                              record.get("verdict"), record.get("turns_used"))
+            inserted += 1
+        conn.commit()
+        return inserted, merged
+    except (sqlite3.Error, KeyError, TypeError) as e:
+        conn.rollback()
+        print(f"Error importing game runs: {e}")
+        return None
+
+
+# --- Game event log ---
+
+def append_game_event(run_id, seq, data):
+    """Persists one game event (a JSON string) so SSE clients can resume from it."""
+    conn = get_db_connection()
+    if conn is None:
+        return False
+
+    try:
+        conn.execute("INSERT INTO game_events (run_id, seq, data) VALUES (?, ?, ?)", (run_id, seq, data))
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error saving game event: {e}")
+        return False
+
+
+def truncate_game_events(run_id, after_seq):
+    """Deletes a game's events after `after_seq` (e.g. the error event of a run being resumed)."""
+    conn = get_db_connection()
+    if conn is None:
+        return False
+
+    try:
+        conn.execute("DELETE FROM game_events WHERE run_id = ? AND seq > ?", (run_id, after_seq))
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error truncating game events: {e}")
+        return False
+
+
+def get_game_events(run_id, after_seq=0):
+    """Returns [(seq, data)] for a game's persisted events after `after_seq`, in order."""
     conn = get_db_connection()
     if conn is None:
         return []
 
+    try:
+        rows = conn.execute(
+            "SELECT seq, data FROM game_events WHERE run_id = ? AND seq > ? ORDER BY seq", (run_id, after_seq)
+        ).fetchall()
+        return [(row["seq"], row["data"]) for row in rows]
+    except sqlite3.Error as e:
+        print(f"Error fetching game events: {e}")
+        return []
+
+
+# --- Model call instrumentation ---
+
+def insert_llm_call(run_id, model, role, turn, started_at, latency_ms, ttft_ms, prompt_tokens,
+                    completion_tokens, cost_usd, status):
+    """Records one model call's latency, tokens and cost. Returns True on success."""
+    conn = get_db_connection()
+    if conn is None:
+        return False
+
+    try:
+        conn.execute("""
+            INSERT INTO llm_calls (run_id, model, role, turn, started_at, latency_ms, ttft_ms,
+                                   prompt_tokens, completion_tokens, cost_usd, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (run_id, model, role, turn, started_at, latency_ms, ttft_ms, prompt_tokens, completion_tokens,
+              cost_usd, status))
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error recording model call: {e}")
+        return False
+
+
+def _get_run_calls(cursor, run_id):
+    """Returns a game's model calls in order, and their totals."""
+    calls = [dict(row) for row in cursor.execute("""
+        SELECT model, role, turn, latency_ms, ttft_ms, prompt_tokens, completion_tokens, cost_usd, status
+        FROM llm_calls
+        WHERE run_id = ?
+        ORDER BY started_at
+    """, (run_id,))]
+    totals = {
+        "calls": len(calls),
+        "latency_ms": round(sum(call["latency_ms"] for call in calls), 1),
+        "prompt_tokens": sum(call["prompt_tokens"] or 0 for call in calls),
+        "completion_tokens": sum(call["completion_tokens"] or 0 for call in calls),
+        "cost_usd": round(sum(call["cost_usd"] or 0 for call in calls), 6),
+    }
+    return calls, totals
+
+
+def _get_model_latency_stats(cursor):
+    """Per-model call counts, p50/p95 latency, mean time to first token and spend, as of the last refresh."""
+    cursor.execute("""
+        SELECT model, calls, p50_latency_ms, p95_latency_ms, avg_ttft_ms, total_tokens, total_cost_usd, refreshed_at
+        FROM model_latency_stats
+        ORDER BY p50_latency_ms
+    """)
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def refresh_model_latency_stats(after_call_id=None):
+    """
+    Recomputes model_latency_stats from the successful calls in llm_calls.
+
+    The percentiles need a scan of every call, so this runs in the background
+    (metrics.start_latency_stats_refresher) rather than per leaderboard
+    request, and does nothing if no call was logged after `after_call_id`.
+    Returns the id of the newest call included, or None on failure.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return None
+
     try:
         cursor = conn.cursor()
+        last_call_id = cursor.execute("SELECT MAX(id) FROM llm_calls").fetchone()[0]
+        if last_call_id is None or last_call_id == after_call_id:
+            return last_call_id
+
+        # Computed outside the write transaction so games saving meanwhile are not blocked.
+        # Nearest-rank percentiles: the smallest latency whose rank reaches p * n
+        cursor.execute("""
+            WITH ranked AS (
+                SELECT model, latency_ms, ttft_ms, prompt_tokens, completion_tokens, cost_usd,
+                       ROW_NUMBER() OVER (PARTITION BY model ORDER BY latency_ms) AS rank,
+                       COUNT(*) OVER (PARTITION BY model) AS n
+                FROM llm_calls
+                WHERE status = 'ok' AND id <= ?
+            )
+            SELECT model,
+                   n AS calls,
+                   MIN(CASE WHEN rank >= 0.5 * n THEN latency_ms END) AS p50_latency_ms,
+                   MIN(CASE WHEN rank >= 0.95 * n THEN latency_ms END) AS p95_latency_ms,
+                   ROUND(AVG(ttft_ms), 1) AS avg_ttft_ms,
+                   SUM(COALESCE(prompt_tokens, 0) + COALESCE(completion_tokens, 0)) AS total_tokens,
+                   ROUND(SUM(COALESCE(cost_usd, 0)), 6) AS total_cost_usd
+            FROM ranked
+            GROUP BY model
+        """, (last_call_id,))
+        stats = [dict(row, last_call_id=last_call_id) for row in cursor.fetchall()]
+
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("DELETE FROM model_latency_stats")
+        cursor.executemany("""
+            INSERT INTO model_latency_stats (model, calls, p50_latency_ms, p95_latency_ms, avg_ttft_ms, total_tokens,
+                                             total_cost_usd, last_call_id, refreshed_at)
+            VALUES (:model, :calls, :p50_latency_ms, :p95_latency_ms, :avg_ttft_ms, :total_tokens, :total_cost_usd,
+                    :last_call_id, CURRENT_TIMESTAMP)
+        """, stats)
+        conn.commit()
+        return last_call_id
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error refreshing model latency stats: {e}")
+        return None
+
+
+# --- Leaderboard aggregates ---
+# participant_stats, interrogator_stats and pair_stats are maintained
+# incrementally in the same transaction that saves a game run, so the
+# leaderboard reads O(models) rows instead of scanning game_runs.
+
+def update_leaderboard_aggregates(cursor, participant_model, interrogator_model, verdict, turns_used=None):
+    """
+    Adds one saved game to the leaderboard aggregates. Runs in the caller's transaction.
+
+    `turns_used` (questions asked, None if unknown) feeds the per-model average game length.
+    """
+    human = 1 if verdict == 'Human' else 0
+    ai = 1 if verdict == 'AI' else 0
+    turns_games = 1 if turns_used is not None else 0
+    turns_used = turns_used or 0
+    if participant_model is not None:
+        cursor.execute("""
+            INSERT INTO participant_stats (participant_model, total_games, fooled_count, turns_used_total, turns_used_games)
+            VALUES (?, 1, ?, ?, ?)
+            ON CONFLICT(participant_model) DO UPDATE SET
+                total_games = total_games + 1,
+                fooled_count = fooled_count + excluded.fooled_count,
+                turns_used_total = turns_used_total + excluded.turns_used_total,
+                turns_used_games = turns_used_games + excluded.turns_used_games
+        """, (participant_model, human, turns_used, turns_games))
+    if interrogator_model is not None:
         cursor.execute("""
-            SELECT run_id, interrogator_model, participant_model, judgment, verdict, created_at
+            INSERT INTO interrogator_stats (interrogator_model, total_games, correct_count, turns_used_total,
+                                            turns_used_games)
+            VALUES (?, 1, ?, ?, ?)
+            ON CONFLICT(interrogator_model) DO UPDATE SET
+                total_games = total_games + 1,
+                correct_count = correct_count + excluded.correct_count,
+                turns_used_total = turns_used_total + excluded.turns_used_total,
+                turns_used_games = turns_used_games + excluded.turns_used_games
+        """, (interrogator_model, ai, turns_used, turns_games))
+    if participant_model is not None and interrogator_model is not None:
+        cursor.execute("""
+            INSERT INTO pair_stats (participant_model, interrogator_model, total_games, human_verdicts, ai_verdicts)
+            VALUES (?, ?, 1, ?, ?)
+            ON CONFLICT(participant_model, interrogator_model) DO UPDATE SET
+                total_games = total_games + 1,
+                human_verdicts = human_verdicts + excluded.human_verdicts,
+                ai_verdicts = ai_verdicts + excluded.ai_verdicts
+        """, (participant_model, interrogator_model, human, ai))
+        _update_ratings(cursor, participant_model, interrogator_model, verdict)
+
+
+def _update_ratings(cursor, participant_model, interrogator_model, verdict):
+    """
+    Elo step for one saved game between full Bradley-Terry refits: the
+    participant wins on a 'Human' verdict, the interrogator on 'AI'.
+    Runs in the caller's transaction.
+    """
+    if verdict not in ('Human', 'AI'):
+        return
+    ratings = {(row["model"], row["role"]): row["rating"] for row in cursor.execute("""
+        SELECT model, role, rating FROM model_ratings
+        WHERE (model = ? AND role = 'participant') OR (model = ? AND role = 'interrogator')
+    """, (participant_model, interrogator_model))}
+    participant_rating = ratings.get((participant_model, "participant"), RATING_BASE)
+    interrogator_rating = ratings.get((interrogator_model, "interrogator"), RATING_BASE)
+    expected = 1 / (1 + 10 ** ((interrogator_rating - participant_rating) / 400))
+    delta = RATING_K * ((1.0 if verdict == 'Human' else 0.0) - expected)
+    cursor.executemany("""
+        INSERT INTO model_ratings (model, role, rating, games) VALUES (?, ?, ?, 1)
+        ON CONFLICT(model, role) DO UPDATE SET
+            rating = excluded.rating, games = games + 1, updated_at = CURRENT_TIMESTAMP
+    """, [(participant_model, "participant", participant_rating + delta),
+          (interrogator_model, "interrogator", interrogator_rating - delta)])
+
+
+def get_rating_pairs():
+    """Returns [{participant_model, interrogator_model, human_verdicts, ai_verdicts}] for fitting ratings."""
+    conn = get_db_connection()
+    if conn is None:
+        return []
+
+    try:
+        rows = conn.execute("""
+            SELECT participant_model, interrogator_model, human_verdicts, ai_verdicts
+            FROM pair_stats
+            WHERE human_verdicts + ai_verdicts > 0
+        """).fetchall()
+        return [dict(row) for row in rows]
+    except sqlite3.Error as e:
+        print(f"Error fetching rating pairs: {e}")
+        return []
+
+
+def replace_model_ratings(ratings):
+    """Replaces all ratings with a full fit: [{model, role, rating, games, ci_low, ci_high}]. Returns True on success."""
+    conn = get_db_connection()
+    if conn is None:
+        return False
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("DELETE FROM model_ratings")
+        cursor.executemany("""
+            INSERT INTO model_ratings (model, role, rating, games, ci_low, ci_high, fitted_at, updated_at)
+            VALUES (:model, :role, :rating, :games, :ci_low, :ci_high, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+        """, ratings)
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error saving model ratings: {e}")
+        return False
+
+
+def _get_model_ratings(cursor, role):
+    cursor.execute("""
+        SELECT model, rating, games, ci_low, ci_high, fitted_at
+        FROM model_ratings
+        WHERE role = ?
+        ORDER BY rating DESC
+    """, (role,))
+    return [dict(row, rating=round(row["rating"], 1),
+                 ci_low=round(row["ci_low"], 1) if row["ci_low"] is not None else None,
+                 ci_high=round(row["ci_high"], 1) if row["ci_high"] is not None else None)
+            for row in cursor.fetchall()]
+
+
+def _rebuild_leaderboard_aggregates(cursor, completed_only=True):
+    # Databases older than the status column hold complete runs only
+    status_filter = "AND status = 'complete'" if completed_only else ""
+    # Game length columns only exist from migration 8 on
+    if "turns_used_total" in _column_names(cursor, "participant_stats"):
+        turns_columns = ", turns_used_total, turns_used_games"
+        turns_values = ", COALESCE(SUM(turns_used), 0), COUNT(turns_used)"
+    else:
+        turns_columns = turns_values = ""
+    cursor.execute("DELETE FROM participant_stats")
+    cursor.execute("DELETE FROM interrogator_stats")
+    cursor.execute("DELETE FROM pair_stats")
+    cursor.execute(f"""
+        INSERT INTO participant_stats (participant_model, total_games, fooled_count{turns_columns})
+        SELECT participant_model, COUNT(*), SUM(CASE WHEN verdict = 'Human' THEN 1 ELSE 0 END){turns_values}
+        FROM game_runs
+        WHERE participant_model IS NOT NULL {status_filter}
+        GROUP BY participant_model
+    """)
+    cursor.execute(f"""
+        INSERT INTO interrogator_stats (interrogator_model, total_games, correct_count{turns_columns})
+        SELECT interrogator_model, COUNT(*), SUM(CASE WHEN verdict = 'AI' THEN 1 ELSE 0 END){turns_values}
+        FROM game_runs
+        WHERE interrogator_model IS NOT NULL {status_filter}
+        GROUP BY interrogator_model
+    """)
+    cursor.execute(f"""
+        INSERT INTO pair_stats (participant_model, interrogator_model, total_games, human_verdicts, ai_verdicts)
+        SELECT participant_model, interrogator_model, COUNT(*),
+               SUM(CASE WHEN verdict = 'Human' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN verdict = 'AI' THEN 1 ELSE 0 END)
+        FROM game_runs
+        WHERE participant_model IS NOT NULL AND interrogator_model IS NOT NULL {status_filter}
+        GROUP BY participant_model, interrogator_model
+    """)
+
+
+def rebuild_leaderboard_aggregates():
+    """Recomputes all leaderboard aggregates from game_runs (backfill / repair)."""
+    conn = get_db_connection()
+    if conn is None:
+        return False
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        _rebuild_leaderboard_aggregates(cursor)
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error rebuilding leaderboard aggregates: {e}")
+        return False
+
+
+def encode_battle_cursor(battle):
+    """Returns the opaque pagination cursor pointing just after `battle`."""
+    raw = json.dumps([battle["created_at"], battle["run_id"]])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_battle_cursor(cursor):
+    """Decodes a cursor from encode_battle_cursor into (created_at, run_id). Raises ValueError if invalid."""
+    try:
+        created_at, run_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return created_at, run_id
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+# Changes whenever a complete run's details do: updated_at (one-second resolution) plus its newest judgment and
+# model call (re-judging logs calls even when it stores no judgment). Clients pass it back as
+# /api/battle/<run_id>?v=<version>. Runs still being played are not versioned: they are never cached.
+_BATTLE_VERSION_SQL = ("updated_at || '.' || COALESCE((SELECT MAX(id) FROM judgments "
+                       "WHERE judgments.run_id = game_runs.run_id), 0) || '.' || COALESCE((SELECT MAX(id) "
+                       "FROM llm_calls WHERE llm_calls.run_id = game_runs.run_id), 0)")
+
+
+def get_past_battles(limit=50, cursor=None, participant_model=None, interrogator_model=None, verdict=None):
+    """
+    Fetches past (complete) battles from the database, newest first.
+
+    Uses keyset pagination on (created_at, run_id): pass the decoded cursor of
+    the last battle on the previous page as `cursor` to get the next page.
+    Optional filters narrow by participant model, interrogator model or verdict.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return []
+
+    # Literal (not a bound parameter) so the planner can use the partial indexes
+    conditions = ["status = 'complete'"]
+    params = []
+    if cursor is not None:
+        conditions.append("(created_at, run_id) < (?, ?)")
+        params.extend(cursor)
+    if participant_model:
+        conditions.append("participant_model = ?")
+        params.append(participant_model)
+    if interrogator_model:
+        conditions.append("interrogator_model = ?")
+        params.append(interrogator_model)
+    if verdict:
+        conditions.append("verdict = ?")
+        params.append(verdict)
+    where = f"WHERE {' AND '.join(conditions)}"
+
+    try:
+        db_cursor = conn.cursor()
+        db_cursor.execute(f"""
+            SELECT run_id, interrogator_model, participant_model, judgment, verdict, confidence, turns_used, created_at,
+                   updated_at, {_BATTLE_VERSION_SQL} AS version
             FROM game_runs
-            ORDER BY created_at DESC
+            {where}
+            ORDER BY created_at DESC, run_id DESC
             LIMIT ?
-        """, (limit,))
-        battles = cursor.fetchall()
+        """, (*params, limit))
+        battles = db_cursor.fetchall()
         return [dict(battle) for battle in battles]
     except sqlite3.Error as e:
         print(f"Error fetching past battles: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
 
-def get_battle_details(run_id):
-    """Fetches detailed battle information including full conversation."""
+
+def get_battles_page(limit=50, cursor=None, **filters):
+    """
+    Fetches one page of past battles.
+
+    Returns:
+        dict: {"battles": [...], "next_cursor": str or None}
+    """
+    battles = get_past_battles(limit + 1, cursor=cursor, **filters)
+    next_cursor = None
+    if len(battles) > limit:
+        battles = battles[:limit]
+        next_cursor = encode_battle_cursor(battles[-1])
+    return {"battles": battles, "next_cursor": next_cursor}
+
+
+def _load_turns(cursor, run_id):
+    rows = cursor.execute(
+        "SELECT speaker, content, compressed FROM turns WHERE run_id = ? ORDER BY seq", (run_id,)
+    ).fetchall()
+    return [{"speaker": row["speaker"], "content": _unpack_text(row["content"], row["compressed"])} for row in rows]
+
+
+def get_battle_details(run_id, include_transcripts=False):
+    """
+    Fetches detailed battle information including the conversation.
+
+    The conversation is returned once, as `turns` ({speaker, content} in
+    order), alongside the system prompts. With include_transcripts=True the
+    role-specific `conversation` transcripts are rebuilt and included too.
+    Legacy rows whose conversation is not in the standard game shape have
+    `turns` None and always include `conversation` as stored.
+    Runs that are still in progress or failed come back with their `status`
+    and the turns checkpointed so far. Each model call's latency, tokens and
+    cost is included as `calls`, with game totals as `usage`, and each
+    judge's verdict as `judgments`.
+    """
     conn = get_db_connection()
     if conn is None:
         return None
@@ -86,24 +1865,97 @@ def get_battle_details(run_id):
     try:
         cursor = conn.cursor()
         cursor.execute("""
-            SELECT *
+            SELECT run_id, interrogator_model, participant_model, interrogator_system_prompt,
+                   participant_system_prompt, conversation, judgment, verdict, confidence, run_by, created_at,
+                   updated_at, status, error, num_questions, turns_used, min_questions, confidence_threshold, aggregation,
+                   interrogator_prompt_hash, participant_prompt_hash, judgment_prompt_hash, storage_format
             FROM game_runs
             WHERE run_id = ?
         """, (run_id,))
-        battle = cursor.fetchone()
-        return dict(battle) if battle else None
-    except sqlite3.Error as e:
+        row = cursor.fetchone()
+        if not row:
+            return None
+        battle = dict(row)
+
+        if battle.pop("storage_format") == STORAGE_FORMAT_NORMALIZED:
+            prompts = _load_prompts(cursor, [battle["interrogator_prompt_hash"], battle["participant_prompt_hash"],
+                                             battle["judgment_prompt_hash"]])
+            battle["interrogator_system_prompt"] = prompts.get(battle["interrogator_prompt_hash"])
+            battle["participant_system_prompt"] = prompts.get(battle["participant_prompt_hash"])
+            judgment_prompt = prompts.get(battle["judgment_prompt_hash"])
+            turns = _load_turns(cursor, run_id)
+            conversation = build_conversation(battle["interrogator_system_prompt"],
+                                               battle["participant_system_prompt"], judgment_prompt, turns)
+        else:
+            # Legacy row: the conversation JSON is stored inline
+            conversation = json.loads(battle["conversation"]) if battle["conversation"] else None
+            normalized = _normalize_conversation(conversation) if conversation else None
+            judgment_prompt = normalized[2] if normalized else None
+            # Conversations not in the standard shape have no turns; they are sent as `conversation` instead
+            turns = normalized[3] if normalized else None
+
+        for column in ("interrogator_prompt_hash", "participant_prompt_hash", "judgment_prompt_hash", "conversation"):
+            battle.pop(column)
+        battle["judgment_prompt"] = judgment_prompt
+        battle["turns"] = turns
+        battle["judgments"] = _load_judgments(cursor, run_id)
+        battle["calls"], battle["usage"] = _get_run_calls(cursor, run_id)
+        if include_transcripts or turns is None:
+            battle["conversation"] = conversation
+        return battle
+    except (sqlite3.Error, ValueError, zlib.error) as e:
         print(f"Error fetching battle details: {e}")
         return None
-    finally:
-        if conn:
-            conn.close()
+
+def get_change_version(scope):
+    """
+    Returns (version, changed_at) for a cached response scope ('battles' or
+    'leaderboard'): a counter bumped by triggers whenever data shown in that
+    scope changes, and the time of the last change. None if unavailable.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return None
+
+    try:
+        row = conn.execute("SELECT version, changed_at FROM change_counters WHERE scope = ?", (scope,)).fetchone()
+        return (row["version"], row["changed_at"]) if row else None
+    except sqlite3.Error as e:
+        print(f"Error reading change counter: {e}")
+        return None
+
+
+def get_battle_version(run_id):
+    """
+    Returns (status, version, updated_at) of a run, or None if it does not
+    exist. Once the run is complete, the version changes whenever its details
+    do, and matches the `version` listed by get_past_battles.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return None
+
+    try:
+        row = conn.execute(f"""
+            SELECT status, {_BATTLE_VERSION_SQL} AS version, updated_at FROM game_runs WHERE run_id = ?
+        """, (run_id,)).fetchone()
+        return (row["status"], row["version"], row["updated_at"]) if row else None
+    except sqlite3.Error as e:
+        print(f"Error reading battle version: {e}")
+        return None
+
 
 def get_leaderboard_stats():
-    """Generates leaderboard statistics for models."""
+    """
+    Generates leaderboard statistics for models from the aggregate tables,
+    plus the per-model latency percentiles refreshed by metrics.py and the
+    Bradley-Terry/Elo ratings (with 95% intervals) maintained by ratings.py.
+    """
+    empty = {"participant_stats": [], "interrogator_stats": [], "pair_stats": [], "latency_stats": [],
+             "participant_ratings": [], "interrogator_ratings": []}
     conn = get_db_connection()
     if conn is None:
-        return {"participant_stats": [], "interrogator_stats": []}
+        return empty
 
     try:
         cursor = conn.cursor()
@@ -112,15 +1964,12 @@ def get_leaderboard_stats():
         cursor.execute("""
             SELECT 
                 participant_model,
-                COUNT(*) as total_games,
-                SUM(CASE WHEN verdict = 'Human' THEN 1 ELSE 0 END) as fooled_count,
-                ROUND(
-                    (SUM(CASE WHEN verdict = 'Human' THEN 1 ELSE 0 END) * 100.0 / COUNT(*)), 1
-                ) as success_rate
-            FROM game_runs
-            WHERE participant_model IS NOT NULL
-            GROUP BY participant_model
-            HAVING total_games >= 1
+                total_games,
+                fooled_count,
+                ROUND(fooled_count * 100.0 / total_games, 1) as success_rate,
+                ROUND(turns_used_total * 1.0 / NULLIF(turns_used_games, 0), 2) as avg_turns_used
+            FROM participant_stats
+            WHERE total_games >= 1
             ORDER BY success_rate DESC, total_games DESC
         """)
         participant_stats = [dict(row) for row in cursor.fetchall()]
@@ -129,30 +1978,46 @@ def get_leaderboard_stats():
         cursor.execute("""
             SELECT 
                 interrogator_model,
-                COUNT(*) as total_games,
-                SUM(CASE WHEN verdict = 'AI' THEN 1 ELSE 0 END) as correct_count,
-                ROUND(
-                    (SUM(CASE WHEN verdict = 'AI' THEN 1 ELSE 0 END) * 100.0 / COUNT(*)), 1
-                ) as success_rate
-            FROM game_runs
-            WHERE interrogator_model IS NOT NULL
-            GROUP BY interrogator_model
-            HAVING total_games >= 1
+                total_games,
+                correct_count,
+                ROUND(correct_count * 100.0 / total_games, 1) as success_rate,
+                ROUND(turns_used_total * 1.0 / NULLIF(turns_used_games, 0), 2) as avg_turns_used
+            FROM interrogator_stats
+            WHERE total_games >= 1
             ORDER BY success_rate DESC, total_games DESC
         """)
         interrogator_stats = [dict(row) for row in cursor.fetchall()]
+
+        # Head-to-head results for each participant/interrogator pairing
+        cursor.execute("""
+            SELECT participant_model, interrogator_model, total_games, human_verdicts, ai_verdicts
+            FROM pair_stats
+            ORDER BY total_games DESC
+        """)
+        pair_stats = [dict(row) for row in cursor.fetchall()]
         
         return {
             "participant_stats": participant_stats,
-            "interrogator_stats": interrogator_stats
+            "interrogator_stats": interrogator_stats,
+            "pair_stats": pair_stats,
+            "latency_stats": _get_model_latency_stats(cursor),
+            "participant_ratings": _get_model_ratings(cursor, "participant"),
+            "interrogator_ratings": _get_model_ratings(cursor, "interrogator"),
         }
     except sqlite3.Error as e:
         print(f"Error generating leaderboard stats: {e}")
-        return {"participant_stats": [], "interrogator_stats": []}
-    finally:
-        if conn:
-            conn.close()
+        return empty
 
 if __name__ == '__main__':
     create_table_if_not_exists()
-    print("SQLite database table check complete.") 
\ No newline at end of file
+    print("SQLite database table check complete.")
+    if len(sys.argv) > 1 and sys.argv[1] == 'rebuild-leaderboard':
+        if rebuild_leaderboard_aggregates():
+            print("Leaderboard aggregates rebuilt from game_runs.")
+    elif len(sys.argv) > 1 and sys.argv[1] == 'migrate-transcripts':
+        count = migrate_transcripts()
+        print(f"Converted {count} game runs to normalized transcript storage.")
+        print("Run VACUUM on the database to reclaim the freed space.")
+    elif len(sys.argv) > 1 and sys.argv[1] == 'rebuild-search-index':
+        count = rebuild_search_index()
+        print(f"Indexed {count} game runs for full-text search.")
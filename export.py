@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Bulk export and import of game runs.
+
+Complete runs are written as self-contained records (models, verdict,
+prompts, turns and judgments; see database.EXPORT_FIELDS), streamed in
+chunks of EXPORT_BATCH_SIZE runs so memory stays flat however large the
+history is. Formats:
+
+    ndjson   - one JSON record per line (default)
+    csv      - one row per run; judge_panel, turns and judgments as JSON
+    parquet  - one row group per chunk, turns/judgments as nested lists
+    arrow    - Arrow IPC stream, one record batch per chunk
+
+Parquet and Arrow need pyarrow (pip install pyarrow); without it they fall
+back to CSV. Exports are incremental through a watermark: everything saved
+before the watermark an export reports has been exported, so passing it
+back as --since (or keeping it in a --state file) exports only newer runs.
+The watermark trails the clock by EXPORT_WATERMARK_LAG_SECONDS, so runs
+saved in the last minute wait for the next export.
+
+Usage:
+    python export.py export -o runs.ndjson
+    python export.py export -f parquet -o new_runs.parquet --state export.state
+    python export.py import runs.ndjson
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from database import create_table_if_not_exists, iter_game_run_records, import_game_run_records, EXPORT_FIELDS
+
+EXPORT_FORMATS = ("ndjson", "csv", "parquet", "arrow")
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+# A run's updated_at is stamped inside the transaction that saves it, which can commit after an export's read
+# snapshot was taken; runs stamped this recently are left to the next export so none fall between the two
+EXPORT_WATERMARK_LAG_SECONDS = int(os.getenv("EXPORT_WATERMARK_LAG_SECONDS", "60"))
+
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+FILE_EXTENSIONS = {"ndjson": "ndjson", "csv": "csv", "parquet": "parquet", "arrow": "arrows"}
+
+# CSV has no nested or typed columns: these are stored as JSON / parsed back on import
+_JSON_FIELDS = ("judge_panel", "turns", "judgments")
+_INT_FIELDS = ("turns_used", "num_questions", "min_questions")
+_FLOAT_FIELDS = ("confidence", "confidence_threshold")
+
+WATERMARK_FORMAT = "%Y-%m-%d %H:%M:%S"  # SQLite CURRENT_TIMESTAMP, UTC
+
+
+def resolve_format(fmt):
+    """Validates an export format, falling back from parquet/arrow to csv when pyarrow is missing."""
+    fmt = (fmt or "ndjson").lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(EXPORT_FORMATS)}")
+    if fmt in ("parquet", "arrow") and pa is None:
+        print(f"pyarrow is not installed; exporting CSV instead of {fmt}.", file=sys.stderr)
+        return "csv"
+    return fmt
+
+
+def current_watermark():
+    """
+    Returns the `until` bound for an export starting now. It trails the clock
+    by EXPORT_WATERMARK_LAG_SECONDS, so runs saved since then (possibly not
+    yet committed) go to the next export instead of being skipped by both.
+    """
+    return (datetime.now(timezone.utc) - timedelta(seconds=EXPORT_WATERMARK_LAG_SECONDS)).strftime(WATERMARK_FORMAT)
+
+
+def next_watermark(since, until):
+    """Returns the watermark an export between `since` and `until` reports: `until`, unless `since` is already past it."""
+    if since is not None and since[0] >= until:
+        return ",".join(part for part in since if part)
+    return until
+
+
+def parse_watermark(text):
+    """
+    Parses a watermark: an updated_at timestamp, optionally followed by
+    ',<run_id>' to resume right after that run. Returns (updated_at, run_id).
+    Raises ValueError if invalid.
+    """
+    timestamp, _, run_id = text.strip().partition(",")
+    timestamp = timestamp.strip().replace("T", " ")
+    try:
+        datetime.strptime(timestamp, WATERMARK_FORMAT)
+    except ValueError as e:
+        raise ValueError(f"Invalid watermark {text!r}; expected 'YYYY-MM-DD HH:MM:SS[,run_id]'") from e
+    return timestamp, run_id.strip()
+
+
+# --- Writers: each turns an iterable of record batches into a stream of bytes ---
+
+def _ndjson_chunks(batches):
+    for records in batches:
+        yield "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+
+
+def _csv_chunks(batches):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for records in batches:
+        for record in records:
+            writer.writerow({**record, **{field: json.dumps(record[field], ensure_ascii=False)
+                                          for field in _JSON_FIELDS if record[field] is not None}})
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _arrow_schema():
+    turn = pa.struct([("speaker", pa.string()), ("content", pa.string())])
+    judgment = pa.struct([
+        ("judge_model", pa.string()), ("sample", pa.int64()), ("verdict", pa.string()),
+        ("confidence", pa.float64()), ("reasoning", pa.string()), ("source", pa.string()),
+        ("created_at", pa.string()),
+    ])
+    types = {
+        "confidence": pa.float64(), "confidence_threshold": pa.float64(),
+        "turns_used": pa.int64(), "num_questions": pa.int64(), "min_questions": pa.int64(),
+        "judge_panel": pa.list_(pa.string()), "turns": pa.list_(turn), "judgments": pa.list_(judgment),
+    }
+    return pa.schema([(field, types.get(field, pa.string())) for field in EXPORT_FIELDS])
+
+
+class _ByteChunks(io.RawIOBase):
+    """Write-only sink that hands out what pyarrow has written so far, so files can be streamed."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _columnar_chunks(batches, fmt):
+    schema = _arrow_schema()
+    sink = _ByteChunks()
+    output = pa.PythonFile(sink, mode="w")
+    writer = pq.ParquetWriter(output, schema) if fmt == "parquet" else pa.ipc.new_stream(output, schema)
+    try:
+        for records in batches:
+            table = pa.Table.from_pylist(records, schema=schema)
+            if fmt == "parquet":
+                writer.write_table(table, row_group_size=len(records))
+            else:
+                writer.write_table(table)
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def write_records(batches, fmt):
+    """Encodes an iterable of record batches in `fmt` (see resolve_format), yielding bytes chunk by chunk."""
+    if fmt == "ndjson":
+        return _ndjson_chunks(batches)
+    if fmt == "csv":
+        return _csv_chunks(batches)
+    return _columnar_chunks(batches, fmt)
+
+
+def export_chunks(fmt, since=None, until=None, batch_size=EXPORT_BATCH_SIZE):
+    """Streams the complete runs saved after `since` and before `until` (watermarks) as bytes in `fmt`."""
+    return write_records(iter_game_run_records(since, until, batch_size), fmt)
+
+
+# --- Readers: each yields records from an export file ---
+
+def _read_ndjson(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _read_csv(path):
+    csv.field_size_limit(sys.maxsize)  # Turns and judgments are whole JSON documents
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            record = {field: (value if value != "" else None) for field, value in row.items()}
+            for field in _JSON_FIELDS:
+                record[field] = json.loads(record[field]) if record[field] else None
+            for field in _INT_FIELDS:
+                record[field] = int(record[field]) if record[field] is not None else None
+            for field in _FLOAT_FIELDS:
+                record[field] = float(record[field]) if record[field] is not None else None
+            yield record
+
+
+def _read_columnar(path, fmt):
+    if pa is None:
+        raise ValueError(f"Reading {fmt} files requires pyarrow (pip install pyarrow)")
+    if fmt == "parquet":
+        batches = pq.ParquetFile(path).iter_batches(batch_size=IMPORT_BATCH_SIZE)
+    else:
+        batches = pa.ipc.open_stream(pa.memory_map(path))
+    for batch in batches:
+        yield from batch.to_pylist()
+
+
+def read_records(path, fmt=None):
+    """Yields the records of an export file; the format defaults to the one its extension names."""
+    fmt = fmt or detect_format(path)
+    if fmt == "ndjson":
+        return _read_ndjson(path)
+    if fmt == "csv":
+        return _read_csv(path)
+    return _read_columnar(path, fmt)
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lstrip(".").lower()
+    for fmt, fmt_extension in FILE_EXTENSIONS.items():
+        if extension in (fmt, fmt_extension):
+            return fmt
+    if extension in ("jsonl", "json"):
+        return "ndjson"
+    raise ValueError(f"Cannot tell the format of {path}; pass it with --format")
+
+
+def import_file(path, fmt=None, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Imports an export file in transactions of `batch_size` runs. Runs
+    already in the database are not inserted again, but new judgments in
+    their records are merged in. Returns (inserted, merged, read), or raises
+    RuntimeError if a batch could not be written.
+    """
+    inserted = merged = read = 0
+    batch = []
+    for record in read_records(path, fmt):
+        batch.append(record)
+        if len(batch) >= batch_size:
+            batch_inserted, batch_merged = _import_batch(batch)
+            inserted, merged, read = inserted + batch_inserted, merged + batch_merged, read + len(batch)
+            batch = []
+    if batch:
+        batch_inserted, batch_merged = _import_batch(batch)
+        inserted, merged, read = inserted + batch_inserted, merged + batch_merged, read + len(batch)
+    return inserted, merged, read
+
+
+def _import_batch(batch):
+    counts = import_game_run_records(batch)
+    if counts is None:
+        raise RuntimeError(f"Failed to import the batch starting at run {batch[0].get('run_id')}")
+    return counts
+
+
+def _counted(batches, counter):
+    for records in batches:
+        counter[0] += len(records)
+        yield records
+
+
+def _export(args):
+    fmt = resolve_format(args.format or (detect_format(args.output) if args.output else None))
+    since = args.since
+    if since is None and args.state and os.path.exists(args.state):
+        with open(args.state, encoding="utf-8") as f:
+            since = f.read().strip() or None
+    since = parse_watermark(since) if since else None
+    until = current_watermark()
+    watermark = next_watermark(since, until)
+
+    exported = [0]
+    chunks = write_records(_counted(iter_game_run_records(since, until, args.batch_size), exported), fmt)
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+
+    if args.state:
+        with open(args.state, "w", encoding="utf-8") as f:
+            f.write(watermark + "\n")
+    # Status goes to stderr so it never mixes with an export written to stdout
+    print(f"Exported {exported[0]} game runs ({fmt}). Next watermark: {watermark}", file=sys.stderr)
+
+
+def _import(args):
+    inserted, merged, read = import_file(args.input, args.format, args.batch_size)
+    print(f"Imported {inserted} of {read} game runs ({read - inserted} already present, "
+          f"{merged} of them with new judgments merged in).")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import game runs in bulk.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Export complete game runs")
+    export_parser.add_argument("-f", "--format", choices=EXPORT_FORMATS,
+                               help="Output format (default: from the output file extension, else ndjson)")
+    export_parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    export_parser.add_argument("--since", help="Only runs saved after this watermark ('YYYY-MM-DD HH:MM:SS[,run_id]')")
+    export_parser.add_argument("--state", help="File holding the watermark: read as --since if present, "
+                                               "updated after a successful export")
+    export_parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE, help="Runs per chunk")
+
+    import_parser = commands.add_parser("import", help="Import an export file")
+    import_parser.add_argument("input", help="File written by 'export'")
+    import_parser.add_argument("-f", "--format", choices=EXPORT_FORMATS, help="Input format (default: from extension)")
+    import_parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="Runs per transaction")
+    args = parser.parse_args()
+
+    create_table_if_not_exists()
+    try:
+        if args.command == "export":
+            _export(args)
+        else:
+            _import(args)
+    except (ValueError, RuntimeError, OSError, sqlite3.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,23 @@
 import os
 import json
 import uuid
-import sqlite3
 import re
-from openai import OpenAI
+import math
+import asyncio
 from dotenv import load_dotenv
-from database import get_db_connection
-from prompts import get_participant_system_prompt, get_interrogator_system_prompt, get_judgment_prompt
+from database import (start_game_run, append_game_turn, complete_game_run, set_game_status,
+                      load_game_checkpoint, build_conversation, create_table_if_not_exists)
+from llm_client import acreate_chat_completion, run_sync, iterate_sync, LLMError
+import llm_cache
+from metrics import ModelCall
+from context import ContextManager, CONTEXT_SUMMARY_MODEL
+from get_models import supports_parameter
+from prompts import (get_participant_system_prompt, get_interrogator_system_prompt, get_judgment_prompt,
+                     get_confidence_prompt, get_judgment_repair_prompt, JUDGMENT_SCHEMA)
 
 load_dotenv()
 
 
-API_KEY = os.getenv("OPENROUTER_API_KEY")
-
-
-HTTP_REFERER = os.getenv("HTTP_REFERER", "<YOUR_SITE_URL>")
-X_TITLE = os.getenv("X_TITLE", "<YOUR_SITE_NAME>")
-
 # Default models for the game
 # The "Participant" model tries to act as a person. Creative, conversational models work well.
 PARTICIPANT_MODEL = "moonshotai/kimi-k2"
@@ -26,75 +27,495 @@ INTERROGATOR_MODEL = "openai/gpt-4o-mini"
 # The number of questions the interrogator gets to ask.
 NUMBER_OF_QUESTIONS = 5
 
+# Adaptive games: after each answer (from the minimum on) the interrogator rates its confidence, and the
+# game goes straight to the judgment once it reaches the threshold. NUMBER_OF_QUESTIONS stays the maximum.
+ADAPTIVE_MIN_QUESTIONS = int(os.getenv("ADAPTIVE_MIN_QUESTIONS", "2"))
+ADAPTIVE_CONFIDENCE_THRESHOLD = float(os.getenv("ADAPTIVE_CONFIDENCE_THRESHOLD", "0.85"))
 
-# --- API Client Setup ---
-client = OpenAI(
-  base_url="https://openrouter.ai/api/v1",
-  api_key=API_KEY,
-)
+# Model for the follow-up call that extracts a verdict from an unparseable judgment; defaults to the interrogator.
+JUDGMENT_REPAIR_MODEL = os.getenv("JUDGMENT_REPAIR_MODEL") or None
 
-def get_llm_response(model: str, messages: list) -> str:
+# Judge panel: extra models that judge every finished transcript alongside the interrogator (repeat a model to
+# sample it several times), and how the verdicts are combined: "majority" or "confidence" (weighted vote).
+JUDGE_PANEL = [model.strip() for model in os.getenv("JUDGE_PANEL", "").split(",") if model.strip()]
+JUDGE_AGGREGATION = os.getenv("JUDGE_AGGREGATION", "majority").lower()
+JUDGE_AGGREGATIONS = ("majority", "confidence")
+
+
+async def _cached_response(model, messages, **params):
+    """
+    Looks a request up in the response cache according to the cache mode.
+
+    Returns (cache_key, cached_text); the key is None when caching is off.
+    Raises CacheMissError on a miss in replay mode.
+    """
+    mode = llm_cache.get_cache_mode()
+    if mode == "off":
+        return None, None
+    key = llm_cache.cache_key(model, messages, **params)
+    cached = await llm_cache.aget(key)
+    if cached is None and mode == "replay":
+        raise llm_cache.CacheMissError(f"No cached response for model {model} (replay mode)")
+    return key, cached
+
+async def aget_llm_response(model: str, messages: list, call: ModelCall = None, **params) -> str:
     """
     Calls the OpenRouter API to get a response from a specified model.
+
+    Uses the shared, pooled async client from llm_client, which picks up the
+    latest API key, waits out rate limits and retries transient failures.
+    Raises LLMError if the model still cannot respond, so a failed call is
+    never recorded as a transcript turn. Responses go through the optional
+    llm_cache according to LLM_CACHE_MODE.
+
+    Latency, token usage and cost are recorded through `call` (a ModelCall
+    tagged with the game, role and turn; an untagged one is used if omitted).
+    Extra `params` (e.g. response_format) are passed on to the API.
+    """
+    call = call or ModelCall(model)
+    key, cached = await _cached_response(model, messages, **params)
+    if cached is not None:
+        await call.afinish("cached")
+        return cached
+
+    try:
+        completion = await acreate_chat_completion(model, messages, **params)
+        call.set_usage(completion.usage)
+        content = completion.choices[0].message.content.strip()
+    except Exception as e:
+        print(f"API error with model {model}: {e}")
+        await call.afinish("error")
+        raise LLMError(f"Model {model} is unable to respond: {e}") from e
+
+    await call.afinish()
+    if key is not None:
+        await llm_cache.aput(key, model, content)
+    return content
+
+async def astream_llm_response(model: str, messages: list, call: ModelCall = None, **params):
+    """
+    Streams a response from a specified model, yielding text deltas as they arrive.
+
+    Raises LLMError if the call fails, including part-way through the stream.
+    A cache hit is yielded as a single delta. Latency, time to first token,
+    token usage and cost are recorded through `call`, as in aget_llm_response.
     """
-    # Initialize client here to ensure it picks up the latest API key
-    client = OpenAI(
-      base_url="https://openrouter.ai/api/v1",
-      api_key=os.getenv("OPENROUTER_API_KEY"),
-    )
+    call = call or ModelCall(model)
+    key, cached = await _cached_response(model, messages, **params)
+    if cached is not None:
+        await call.afinish("cached")
+        yield cached
+        return
+
+    parts = []
     try:
-        completion = client.chat.completions.create(
-            extra_headers={
-                "HTTP-Referer": HTTP_REFERER,
-                "X-Title": X_TITLE,
-            },
-            model=model,
-            messages=messages
-        )
-        return completion.choices[0].message.content.strip()
+        # include_usage adds a final chunk (with no choices) carrying the token counts
+        stream = await acreate_chat_completion(model, messages, stream=True,
+                                               stream_options={"include_usage": True}, **params)
+        async for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                call.set_usage(chunk.usage)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                call.first_token()
+                parts.append(delta)
+                yield delta
     except Exception as e:
         print(f"API error with model {model}: {e}")
-        return "I am unable to respond at the moment. Please check your API key and try again."
+        await call.afinish("error")
+        raise LLMError(f"Model {model} is unable to respond: {e}") from e
+
+    await call.afinish()
+    if key is not None:
+        await llm_cache.aput(key, model, "".join(parts).strip())
+
+def get_llm_response(model: str, messages: list) -> str:
+    """Synchronous wrapper around aget_llm_response."""
+    return run_sync(aget_llm_response(model, messages))
+
+def stream_llm_response(model: str, messages: list):
+    """Synchronous wrapper around astream_llm_response."""
+    return iterate_sync(astream_llm_response(model, messages))
+
+def _context_manager(model, role, run_id):
+    """Returns the ContextManager for one side of a game; its summaries are recorded as 'summary' calls."""
+    summary_model = CONTEXT_SUMMARY_MODEL or model
+
+    async def summarize(messages):
+        return await aget_llm_response(summary_model, messages, ModelCall(summary_model, run_id, "summary"))
+
+    return ContextManager(model, role, summarize)
+
+async def _model_turn(model, messages, role, turn, stream, run_id=None, context=None, **params):
+    """
+    Runs one model turn, yielding event dicts.
+
+    When streaming, "delta" events with partial text come first. The last
+    event is always the "turn_complete" event holding the full, stripped text.
+    The model call is recorded against `run_id`, `role` and `turn`. With a
+    ContextManager, the transcript is trimmed/summarized to fit before sending.
+    Extra `params` are passed on with the request.
+    """
+    if context is not None:
+        messages = await context.prepare(messages)
+    call = ModelCall(model, run_id, role, turn)
+    if stream:
+        parts = []
+        async for delta in astream_llm_response(model, messages, call, **params):
+            parts.append(delta)
+            event = {"type": "delta", "role": role, "delta": delta}
+            if turn is not None:
+                event["turn"] = turn
+            yield event
+        content = "".join(parts).strip()
+    else:
+        content = await aget_llm_response(model, messages, call, **params)
+
+    event = {"type": "turn_complete", "role": role, "content": content}
+    if turn is not None:
+        event["turn"] = turn
+    yield event
+
+def parse_confidence(text):
+    """
+    Parses the interrogator's confidence reply into (leaning, confidence).
+
+    Accepts the requested JSON object, or failing that a bare number
+    (percentages are scaled). Returns None if no confidence can be found.
+    """
+    leaning = None
+    confidence = None
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if match:
+        try:
+            data = json.loads(match.group(0))
+            leaning = str(data.get("leaning", "")).strip().lower() or None
+            confidence = float(data["confidence"])
+        except (ValueError, TypeError, KeyError, AttributeError):
+            confidence = None
+    if confidence is None:
+        number = re.search(r"\d+(?:\.\d+)?", text)
+        if not number:
+            return None
+        confidence = float(number.group(0))
+        leaning = leaning or next((word for word in ("human", "ai") if re.search(rf"\b{word}\b", text, re.IGNORECASE)), None)
+    if confidence > 1:
+        confidence /= 100
+    if leaning not in ("human", "ai"):
+        leaning = None
+    return leaning, min(max(confidence, 0.0), 1.0)
+
+async def _assess_confidence(model, messages, context, run_id, number):
+    """
+    Asks the interrogator how confident it is after `number` answers.
+
+    The request is a side call: neither it nor the reply joins the transcript.
+    Returns a "confidence" event, with confidence None if the reply could not
+    be parsed or the call failed (the game then simply continues).
+    """
+    request = await context.prepare(messages + [{"role": "user", "content": get_confidence_prompt()}])
+    try:
+        reply = await aget_llm_response(model, request, ModelCall(model, run_id, "confidence", number))
+        parsed = parse_confidence(reply)
+    except llm_cache.CacheMissError:
+        raise
+    except LLMError as e:
+        print(f"Confidence check failed for game {run_id}, continuing: {e}")
+        parsed = None
+    leaning, confidence = parsed or (None, None)
+    return {"type": "confidence", "role": "interrogator", "turn": number, "leaning": leaning,
+            "confidence": confidence}
+
+def normalize_verdict(value):
+    """Maps a verdict in any casing ("ai", "Ai", "HUMAN", ...) to "Human" or "AI"; anything else is None."""
+    value = str(value or "").strip().strip(".").lower()
+    return {"human": "Human", "ai": "AI"}.get(value)
+
+def parse_judgment(text):
+    """
+    Parses a judgment reply into {"verdict", "confidence", "reasoning"}.
+
+    Accepts the requested JSON object (also inside a code fence or
+    surrounding prose) and, for models that ignore the format, a
+    "Final Verdict: Human/AI" line. Returns None if no verdict can be found.
+    """
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if match:
+        try:
+            data = json.loads(match.group(0))
+        except ValueError:
+            data = None
+        if isinstance(data, dict) and normalize_verdict(data.get("verdict")):
+            try:
+                confidence = min(max(float(data.get("confidence")), 0.0), 1.0)
+            except (TypeError, ValueError):
+                confidence = None
+            # Without a reasoning field, fall back to any prose before the object (minus a code fence)
+            reasoning = str(data.get("reasoning") or "").strip() or \
+                re.sub(r"```(?:json)?\s*$", "", text[:match.start()]).strip()
+            return {"verdict": normalize_verdict(data["verdict"]), "confidence": confidence, "reasoning": reasoning}
+
+    verdict_match = re.search(r"Final Verdict:\s*\**\s*(Human|AI)\b", text, re.IGNORECASE)
+    if verdict_match:
+        # Remove the verdict line from the judgment text for a cleaner log
+        reasoning = re.sub(r"^\s*\**\s*Final Verdict:.*$", "", text, flags=re.MULTILINE | re.IGNORECASE).strip()
+        return {"verdict": normalize_verdict(verdict_match.group(1)), "confidence": None, "reasoning": reasoning}
+    return None
+
+async def _judgment_params(model):
+    """
+    Returns the request params asking `model` for a structured judgment:
+    a JSON schema where the catalogue says the model supports structured
+    outputs, plain JSON mode where it supports response_format, else none
+    (the prompt alone asks for JSON).
+    """
+    loop = asyncio.get_running_loop()
+    if await loop.run_in_executor(None, supports_parameter, model, "structured_outputs"):
+        return {"response_format": {"type": "json_schema", "json_schema": JUDGMENT_SCHEMA}}
+    if await loop.run_in_executor(None, supports_parameter, model, "response_format"):
+        return {"response_format": {"type": "json_object"}}
+    return {}
 
-def save_game_run(run_id, interrogator_model, participant_model, interrogator_system_prompt, participant_system_prompt, conversation, judgment, verdict, run_by):
-    """Saves the completed game run to the database.
+async def _repair_judgment(model, judgment_text, run_id):
+    """
+    Follow-up call for a judgment that could not be parsed: sends only the
+    judgment text (not the transcript) and asks which verdict it reached.
+    Returns the parsed judgment, with the original text as reasoning, or None.
+    """
+    repair_model = JUDGMENT_REPAIR_MODEL or model
+    messages = [{"role": "user", "content": get_judgment_repair_prompt(judgment_text)}]
+    try:
+        reply = await aget_llm_response(repair_model, messages, ModelCall(repair_model, run_id, "judgment_repair"))
+    except llm_cache.CacheMissError:
+        raise
+    except LLMError as e:
+        print(f"Judgment repair failed for game {run_id}: {e}")
+        return None
+    parsed = parse_judgment(reply)
+    if parsed is not None:
+        parsed["reasoning"] = judgment_text
+    return parsed
+
+async def _resolve_judgment(model, text, run_id):
+    """
+    Parses a judgment, falling back to the repair call and then to "Unknown".
+    Returns (judgment, repaired).
+    """
+    judgment = parse_judgment(text)
+    if judgment is not None:
+        return judgment, False
+    # Rather than losing the game as "Unknown", ask (cheaply) which verdict the text reached
+    judgment = await _repair_judgment(model, text, run_id)
+    if judgment is not None:
+        return judgment, True
+    return {"verdict": "Unknown", "confidence": None, "reasoning": text.strip()}, False
+
+async def judge_transcript(model, sample, messages, run_id, role="judge"):
+    """
+    One judge's verdict on a finished transcript (ending with the judgment
+    prompt), for game panels and for re-judging stored games. Repeated
+    samples of a model are sent a different seed (which also keeps them
+    apart in the response cache). A judge that fails is returned with
+    verdict None rather than raising.
+    """
+    context = _context_manager(model, "interrogator", run_id)
+    params = await _judgment_params(model)
+    if sample:
+        params["seed"] = sample
+    try:
+        request = await context.prepare(messages)
+        text = await aget_llm_response(model, request, ModelCall(model, run_id, role, sample), **params)
+        judgment, _ = await _resolve_judgment(model, text, run_id)
+    except llm_cache.CacheMissError:
+        raise
+    except LLMError as e:
+        print(f"Judge {model} failed for game {run_id}: {e}")
+        judgment = {"verdict": None, "confidence": None, "reasoning": None}
+    return {"judge_model": model, "sample": sample, **judgment}
+
+def _panel_samples(interrogator_model, judges):
+    """Returns (model, sample) for each extra judge; sample counts earlier judgments by the same model."""
+    counts = {interrogator_model: 1}
+    samples = []
+    for model in judges:
+        samples.append((model, counts.get(model, 0)))
+        counts[model] = counts.get(model, 0) + 1
+    return samples
+
+def _log_odds(confidence):
+    # Unstated confidence counts as a moderate 0.75; the clamp keeps one certain judge from outvoting everyone
+    confidence = min(max(confidence if confidence is not None else 0.75, 0.5), 0.99)
+    return math.log(confidence / (1 - confidence))
+
+def validate_judge_panel(judges, aggregation):
+    """Raises ValueError unless `judges` is None or a list of model ids and `aggregation` is None or known."""
+    if judges is not None and (not isinstance(judges, list) or not all(isinstance(j, str) and j for j in judges)):
+        raise ValueError("judges must be a list of model ids")
+    if aggregation is not None and aggregation.lower() not in JUDGE_AGGREGATIONS:
+        raise ValueError(f"judge_aggregation must be one of {', '.join(JUDGE_AGGREGATIONS)}")
+
+def aggregate_verdicts(judgments, method="majority"):
+    """
+    Combines judges' verdicts into (verdict, confidence).
+
+    "majority" counts votes (confidence is the winning share; ties are
+    settled by the weighted vote). "confidence" sums each judge's log-odds,
+    so sure judges count for more (confidence is the combined probability).
+    Judges without a Human/AI verdict do not vote; with no votes the
+    result is ("Unknown", None).
+    """
+    votes = [j for j in judgments if j["verdict"] in ("Human", "AI")]
+    if not votes:
+        return "Unknown", None
+    if method == "majority":
+        ai = sum(1 for j in votes if j["verdict"] == "AI")
+        if ai * 2 != len(votes):
+            return ("AI" if ai * 2 > len(votes) else "Human"), round(max(ai, len(votes) - ai) / len(votes), 3)
+    score = sum(_log_odds(j["confidence"]) * (1 if j["verdict"] == "AI" else -1) for j in votes)
+    if score == 0:
+        return votes[0]["verdict"], 0.5
+    return ("AI" if score > 0 else "Human"), round(1 / (1 + math.exp(-abs(score))), 3)
+
+async def _checkpoint(func, *args):
+    """Runs a blocking database checkpoint call off the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+def save_game_run(run_id, judgment_prompt, judgment, verdict, confidence=None, judgments=()):
+    """Completes a checkpointed game run in the database.
     
     Args:
         run_id: Unique identifier for this game run
-        interrogator_model: Model used as interrogator
-        participant_model: Model used as participant
-        interrogator_system_prompt: System prompt for interrogator
-        participant_system_prompt: System prompt for participant
-        conversation: Full conversation history
+        judgment_prompt: Prompt that asked the interrogator for its verdict
         judgment: Interrogator's reasoning
-        verdict: Final verdict (Human/AI)
-        run_by: Identifier for who ran the game
+        verdict: Final verdict (Human/AI, or Unknown)
+        confidence: Confidence in the verdict (0-1), if known
+        judgments: Each judge's verdict, for the judgments table
     """
-    conn = get_db_connection()
-    if conn is None:
-        return
+    if complete_game_run(run_id, judgment_prompt, judgment, verdict, confidence, judgments):
+        print(f"Game run {run_id} saved successfully to SQLite.")
+
+async def _play_game(run_id, participant_model, interrogator_model, num_questions, stream,
+                     participant_system_prompt, interrogator_system_prompt, turns=(),
+                     min_questions=None, confidence_threshold=None, judges=(), aggregation=JUDGE_AGGREGATION):
+    """
+    Plays a game from the given point, checkpointing every turn.
+
+    `turns` are the questions and answers already played ({speaker, content}
+    in order, as stored in the database); both transcripts are rebuilt from
+    them and the game continues with the next turn.
+
+    With a `confidence_threshold` the game is adaptive: before each question
+    after the first `min_questions` answers, the interrogator's confidence is
+    checked (yielding a "confidence" event) and the game moves on to the
+    judgment once it reaches the threshold. A resumed game re-checks before
+    its next question.
+
+    Extra `judges` judge the finished transcript concurrently with the
+    interrogator's own (streamed) judgment, and the verdicts are combined
+    by `aggregation` (see aggregate_verdicts).
+    """
+    conversation = build_conversation(interrogator_system_prompt, participant_system_prompt, None, turns)
+    interrogator_messages = conversation["interrogator_transcript"]
+    participant_messages = conversation["participant_transcript"]
+    # What is actually sent each turn is decided by the context strategy (see context.py)
+    interrogator_context = _context_manager(interrogator_model, "interrogator", run_id)
+    participant_context = _context_manager(participant_model, "human", run_id)
+
+    # Questions and answers alternate: odd seqs are questions, even seqs the answers to them
+    for seq in range(len(turns) + 1, 2 * num_questions + 1):
+        number = (seq + 1) // 2
+        if seq % 2 and confidence_threshold is not None and number - 1 >= max(min_questions or 1, 1):
+            event = await _assess_confidence(interrogator_model, interrogator_messages, interrogator_context,
+                                             run_id, number - 1)
+            event["stop"] = event["confidence"] is not None and event["confidence"] >= confidence_threshold
+            yield json.dumps(event)
+            if event["stop"]:
+                break
+        if seq % 2:
+            # The interrogator asks the next question
+            async for event in _model_turn(interrogator_model, interrogator_messages, "interrogator", number, stream,
+                                           run_id, interrogator_context):
+                yield json.dumps(event)
+            question = event["content"]
+            interrogator_messages.append({"role": "assistant", "content": question})
+            participant_messages.append({"role": "user", "content": question})
+            await _checkpoint(append_game_turn, run_id, seq, "interrogator", question)
+        else:
+            # The participant model answers it
+            async for event in _model_turn(participant_model, participant_messages, "human", number, stream, run_id,
+                                           participant_context):
+                yield json.dumps(event)
+            answer = event["content"]
+            participant_messages.append({"role": "assistant", "content": answer})
+            # Add the participant's answer to the interrogator's conversation history
+            interrogator_messages.append({"role": "user", "content": answer})
+            await _checkpoint(append_game_turn, run_id, seq, "participant", answer)
 
+    # --- Final Judgment ---
+    judgment_prompt = get_judgment_prompt()
+    
+    interrogator_messages.append({"role": "user", "content": judgment_prompt})
+    
+    # The panel judges the same transcript while the interrogator's judgment streams
+    panel = [asyncio.ensure_future(judge_transcript(model, sample, list(interrogator_messages), run_id))
+             for model, sample in _panel_samples(interrogator_model, judges)]
     try:
-        cursor = conn.cursor()
-        sql = """
-            INSERT INTO game_runs (run_id, interrogator_model, participant_model, interrogator_system_prompt, participant_system_prompt, conversation, judgment, verdict, run_by)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
-        val = (run_id, interrogator_model, participant_model, interrogator_system_prompt, participant_system_prompt, json.dumps(conversation), judgment, verdict, run_by)
-        cursor.execute(sql, val)
-        conn.commit()
-        print(f"Game run {run_id} saved successfully to SQLite.")
-    except sqlite3.Error as e:
-        print(f"Error saving game run to SQLite: {e}")
-    finally:
-        if conn:
-            conn.close()
+        judgment_params = await _judgment_params(interrogator_model)
+        async for event in _model_turn(interrogator_model, interrogator_messages, "judgment", None, stream, run_id,
+                                       interrogator_context, **judgment_params):
+            yield json.dumps(event)
+        final_judgment_text = event["content"]
+        judgment, repaired = await _resolve_judgment(interrogator_model, final_judgment_text, run_id)
+        panel_judgments = await asyncio.gather(*panel)
+    except BaseException:
+        for task in panel:
+            task.cancel()
+        raise
 
-def play_turing_test_game(participant_model, interrogator_model, num_questions):
+    # --- Save Game Run ---
+    judgments = [{"judge_model": interrogator_model, "sample": 0, **judgment}, *panel_judgments]
+    verdict, confidence = judgment["verdict"], judgment["confidence"]
+    event = {"type": "verdict", "role": "judgment", "verdict": verdict, "confidence": confidence,
+             "reasoning": judgment["reasoning"], "repaired": repaired}
+    if panel_judgments:
+        verdict, confidence = aggregate_verdicts(judgments, aggregation)
+        event.update(verdict=verdict, confidence=confidence, aggregation=aggregation, panel=[
+            {key: j[key] for key in ("judge_model", "sample", "verdict", "confidence")} for j in judgments
+        ])
+    yield json.dumps(event)
+    await _checkpoint(save_game_run, run_id, judgment_prompt, judgment["reasoning"], verdict, confidence, judgments)
+
+async def play_turing_test_game_async(participant_model, interrogator_model, num_questions, stream=False,
+                                      run_id=None, run_by="webapp", adaptive=False,
+                                      min_questions=ADAPTIVE_MIN_QUESTIONS,
+                                      confidence_threshold=ADAPTIVE_CONFIDENCE_THRESHOLD,
+                                      judges=None, judge_aggregation=None):
     """
     Main function to orchestrate the Turing Test game between two LLMs.
+
+    Async generator yielding one JSON event per completed turn
+    (``"type": "turn_complete"``). With ``stream=True``, completions are
+    streamed and ``"type": "delta"`` events carrying partial text (with the
+    same role/turn ids) are yielded before each turn's completion event.
+    ``run_id`` is generated if not given; ``run_by`` is stored with the run.
+
+    With ``adaptive=True``, ``num_questions`` is a maximum: after at least
+    ``min_questions`` answers the game goes to the judgment as soon as the
+    interrogator's confidence reaches ``confidence_threshold``, and
+    ``"type": "confidence"`` events report each check.
+
+    ``judges`` (default: JUDGE_PANEL) are extra models that judge the
+    finished transcript alongside the interrogator; their verdicts are
+    combined by ``judge_aggregation`` ("majority" or "confidence") and
+    reported in the final ``"type": "verdict"`` event.
+
+    The run is checkpointed to the database after every turn; if it fails
+    part-way it is marked failed and can be continued with
+    resume_turing_test_game_async.
     """
-    run_id = str(uuid.uuid4())
+    run_id = run_id or str(uuid.uuid4())
     print(f"--- Welcome to the LLM Turing Test Game (Run ID: {run_id}) ---")
     print(f"Interrogator Model: {interrogator_model}")
     print(f"'Participant' Model: {participant_model}\n")
@@ -102,69 +523,72 @@ def play_turing_test_game(participant_model, interrogator_model, num_questions):
     # System prompts define the roles for each LLM
     participant_system_prompt = get_participant_system_prompt()
 
-    interrogator_system_prompt = get_interrogator_system_prompt(num_questions)
+    interrogator_system_prompt = get_interrogator_system_prompt(num_questions, adaptive)
 
-    participant_messages = [{"role": "system", "content": participant_system_prompt}]
-    interrogator_messages = [{"role": "system", "content": interrogator_system_prompt}]
+    if not adaptive:
+        min_questions = confidence_threshold = None
+    elif not 0 < confidence_threshold <= 1:
+        raise ValueError("confidence_threshold must be between 0 and 1")
+    validate_judge_panel(judges, judge_aggregation)
+    judges = list(JUDGE_PANEL if judges is None else judges)
+    judge_aggregation = (judge_aggregation or JUDGE_AGGREGATION).lower()
 
-    # The interrogator asks the first question to kick off the game
-    question = get_llm_response(interrogator_model, interrogator_messages)
-    interrogator_messages.append({"role": "assistant", "content": question})
-    yield json.dumps({"role": "interrogator", "content": question, "turn": 1})
+    if not await _checkpoint(start_game_run, run_id, interrogator_model, participant_model,
+                             interrogator_system_prompt, participant_system_prompt, num_questions, run_by,
+                             min_questions, confidence_threshold, judges, judge_aggregation):
+        raise RuntimeError(f"Could not create game run {run_id} in the database")
 
-    # Main game loop for the specified number of turns
-    for i in range(num_questions):
-        # 1. The participant model answers the question
-        participant_messages.append({"role": "user", "content": question})
-        answer = get_llm_response(participant_model, participant_messages)
-        participant_messages.append({"role": "assistant", "content": answer})
-        yield json.dumps({"role": "human", "content": answer})
+    try:
+        async for message in _play_game(run_id, participant_model, interrogator_model, num_questions, stream,
+                                        participant_system_prompt, interrogator_system_prompt,
+                                        min_questions=min_questions, confidence_threshold=confidence_threshold,
+                                        judges=judges, aggregation=judge_aggregation):
+            yield message
+    except BaseException as e:
+        await asyncio.shield(_checkpoint(set_game_status, run_id, "failed", str(e) or type(e).__name__))
+        raise
 
-        # Add the participant's answer to the interrogator's conversation history
-        interrogator_messages.append({"role": "user", "content": answer})
+async def resume_turing_test_game_async(run_id, stream=False):
+    """
+    Continues a checkpointed game from its last completed turn.
 
-        # 2. If it's not the last turn, the interrogator asks the next question
-        if i < num_questions - 1:
-            question = get_llm_response(interrogator_model, interrogator_messages)
-            interrogator_messages.append({"role": "assistant", "content": question})
-            yield json.dumps({"role": "interrogator", "content": question, "turn": i + 2})
+    Yields events like play_turing_test_game_async, for the remaining turns
+    only. Raises ValueError if the run cannot be resumed.
+    """
+    checkpoint = await _checkpoint(load_game_checkpoint, run_id)
+    if checkpoint is None:
+        raise ValueError(f"Game run {run_id} has no checkpoint to resume from")
+    if checkpoint["status"] == "complete":
+        raise ValueError(f"Game run {run_id} is already complete")
 
-    # --- Final Judgment ---
-    judgment_prompt = get_judgment_prompt()
-    
-    interrogator_messages.append({"role": "user", "content": judgment_prompt})
-    
-    final_judgment_text = get_llm_response(interrogator_model, interrogator_messages)
-    yield json.dumps({"role": "judgment", "content": final_judgment_text})
+    print(f"--- Resuming game {run_id} after {len(checkpoint['turns'])} turns ---")
+    await _checkpoint(set_game_status, run_id, "running")
+    try:
+        async for message in _play_game(
+            run_id, checkpoint["participant_model"], checkpoint["interrogator_model"], checkpoint["num_questions"],
+            stream, checkpoint["participant_system_prompt"], checkpoint["interrogator_system_prompt"],
+            checkpoint["turns"], checkpoint["min_questions"], checkpoint["confidence_threshold"],
+            checkpoint["judges"], checkpoint["aggregation"] or JUDGE_AGGREGATION
+        ):
+            yield message
+    except BaseException as e:
+        await asyncio.shield(_checkpoint(set_game_status, run_id, "failed", str(e) or type(e).__name__))
+        raise
 
-    # --- Save Game Run ---
-    verdict = "Unknown"
-    judgment_for_db = final_judgment_text.strip()
+def play_turing_test_game(participant_model, interrogator_model, num_questions, stream=False, run_id=None, run_by="webapp",
+                          adaptive=False, min_questions=ADAPTIVE_MIN_QUESTIONS,
+                          confidence_threshold=ADAPTIVE_CONFIDENCE_THRESHOLD, judges=None, judge_aggregation=None):
+    """
+    Synchronous wrapper around play_turing_test_game_async.
 
-    # Use regex to find the verdict and clean the judgment text
-    verdict_match = re.search(r"Final Verdict:\s*(Human|AI)", final_judgment_text, re.IGNORECASE)
-    if verdict_match:
-        verdict = verdict_match.group(1).capitalize()
-        # Remove the verdict line from the judgment text for a cleaner log
-        judgment_for_db = re.sub(r"^\s*Final Verdict:.*$", "", judgment_for_db, flags=re.MULTILINE | re.IGNORECASE).strip()
-
-    # The full conversation history for context
-    conversation_history = {
-        "interrogator_transcript": interrogator_messages,
-        "participant_transcript": participant_messages
-    }
-
-    save_game_run(
-        run_id=run_id,
-        interrogator_model=interrogator_model,
-        participant_model=participant_model,
-        interrogator_system_prompt=interrogator_system_prompt,
-        participant_system_prompt=participant_system_prompt,
-        conversation=conversation_history,
-        judgment=judgment_for_db,
-        verdict=verdict,
-        run_by="webapp"  # Or could be a user ID in a multi-user system
-    )
+    The game runs on the shared background event loop; events are yielded
+    to the caller as they are produced.
+    """
+    yield from iterate_sync(play_turing_test_game_async(
+        participant_model, interrogator_model, num_questions, stream=stream, run_id=run_id, run_by=run_by,
+        adaptive=adaptive, min_questions=min_questions, confidence_threshold=confidence_threshold,
+        judges=judges, judge_aggregation=judge_aggregation
+    ))
 
 
 if __name__ == "__main__":
@@ -177,5 +601,6 @@ if __name__ == "__main__":
         print("Warning: OPENROUTER_API_KEY is not set or is a placeholder.")
         print("Please create a .env file in the project root and add your key.")
     else:
+        create_table_if_not_exists()
         for message in play_turing_test_game(PARTICIPANT_MODEL, INTERROGATOR_MODEL, NUMBER_OF_QUESTIONS):
             print(message)
@@ -1,32 +1,256 @@
 import requests
+import hashlib
 import json
+import os
+import threading
+import time
+
+MODELS_URL = os.getenv("MODELS_URL", "https://openrouter.ai/api/v1/models")
+
+# How long a fetched catalogue is served before it is revalidated in the background
+MODELS_CACHE_TTL = float(os.getenv("MODELS_CACHE_TTL", "3600"))
+MODELS_CACHE_FILE = os.getenv("MODELS_CACHE_FILE", "models_cache.json")
+REQUEST_TIMEOUT = (5, 30)  # (connect, read) seconds
+# Delay before retrying after a failed fetch, doubling per consecutive failure up to the maximum (seconds)
+RETRY_BACKOFF_MIN = 5.0
+RETRY_BACKOFF_MAX = 300.0
+
+# In-process cache: the filtered model list plus the validators needed for conditional requests
+_cache = {"models": None, "fetched_at": 0.0, "etag": None, "last_modified": None}
+_cache_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+# Consecutive failed fetches and when the last one failed, so a down upstream is not retried on every request
+_failures = {"count": 0, "at": 0.0}
+
+# Slim projection and search index, rebuilt once per catalogue refresh
+_index = {"source": None}
+_index_lock = threading.Lock()
 
 
 def get_model_list():
     """
-    Fetches the list of models from the OpenRouter API and filters to only include
-    models that support text input and text output.
+    Returns the list of text-capable models from the OpenRouter API.
+
+    The filtered list is cached in memory and on disk. Within MODELS_CACHE_TTL
+    it is returned without any network access; after that the stale list is
+    still returned immediately while a background thread revalidates it
+    (stale-while-revalidate). Only the first calls, with no cache on disk,
+    wait for the upstream, all on the same fetch. After a failed fetch the
+    upstream is retried with exponential backoff rather than on every call.
 
     Returns:
-        list: A list of text-capable models if the request is successful, otherwise an empty list.
+        list: A list of text-capable models if available, otherwise an empty list.
+    """
+    with _cache_lock:
+        if _cache["models"] is None:
+            _load_disk_cache()
+        models = _cache["models"]
+        age = time.time() - _cache["fetched_at"]
+        backing_off = _backing_off()
+
+    if models is None:
+        if not backing_off:
+            refresh_model_list(wait=True)
+        with _cache_lock:
+            return _cache["models"] or []
+
+    if age > MODELS_CACHE_TTL and not backing_off and not _refresh_lock.locked():
+        threading.Thread(target=refresh_model_list, name="models-refresh", daemon=True).start()
+    return models
+
+
+def _backing_off():
+    """Returns True while the last failed fetch is more recent than the retry delay. Caller holds _cache_lock."""
+    if not _failures["count"]:
+        return False
+    delay = min(RETRY_BACKOFF_MIN * 2 ** (_failures["count"] - 1), RETRY_BACKOFF_MAX)
+    return time.time() - _failures["at"] < delay
+
+
+def refresh_model_list(wait=False):
     """
-    url = "https://openrouter.ai/api/v1/models"
+    Revalidates the cached catalogue against OpenRouter.
+
+    Sends If-None-Match/If-Modified-Since so an unchanged catalogue costs a
+    304 instead of a full download. On failure the existing cache is kept
+    and the failure is recorded for the retry backoff. Concurrent refreshes
+    are collapsed into one: with wait=True the caller waits for one already
+    in flight (up to the request timeout) instead of returning at once.
+    """
+    if wait:
+        acquired = _refresh_lock.acquire(timeout=sum(REQUEST_TIMEOUT))
+    else:
+        acquired = _refresh_lock.acquire(blocking=False)
+    if not acquired:
+        return
     try:
-        response = requests.get(url)
-        response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
-        models = response.json()
-        all_models = models.get("data", [])
-        
+        headers = {}
+        with _cache_lock:
+            # A waiter's work may have been done (or failed) by the refresh it waited for
+            if wait and (_cache["models"] is not None or _backing_off()):
+                return
+            if _cache["models"] is not None:
+                if _cache["etag"]:
+                    headers["If-None-Match"] = _cache["etag"]
+                if _cache["last_modified"]:
+                    headers["If-Modified-Since"] = _cache["last_modified"]
+
+        try:
+            response = requests.get(MODELS_URL, headers=headers, timeout=REQUEST_TIMEOUT)
+            if response.status_code == 304:
+                with _cache_lock:
+                    _cache["fetched_at"] = time.time()
+                    _failures["count"] = 0
+                    _save_disk_cache()
+                return
+            response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
+            all_models = response.json().get("data", [])
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Error fetching models: {e}")
+            with _cache_lock:
+                _failures["count"] += 1
+                _failures["at"] = time.time()
+            return
+
         # Filter models to only include those with text input and output modalities
-        text_models = []
-        for model in all_models:
-            if _supports_text_modalities(model):
-                text_models.append(model)
-        
-        return text_models
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching models: {e}")
-        return []
+        text_models = [model for model in all_models if _supports_text_modalities(model)]
+
+        with _cache_lock:
+            _cache["models"] = text_models
+            _cache["fetched_at"] = time.time()
+            _cache["etag"] = response.headers.get("ETag")
+            _cache["last_modified"] = response.headers.get("Last-Modified")
+            _failures["count"] = 0
+            _save_disk_cache()
+    finally:
+        _refresh_lock.release()
+
+
+def _load_disk_cache():
+    """Loads the on-disk catalogue into the in-process cache. Caller holds _cache_lock."""
+    try:
+        with open(MODELS_CACHE_FILE, "r") as f:
+            data = json.load(f)
+        _cache.update({
+            "models": data["models"],
+            "fetched_at": data.get("fetched_at", 0.0),
+            "etag": data.get("etag"),
+            "last_modified": data.get("last_modified"),
+        })
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Ignoring unreadable models cache {MODELS_CACHE_FILE}: {e}")
+
+
+def _save_disk_cache():
+    """Atomically writes the in-process cache to disk. Caller holds _cache_lock."""
+    tmp_file = MODELS_CACHE_FILE + ".tmp"
+    try:
+        with open(tmp_file, "w") as f:
+            json.dump(_cache, f)
+        os.replace(tmp_file, MODELS_CACHE_FILE)
+    except OSError as e:
+        print(f"Error writing models cache {MODELS_CACHE_FILE}: {e}")
+
+
+def get_model_index():
+    """
+    Returns the slim model index for the current catalogue.
+
+    The index is built once per catalogue refresh and holds:
+        slim: compact model dicts (id, name, context_length, pricing), sorted by name
+        providers: sorted provider prefixes
+        by_id: full model dicts by id
+        search_keys: lowercased "id name" strings aligned with slim
+        version: content hash of the catalogue, for HTTP ETags
+    """
+    models = get_model_list()
+    with _index_lock:
+        if _index["source"] is not models:
+            _index.update(_build_index(models))
+            _index["source"] = models
+        return _index
+
+
+def get_model(model_id):
+    """Returns the full catalogue entry for a model id, or None."""
+    return get_model_index()["by_id"].get(model_id)
+
+
+def supports_parameter(model_id, parameter):
+    """
+    Returns True if the catalogue lists `parameter` (e.g. "structured_outputs")
+    among the model's supported request parameters.
+    """
+    model = get_model(model_id)
+    return parameter in ((model or {}).get("supported_parameters") or [])
+
+
+def search_models(query="", provider=None, offset=0, limit=50):
+    """
+    Searches the slim model index.
+
+    Models whose id or name starts with the query (or whose id starts with it
+    after the provider prefix) rank before plain substring matches.
+
+    Returns:
+        dict: {"models": [...], "total": int, "offset": int, "limit": int}
+    """
+    index = get_model_index()
+    query = (query or "").strip().lower()
+
+    prefix_matches = []
+    substring_matches = []
+    for slim, key in zip(index["slim"], index["search_keys"]):
+        if provider and slim["provider"] != provider:
+            continue
+        if not query:
+            prefix_matches.append(slim)
+            continue
+        position = key.find(query)
+        if position == -1:
+            continue
+        # Prefix of the id, of the name, or of the model part after "provider/"
+        if position == 0 or key[position - 1] in " /":
+            prefix_matches.append(slim)
+        else:
+            substring_matches.append(slim)
+
+    matches = prefix_matches + substring_matches
+    return {
+        "models": matches[offset:offset + limit],
+        "total": len(matches),
+        "offset": offset,
+        "limit": limit,
+    }
+
+
+def _project_model(model):
+    """Returns the compact representation of a model sent to the browser."""
+    pricing = model.get("pricing") or {}
+    model_id = model.get("id", "")
+    return {
+        "id": model_id,
+        "name": model.get("name") or model_id,
+        "provider": model_id.split("/")[0],
+        "context_length": model.get("context_length"),
+        "pricing": {
+            "prompt": pricing.get("prompt"),
+            "completion": pricing.get("completion"),
+        },
+    }
+
+
+def _build_index(models):
+    slim = sorted((_project_model(model) for model in models), key=lambda m: m["name"].lower())
+    return {
+        "slim": slim,
+        "providers": sorted({m["provider"] for m in slim}),
+        "by_id": {model.get("id"): model for model in models},
+        "search_keys": [f"{m['id']} {m['name']}".lower() for m in slim],
+        "version": hashlib.sha256(json.dumps(models, sort_keys=True).encode("utf-8")).hexdigest()[:16],
+    }
 
 
 def _supports_text_modalities(model):
@@ -0,0 +1,144 @@
+"""
+HTTP caching and compression for the read-only JSON API.
+
+Responses of cached endpoints carry a weak ETag derived from a cheap version
+of the data behind them (a database change counter, a run's updated_at, the
+model catalogue hash) and, where known, Last-Modified. A matching
+If-None-Match (or, without one, If-Modified-Since) gets a bodyless 304, and
+while the version is unchanged the serialized and compressed bodies are
+served from a small in-process LRU cache instead of being rebuilt.
+
+Large JSON bodies are compressed with brotli (when the brotli package is
+installed) or gzip, according to the client's Accept-Encoding.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("HTTP_COMPRESS_MIN_BYTES", "1024"))
+RESPONSE_CACHE_ENTRIES = int(os.getenv("HTTP_RESPONSE_CACHE_ENTRIES", "256"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # Levels above ~5 cost far more CPU for little gain on JSON
+
+# For responses that can never change under the same URL
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Cacheable, but the client must revalidate (cheaply, via ETag) before each reuse
+REVALIDATE = "no-cache"
+# For responses without a version that tracks every change, such as games still being played
+NO_STORE = "no-store"
+
+_responses = OrderedDict()  # (url, etag) -> {encoding: body}
+_responses_lock = threading.Lock()
+
+
+def make_etag(*parts):
+    """Returns a weak ETag value for the given version parts."""
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def parse_db_timestamp(value):
+    """Parses an SQLite CURRENT_TIMESTAMP string (UTC) into an aware datetime, or None."""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc) if value else None
+    except ValueError:
+        return None
+
+
+def choose_encoding():
+    """Returns 'br', 'gzip' or None, whichever the client accepts with the highest quality."""
+    offers = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_quality = None, 0
+    for encoding in offers:
+        quality = request.accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def _not_modified(etag, last_modified):
+    # If-None-Match takes precedence; If-Modified-Since only counts without it (RFC 9110)
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag.removeprefix("W/").strip('"'))
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def cached_json(version, build, last_modified=None, cache_control=REVALIDATE):
+    """
+    Returns a JSON response for the current request, versioned by `version`
+    (any value that changes whenever the data does).
+
+    `build` is called only when the body is not cached for this URL and
+    version, and returns the data to serialize, or None if there is nothing
+    to send (then None is returned and nothing is cached). `last_modified`
+    is an aware datetime, if known.
+    """
+    etag = make_etag(*version) if isinstance(version, (tuple, list)) else make_etag(version)
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if last_modified is not None:
+        headers["Last-Modified"] = last_modified.strftime("%a, %d %b %Y %H:%M:%S GMT")
+    if _not_modified(etag, last_modified):
+        return Response(status=304, headers=headers)
+
+    key = (request.full_path, etag)
+    with _responses_lock:
+        bodies = _responses.get(key)
+        if bodies is not None:
+            _responses.move_to_end(key)
+    if bodies is None:
+        data = build()
+        if data is None:
+            return None
+        bodies = {None: json.dumps(data, separators=(",", ":")).encode("utf-8")}
+        _store(key, bodies)
+
+    encoding = choose_encoding() if len(bodies[None]) >= COMPRESS_MIN_BYTES else None
+    if encoding is not None:
+        if encoding not in bodies:
+            # Racing requests may both compress; the result is identical, so the last write wins harmlessly
+            bodies[encoding] = compress(bodies[None], encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(bodies[encoding], mimetype="application/json", headers=headers)
+
+
+def _store(key, bodies):
+    with _responses_lock:
+        _responses[key] = bodies
+        while len(_responses) > RESPONSE_CACHE_ENTRIES:
+            _responses.popitem(last=False)
+
+
+def compress_response(response):
+    """after_request hook compressing other large JSON responses that were not encoded already."""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or response.mimetype != "application/json" or "Content-Encoding" in response.headers):
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    encoding = choose_encoding()
+    response.vary.add("Accept-Encoding")
+    if encoding is None:
+        return response
+    response.set_data(compress(body, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
@@ -0,0 +1,360 @@
+"""
+Background game runner.
+
+Games are submitted as jobs and played by a fixed pool of workers on the
+shared background event loop, so a game no longer lives (or dies) with the
+HTTP request that started it. Every event except streamed deltas gets a
+per-game sequence number and is written to the game_events table before it
+is published, which lets SSE clients reconnect with Last-Event-ID and pick up
+where they left off; any number of clients can follow the same game.
+
+Capacity is GAME_WORKERS concurrent games, with up to GAME_QUEUE_SIZE more
+waiting for a worker.
+
+Games are checkpointed turn by turn (see game.py), so a game that failed or
+was cut off by a restart can be resumed from its last completed turn:
+
+    python jobs.py list                 # unfinished games
+    python jobs.py resume RUN_ID [...]  # continue them in the foreground
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+from database import (append_game_event, get_game_events, truncate_game_events, load_game_checkpoint,
+                      get_unfinished_game_runs, create_table_if_not_exists)
+from game import (play_turing_test_game_async, resume_turing_test_game_async, validate_judge_panel,
+                  NUMBER_OF_QUESTIONS)
+from llm_client import run_sync
+
+GAME_WORKERS = int(os.getenv("GAME_WORKERS", "4"))
+GAME_QUEUE_SIZE = int(os.getenv("GAME_QUEUE_SIZE", "100"))
+# Finished jobs stay in memory this long for live followers; after that, resumes are served from the DB.
+JOB_RETENTION_SECONDS = float(os.getenv("GAME_JOB_RETENTION_SECONDS", "600"))
+# Followers get None (an SSE keepalive) after this many idle seconds.
+KEEPALIVE_SECONDS = 15
+# Resume games left 'running' by a previous process when the web app starts (single-process deployments only).
+RESUME_ON_STARTUP = os.getenv("GAME_RESUME_ON_STARTUP", "false").lower() == "true"
+
+TERMINAL_EVENT_TYPES = ("game_complete", "error")
+
+
+class QueueFullError(Exception):
+    """Raised when a game is submitted while the job queue is full."""
+
+
+class GameJob:
+    """One submitted game and the events it has produced so far."""
+
+    def __init__(self, participant_model, interrogator_model, num_questions=NUMBER_OF_QUESTIONS,
+                 stream=False, run_by="webapp", run_id=None, resume=False, adaptive=False, judges=None,
+                 judge_aggregation=None):
+        self.run_id = run_id or str(uuid.uuid4())
+        self.participant_model = participant_model
+        self.interrogator_model = interrogator_model
+        self.num_questions = num_questions
+        self.stream = stream
+        self.run_by = run_by
+        self.resume = resume
+        self.adaptive = adaptive
+        self.judges = judges
+        self.judge_aggregation = judge_aggregation
+
+        self.status = "queued"
+        self.error = None
+        self.events = []  # [(seq or None, data)]; deltas have no seq
+        self.next_seq = 1
+        self.finished_at = None
+        self._condition = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in ("complete", "failed")
+
+    async def publish(self, event, persist=True):
+        """
+        Appends an event, writing it to the event log first unless it is a
+        live-only delta. Events are stamped with their publish time (`ts`) so
+        clients can measure delivery lag.
+        """
+        event["ts"] = round(time.time(), 3)
+        data = json.dumps(event)
+        seq = None
+        if persist:
+            seq = self.next_seq
+            self.next_seq += 1
+            await asyncio.get_running_loop().run_in_executor(None, append_game_event, self.run_id, seq, data)
+        with self._condition:
+            self.events.append((seq, data))
+            self._condition.notify_all()
+
+    def finish(self, status, error=None):
+        with self._condition:
+            self.status = status
+            self.error = error
+            self.finished_at = time.monotonic()
+            self._condition.notify_all()
+
+    def follow(self, after_seq=0):
+        """
+        Yields (seq, data) events after `after_seq` as they are published, then
+        returns once the game has finished. Yields None while idle, so callers
+        can send keepalives.
+
+        Deltas published after the last event the client saw are replayed too,
+        so a resumed client receives the in-flight turn from its beginning.
+        """
+        with self._condition:
+            index = 0
+            if after_seq:
+                for position, (seq, _) in enumerate(self.events):
+                    if seq is not None and seq <= after_seq:
+                        index = position + 1
+
+        while True:
+            with self._condition:
+                if index >= len(self.events) and not self.finished:
+                    self._condition.wait(KEEPALIVE_SECONDS)
+                batch = self.events[index:]
+                index += len(batch)
+                done = self.finished and index >= len(self.events)
+            if not batch and not done:
+                yield None
+            for event in batch:
+                yield event
+            if done:
+                return
+
+    def info(self):
+        return {
+            "run_id": self.run_id,
+            "participant_model": self.participant_model,
+            "interrogator_model": self.interrogator_model,
+            "num_questions": self.num_questions,
+            "adaptive": self.adaptive,
+            "judges": self.judges,
+            "status": self.status,
+            "error": self.error,
+            "events": self.next_seq - 1,
+        }
+
+
+class GamePool:
+    """A bounded pool of workers that play queued games on the background loop."""
+
+    def __init__(self, workers=GAME_WORKERS, queue_size=GAME_QUEUE_SIZE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._jobs = {}
+        self._jobs_lock = threading.Lock()
+        self._queue = None  # Created on the background loop
+        self._busy = 0
+
+    def submit(self, participant_model, interrogator_model, num_questions=NUMBER_OF_QUESTIONS,
+               stream=False, run_by="webapp", adaptive=False, judges=None, judge_aggregation=None):
+        """
+        Queues a game and returns its GameJob immediately. Adaptive games may
+        stop before `num_questions`, and `judges` adds a judge panel (see
+        play_turing_test_game_async).
+
+        Raises QueueFullError if GAME_QUEUE_SIZE games are already waiting, and
+        ValueError for an invalid judge panel.
+        """
+        validate_judge_panel(judges, judge_aggregation)
+        self._prune()
+        job = GameJob(participant_model, interrogator_model, num_questions, stream, run_by, adaptive=adaptive,
+                      judges=judges, judge_aggregation=judge_aggregation)
+        run_sync(self._enqueue(job))
+        with self._jobs_lock:
+            self._jobs[job.run_id] = job
+        return job
+
+    def resume(self, run_id, stream=False):
+        """
+        Queues a checkpointed game to continue from its last completed turn and
+        returns its GameJob. The game keeps its run_id and event log, so
+        followers see one continuous stream.
+
+        Raises LookupError if the run has no checkpoint, ValueError if it is
+        complete or already running here, and QueueFullError if the queue is full.
+        """
+        self._prune()
+        live = self.get_job(run_id)
+        if live is not None and not live.finished:
+            raise ValueError(f"Game run {run_id} is already running")
+        checkpoint = load_game_checkpoint(run_id)
+        if checkpoint is None:
+            raise LookupError(f"Game run {run_id} has no checkpoint to resume from")
+        if checkpoint["status"] == "complete":
+            raise ValueError(f"Game run {run_id} is already complete")
+
+        job = GameJob(checkpoint["participant_model"], checkpoint["interrogator_model"],
+                      checkpoint["num_questions"], stream, checkpoint["run_by"], run_id=run_id, resume=True,
+                      adaptive=checkpoint["confidence_threshold"] is not None, judges=checkpoint["judges"],
+                      judge_aggregation=checkpoint["aggregation"])
+        # Continue the event log where the previous attempt stopped, dropping its terminal error
+        logged = get_game_events(run_id)
+        while logged and json.loads(logged[-1][1]).get("type") in TERMINAL_EVENT_TYPES:
+            logged.pop()
+        truncate_game_events(run_id, logged[-1][0] if logged else 0)
+        job.events = list(logged)
+        job.next_seq = (logged[-1][0] if logged else 0) + 1
+
+        run_sync(self._enqueue(job))
+        with self._jobs_lock:
+            self._jobs[run_id] = job
+        return job
+
+    async def _enqueue(self, job):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            for _ in range(self.workers):
+                asyncio.get_running_loop().create_task(self._worker())
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError(f"Too many games queued ({self.queue_size}); try again later") from None
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            self._busy += 1
+            try:
+                await self._run(job)
+            finally:
+                self._busy -= 1
+                self._queue.task_done()
+
+    async def _run(self, job):
+        job.status = "running"
+        await job.publish({
+            "type": "game_started",
+            "run_id": job.run_id,
+            "participant_model": job.participant_model,
+            "interrogator_model": job.interrogator_model,
+            "resumed": job.resume,
+        })
+        if job.resume:
+            game = resume_turing_test_game_async(job.run_id, stream=job.stream)
+        else:
+            game = play_turing_test_game_async(
+                job.participant_model, job.interrogator_model, job.num_questions,
+                stream=job.stream, run_id=job.run_id, run_by=job.run_by, adaptive=job.adaptive,
+                judges=job.judges, judge_aggregation=job.judge_aggregation
+            )
+        try:
+            async for message in game:
+                event = json.loads(message)
+                await job.publish(event, persist=event.get("type") != "delta")
+        except Exception as e:
+            print(f"Game {job.run_id} failed: {e}")
+            error_msg = f"Game error: {str(e)}. Please check your API key and model selection."
+            await job.publish({"type": "error", "error": error_msg})
+            job.finish("failed", str(e))
+            return
+
+        await job.publish({"type": "game_complete", "run_id": job.run_id})
+        job.finish("complete")
+
+    def get_job(self, run_id):
+        """Returns the in-memory job for `run_id`, or None once it has been pruned (or never existed)."""
+        with self._jobs_lock:
+            return self._jobs.get(run_id)
+
+    def _prune(self):
+        cutoff = time.monotonic() - JOB_RETENTION_SECONDS
+        with self._jobs_lock:
+            for run_id in [r for r, job in self._jobs.items() if job.finished and job.finished_at < cutoff]:
+                del self._jobs[run_id]
+
+    def stats(self):
+        """Returns pool size, busy workers and queue depth."""
+        return {
+            "workers": self.workers,
+            "busy": self._busy,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": self.queue_size,
+        }
+
+    def list_jobs(self):
+        """Returns info for the games this process is running or has recently run."""
+        with self._jobs_lock:
+            return [job.info() for job in self._jobs.values()]
+
+
+def stream_game_events(run_id, after_seq=0):
+    """
+    Returns an iterator of (seq, data) events for a game after `after_seq`
+    (None items are keepalives), or None if the game is unknown.
+
+    Live games are followed until they finish. Games no longer in memory are
+    replayed from the event log; if that log never reached a terminal event
+    (the server stopped mid-game), a final error event without a seq is added.
+    """
+    job = pool.get_job(run_id)
+    if job is not None:
+        return job.follow(after_seq)
+
+    logged = get_game_events(run_id)
+    if not logged:
+        return None
+
+    def replay():
+        for seq, data in logged:
+            if seq > after_seq:
+                yield seq, data
+        if json.loads(logged[-1][1]).get("type") not in TERMINAL_EVENT_TYPES:
+            yield None, json.dumps({"type": "error", "error": "Game was interrupted before it finished."})
+
+    return replay()
+
+
+def resume_interrupted_games():
+    """
+    Queues every game a previous process left 'running' (it died mid-game).
+    Returns the resumed run_ids. Failed games are left for an explicit resume.
+    """
+    resumed = []
+    for run in get_unfinished_game_runs():
+        if run["status"] != "running" or pool.get_job(run["run_id"]) is not None:
+            continue
+        try:
+            pool.resume(run["run_id"], stream=True)
+            resumed.append(run["run_id"])
+        except (LookupError, ValueError, QueueFullError) as e:
+            print(f"Could not resume game {run['run_id']}: {e}")
+    return resumed
+
+
+async def _resume_in_foreground(run_ids):
+    for run_id in run_ids:
+        try:
+            async for message in resume_turing_test_game_async(run_id):
+                print(message)
+        except Exception as e:
+            print(f"Game {run_id} failed again: {e}")
+
+
+def main():
+    create_table_if_not_exists()
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+    if command == "list":
+        for run in get_unfinished_game_runs():
+            print(f"{run['run_id']}  {run['status']:<8} last checkpoint {run['updated_at']}"
+                  + (f"  ({run['error']})" if run["error"] else ""))
+    elif command == "resume" and len(sys.argv) > 2:
+        asyncio.run(_resume_in_foreground(sys.argv[2:]))
+    else:
+        print("Usage: python jobs.py [list | resume RUN_ID [RUN_ID ...]]")
+
+
+# The process-wide game pool used by the web app
+pool = GamePool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Content-addressed cache of model responses, stored in SQLite.
+
+Responses are keyed on a SHA-256 of (model, messages, sampling params), so
+identical prompt prefixes - the same system prompts, the same first question,
+the same judgment call - are answered from disk on reruns.
+
+Modes (LLM_CACHE_MODE):
+    off           - never read or write the cache (default)
+    read_through  - serve hits from the cache, call the model on a miss and store the result
+    replay        - serve hits only; a miss raises CacheMissError. Lets stored games be
+                    re-run deterministically without spending tokens.
+
+Entries older than LLM_CACHE_MAX_AGE_DAYS are dropped, and the least recently
+used entries are evicted once the cache exceeds LLM_CACHE_MAX_MB.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from database import DB_FILE
+from llm_client import LLMError
+
+CACHE_MODES = ("off", "read_through", "replay")
+
+CACHE_FILE = os.getenv("LLM_CACHE_FILE", os.path.join(os.path.dirname(DB_FILE), "llm_cache.sqlite"))
+MAX_AGE_SECONDS = float(os.getenv("LLM_CACHE_MAX_AGE_DAYS", "30")) * 86400
+MAX_BYTES = int(float(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024)
+EVICTION_INTERVAL = 100  # Check size/age limits every N writes
+
+_mode = os.getenv("LLM_CACHE_MODE", "off").lower()
+_local = threading.local()
+_writes = 0
+_writes_lock = threading.Lock()
+
+
+class CacheMissError(LLMError):
+    """Raised in replay mode when a response is not in the cache."""
+
+
+def get_cache_mode():
+    """Returns the current cache mode."""
+    return _mode
+
+
+def set_cache_mode(mode):
+    """Switches the cache mode for this process ('off', 'read_through' or 'replay')."""
+    global _mode
+    if mode not in CACHE_MODES:
+        raise ValueError(f"Unknown cache mode {mode!r}; expected one of {', '.join(CACHE_MODES)}")
+    _mode = mode
+
+
+def cache_key(model, messages, **params):
+    """Returns the content hash identifying a (model, messages, sampling params) request."""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _get_connection():
+    """Returns this thread's connection to the cache database, creating the table on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(CACHE_FILE, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                cache_key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT,
+                size INTEGER,
+                created_at REAL,
+                last_accessed REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_accessed ON llm_cache (last_accessed)")
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+
+def get(key):
+    """Returns the cached response for `key` (refreshing its LRU position), or None."""
+    try:
+        conn = _get_connection()
+        row = conn.execute(
+            "SELECT response, created_at FROM llm_cache WHERE cache_key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[1] > MAX_AGE_SECONDS:
+            conn.execute("DELETE FROM llm_cache WHERE cache_key = ?", (key,))
+            conn.commit()
+            return None
+        conn.execute("UPDATE llm_cache SET last_accessed = ? WHERE cache_key = ?", (now, key))
+        conn.commit()
+        return row[0]
+    except sqlite3.Error as e:
+        print(f"Error reading LLM cache: {e}")
+        return None
+
+
+def put(key, model, response):
+    """Stores a response, evicting old and least recently used entries as needed."""
+    global _writes
+    now = time.time()
+    try:
+        conn = _get_connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (cache_key, model, response, size, created_at, last_accessed) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, model, response, len(response.encode("utf-8")), now, now),
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error writing LLM cache: {e}")
+        return
+
+    with _writes_lock:
+        _writes += 1
+        due = _writes % EVICTION_INTERVAL == 0
+    if due:
+        evict()
+
+
+def evict():
+    """Drops expired entries, then least recently used ones until the cache fits MAX_BYTES."""
+    try:
+        conn = _get_connection()
+        conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - MAX_AGE_SECONDS,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total > MAX_BYTES:
+            excess = total - MAX_BYTES
+            freed = 0
+            doomed = []
+            for key, size in conn.execute("SELECT cache_key, size FROM llm_cache ORDER BY last_accessed"):
+                doomed.append((key,))
+                freed += size
+                if freed >= excess:
+                    break
+            conn.executemany("DELETE FROM llm_cache WHERE cache_key = ?", doomed)
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error evicting LLM cache entries: {e}")
+
+
+async def aget(key):
+    """Async cache lookup that keeps SQLite off the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(None, get, key)
+
+
+async def aput(key, model, response):
+    """Async cache write that keeps SQLite off the event loop."""
+    await asyncio.get_running_loop().run_in_executor(None, put, key, model, response)
@@ -0,0 +1,192 @@
+"""
+Process-wide OpenRouter client for the game engine.
+
+Every model call goes through one AsyncOpenAI client per event loop so the
+underlying HTTP connection pool (and its TLS sessions) is reused across calls
+and games. Synchronous callers (the CLI, Flask worker threads) run their
+coroutines on a single shared background loop, so they share that pool too.
+Retries are handled here with exponential backoff and jitter rather than by
+the SDK, so the policy is the same for every caller.
+"""
+import asyncio
+import os
+import random
+import threading
+import weakref
+
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, APIConnectionError, APIStatusError, RateLimitError, Timeout
+
+from rate_limiter import scheduler
+
+load_dotenv()
+
+# Any OpenAI-compatible endpoint works, e.g. the local mock server in benchmarks/ for load tests.
+BASE_URL = os.getenv("LLM_BASE_URL", "https://openrouter.ai/api/v1")
+
+HTTP_REFERER = os.getenv("HTTP_REFERER", "<YOUR_SITE_URL>")
+X_TITLE = os.getenv("X_TITLE", "<YOUR_SITE_NAME>")
+
+# Timeouts (seconds). Long completions can take a while, so the read timeout is generous.
+CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "120"))
+
+# Retry policy for transient failures (rate limits, upstream 5xx, dropped connections).
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30"))
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+# 429s are waited out (honouring Retry-After) up to this many seconds per call before giving up.
+RATE_LIMIT_MAX_WAIT = float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT", "300"))
+
+_clients = weakref.WeakKeyDictionary()  # event loop -> (client, api_key)
+_client_lock = threading.Lock()
+_api_key_provider = None
+
+_background_loop = None
+_background_lock = threading.Lock()
+
+
+class LLMError(Exception):
+    """Raised when a model call fails for good; callers must not treat it as a response."""
+
+
+def set_api_key_provider(provider):
+    """
+    Registers a callable that returns the API key to use for the next call.
+
+    This is the key-rotation hook: when the returned key changes, the shared
+    client is re-keyed in place and keeps its connection pool. Pass None to go
+    back to reading OPENROUTER_API_KEY from the environment.
+    """
+    global _api_key_provider
+    _api_key_provider = provider
+
+
+def _current_api_key():
+    if _api_key_provider is not None:
+        return _api_key_provider()
+    return os.getenv("OPENROUTER_API_KEY")
+
+
+def get_async_client():
+    """
+    Returns the shared AsyncOpenAI client for the running event loop.
+
+    The client is re-keyed in place if the API key has changed.
+    """
+    loop = asyncio.get_running_loop()
+    api_key = _current_api_key()
+    with _client_lock:
+        client, client_api_key = _clients.get(loop, (None, None))
+        if client is None:
+            client = AsyncOpenAI(
+                base_url=BASE_URL,
+                api_key=api_key,
+                timeout=Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+                max_retries=0,  # Retries are handled by acreate_chat_completion
+                default_headers={
+                    "HTTP-Referer": HTTP_REFERER,
+                    "X-Title": X_TITLE,
+                },
+            )
+        elif api_key != client_api_key:
+            # with_options() shares the existing HTTP client, so no new pool is built
+            client = client.with_options(api_key=api_key)
+        _clients[loop] = (client, api_key)
+        return client
+
+
+def is_retryable_error(error):
+    """Returns True for errors worth retrying: timeouts, connection drops, 429 and 5xx."""
+    if isinstance(error, APIConnectionError):  # Includes APITimeoutError
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter for the given (zero-based) retry attempt."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+async def acreate_chat_completion(model, messages, **kwargs):
+    """
+    Creates a chat completion on the shared async client, retrying transient failures.
+
+    Every attempt is scheduled through the shared rate limiter. 429 responses
+    block the model's bucket for as long as the upstream asks (so other games
+    back off too) and are retried until RATE_LIMIT_MAX_WAIT is used up; other
+    transient errors get MAX_RETRIES retries. Non-retryable errors, and the
+    last error once retries are exhausted, are raised to the caller.
+    """
+    attempt = 0
+    throttled_wait = 0.0
+    while True:
+        await scheduler.acquire(model)
+        try:
+            raw = await get_async_client().chat.completions.with_raw_response.create(
+                model=model, messages=messages, **kwargs
+            )
+        except RateLimitError as e:
+            delay = max(scheduler.record_throttled(model, e.response.headers), backoff_delay(attempt))
+            if throttled_wait + delay > RATE_LIMIT_MAX_WAIT:
+                raise
+            throttled_wait += delay
+            attempt += 1
+            scheduler.block(model, delay)
+            print(f"Rate limited by model {model}; waiting {delay:.1f}s before retrying")
+            continue
+        except Exception as e:
+            if attempt >= MAX_RETRIES or not is_retryable_error(e):
+                raise
+            delay = backoff_delay(attempt)
+            attempt += 1
+            print(f"Transient API error with model {model} (attempt {attempt}/{MAX_RETRIES + 1}): {e}. "
+                  f"Retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
+
+        scheduler.observe_headers(model, raw.headers)
+        return raw.parse()
+
+
+# --- Bridging for synchronous callers ---
+
+def get_background_loop():
+    """Returns the shared event loop that runs async work for synchronous callers."""
+    global _background_loop
+    with _background_lock:
+        if _background_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-event-loop", daemon=True).start()
+            _background_loop = loop
+        return _background_loop
+
+
+def run_sync(coro):
+    """Runs a coroutine on the background loop and blocks until it completes."""
+    return asyncio.run_coroutine_threadsafe(coro, get_background_loop()).result()
+
+
+async def _anext(agen):
+    return await agen.__anext__()
+
+
+def iterate_sync(agen):
+    """
+    Iterates an async generator from synchronous code via the background loop.
+
+    Closing the returned generator (e.g. when an SSE client disconnects) also
+    closes the async generator.
+    """
+    try:
+        while True:
+            try:
+                item = run_sync(_anext(agen))
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        run_sync(agen.aclose())
@@ -0,0 +1,209 @@
+"""
+Per-call instrumentation of model calls.
+
+Every completion records wall-clock latency, time to first token (when
+streaming), prompt/completion tokens and an estimated cost priced from the
+OpenRouter model catalogue. Each call is persisted to the llm_calls table
+(tagged with its game, role and turn) and folded into in-process counters
+and histograms, which render_prometheus exposes in the Prometheus text
+format for the /metrics endpoint. The per-model latency percentiles shown
+on the leaderboard are recomputed from llm_calls by a background thread
+(start_latency_stats_refresher), off the request path.
+"""
+import asyncio
+import os
+import threading
+import time
+
+from database import insert_llm_call, refresh_model_latency_stats
+from get_models import get_model
+
+LATENCY_STATS_REFRESH_SECONDS = float(os.getenv("LATENCY_STATS_REFRESH_SECONDS", "60"))
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+TTFT_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+
+_lock = threading.Lock()
+_requests = {}  # (model, status) -> count
+_tokens = {}  # (model, type) -> count
+_cost = {}  # model -> USD
+_latency = {}  # model -> _Histogram
+_ttft = {}  # model -> _Histogram
+
+_refresher_lock = threading.Lock()
+_refresher = None
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class ModelCall:
+    """
+    Measures one model call. Create it just before the request, call
+    first_token() when the first streamed delta arrives and set_usage() with
+    the response's usage block, then finish() (or afinish()) once it is done.
+    """
+
+    def __init__(self, model, run_id=None, role=None, turn=None):
+        self.model = model
+        self.run_id = run_id
+        self.role = role
+        self.turn = turn
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.ttft = None
+        self.latency = None
+        self.prompt_tokens = None
+        self.completion_tokens = None
+
+    def first_token(self):
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self._started
+
+    def set_usage(self, usage):
+        if usage is not None:
+            self.prompt_tokens = getattr(usage, "prompt_tokens", None)
+            self.completion_tokens = getattr(usage, "completion_tokens", None)
+
+    def finish(self, status="ok"):
+        """
+        Records the call with status 'ok', 'error' or 'cached' (answered from
+        llm_cache). Blocking: it may price the model and writes to SQLite.
+        """
+        if self.latency is None:
+            self.latency = time.perf_counter() - self._started
+        record_call(self, status)
+
+    async def afinish(self, status="ok"):
+        """Async finish() that keeps pricing lookups and SQLite off the event loop."""
+        if self.latency is None:
+            self.latency = time.perf_counter() - self._started
+        await asyncio.get_running_loop().run_in_executor(None, self.finish, status)
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """Returns the USD cost of a call from catalogue per-token pricing, or None if it is unknown."""
+    if prompt_tokens is None and completion_tokens is None:
+        return None
+    entry = get_model(model)
+    pricing = (entry or {}).get("pricing") or {}
+    try:
+        return (float(pricing.get("prompt") or 0) * (prompt_tokens or 0)
+                + float(pricing.get("completion") or 0) * (completion_tokens or 0))
+    except (TypeError, ValueError):
+        return None
+
+
+def record_call(call, status="ok"):
+    """Persists a finished ModelCall to llm_calls and adds it to the in-process metrics."""
+    cost = None if status == "cached" else estimate_cost(call.model, call.prompt_tokens, call.completion_tokens)
+
+    with _lock:
+        key = (call.model, status)
+        _requests[key] = _requests.get(key, 0) + 1
+        if status != "cached":
+            for token_type, count in (("prompt", call.prompt_tokens), ("completion", call.completion_tokens)):
+                if count:
+                    _tokens[(call.model, token_type)] = _tokens.get((call.model, token_type), 0) + count
+            if cost:
+                _cost[call.model] = _cost.get(call.model, 0.0) + cost
+            if status == "ok":
+                _latency.setdefault(call.model, _Histogram(LATENCY_BUCKETS)).observe(call.latency)
+                if call.ttft is not None:
+                    _ttft.setdefault(call.model, _Histogram(TTFT_BUCKETS)).observe(call.ttft)
+
+    insert_llm_call(
+        run_id=call.run_id,
+        model=call.model,
+        role=call.role,
+        turn=call.turn,
+        started_at=call.started_at,
+        latency_ms=round(call.latency * 1000, 1),
+        ttft_ms=round(call.ttft * 1000, 1) if call.ttft is not None else None,
+        prompt_tokens=call.prompt_tokens,
+        completion_tokens=call.completion_tokens,
+        cost_usd=cost,
+        status=status,
+    )
+
+
+def _refresh_latency_stats_loop(interval):
+    refreshed_through = None
+    while True:
+        try:
+            refreshed_through = refresh_model_latency_stats(refreshed_through) or refreshed_through
+        except Exception as e:
+            print(f"Error refreshing latency stats: {e}")
+        time.sleep(interval)
+
+
+def start_latency_stats_refresher(interval=LATENCY_STATS_REFRESH_SECONDS):
+    """Starts (once per process) the daemon thread that recomputes latency percentiles whenever calls were logged."""
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = threading.Thread(target=_refresh_latency_stats_loop, args=(interval,),
+                                          name="latency-stats-refresher", daemon=True)
+            _refresher.start()
+    return _refresher
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def format_gauge(name, help_text, samples):
+    """Formats a gauge family; `samples` is a list of (labels dict, value)."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    lines += [f"{name}{_labels(**labels) if labels else ''} {value}" for labels, value in samples]
+    return "\n".join(lines)
+
+
+def _format_histograms(name, help_text, histograms):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for model, histogram in sorted(histograms.items()):
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            lines.append(f"{name}_bucket{_labels(model=model, le=bound)} {count}")
+        lines.append(f"{name}_bucket{_labels(model=model, le='+Inf')} {histogram.count}")
+        lines.append(f"{name}_sum{_labels(model=model)} {histogram.sum:.6f}")
+        lines.append(f"{name}_count{_labels(model=model)} {histogram.count}")
+    return "\n".join(lines)
+
+
+def render_prometheus():
+    """Returns the model call metrics in the Prometheus text exposition format."""
+    with _lock:
+        sections = [
+            "# HELP llm_requests_total Model calls by model and outcome (ok, error, cached).\n"
+            "# TYPE llm_requests_total counter\n"
+            + "\n".join(f"llm_requests_total{_labels(model=model, status=status)} {count}"
+                        for (model, status), count in sorted(_requests.items())),
+            "# HELP llm_tokens_total Tokens used, by model and type (prompt, completion).\n"
+            "# TYPE llm_tokens_total counter\n"
+            + "\n".join(f"llm_tokens_total{_labels(model=model, type=token_type)} {count}"
+                        for (model, token_type), count in sorted(_tokens.items())),
+            "# HELP llm_cost_usd_total Estimated spend in USD, by model.\n"
+            "# TYPE llm_cost_usd_total counter\n"
+            + "\n".join(f"llm_cost_usd_total{_labels(model=model)} {cost:.8f}" for model, cost in sorted(_cost.items())),
+            _format_histograms("llm_request_duration_seconds", "Wall-clock latency of successful model calls.",
+                               _latency),
+            _format_histograms("llm_time_to_first_token_seconds", "Time to first streamed token.", _ttft),
+        ]
+    return "\n".join(section.rstrip("\n") for section in sections) + "\n"
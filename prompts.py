@@ -16,12 +16,17 @@ def get_participant_system_prompt():
         """
 
 
-def get_interrogator_system_prompt(num_questions):
-    """System prompt for the interrogator LLM that needs to determine if the other participant is human or AI."""
+def get_interrogator_system_prompt(num_questions, adaptive=False):
+    """
+    System prompt for the interrogator LLM that needs to determine if the other participant is human or AI.
+
+    In adaptive games `num_questions` is a maximum: the interrogator may be asked to judge earlier.
+    """
+    series = f"up to {num_questions} questions" if adaptive else f"a series of {num_questions} questions"
     return f"""
         You are the Interrogator in an "Imitation Game." You will be speaking with an unknown entity and your sole objective is to determine if they are a human or an AI.
 
-        You will ask a series of {num_questions} questions to probe the nature of your conversation partner. Your success depends on your ability to craft insightful, creative, and unexpected questions and to deeply analyze the substance, style, and authenticity of the responses.
+        You will ask {series} to probe the nature of your conversation partner. Your success depends on your ability to craft insightful, creative, and unexpected questions and to deeply analyze the substance, style, and authenticity of the responses.
 
         - Ask one question at a time, and wait for the participant to respond before asking the next.
         - Think carefully about what makes a conversation feel genuinely human.
@@ -40,9 +45,61 @@ def get_interrogator_system_prompt(num_questions):
 
 
 def get_judgment_prompt():
-    """Prompt for the final judgment phase of the game."""
+    """Prompt for the final judgment phase of the game; the reply is parsed as JSON (see JUDGMENT_SCHEMA)."""
+    return (
+        "The interrogation is over. Based on the entire conversation, is the other participant a human or an AI? "
+        "Reply with only a JSON object of the form "
+        "{\"reasoning\": a brief explanation of your reasoning, \"verdict\": \"Human\" or \"AI\", "
+        "\"confidence\": your probability, from 0.5 to 1.0, that the verdict is correct}."
+    )
+
+
+# Response schema for the judgment, for models that support structured outputs.
+# Reasoning comes first so the model explains itself before committing to a verdict.
+JUDGMENT_SCHEMA = {
+    "name": "judgment",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "reasoning": {"type": "string"},
+            "verdict": {"type": "string", "enum": ["Human", "AI"]},
+            "confidence": {"type": "number"},
+        },
+        "required": ["reasoning", "verdict", "confidence"],
+        "additionalProperties": False,
+    },
+}
+
+
+def get_judgment_repair_prompt(judgment):
+    """Follow-up prompt extracting the verdict from a judgment that did not come back as parseable JSON."""
+    return (
+        "Here is an interrogator's assessment of whether their conversation partner was a human or an AI:\n\n"
+        f"{judgment}\n\n"
+        "What did the interrogator conclude? Reply with only a JSON object of the form "
+        "{\"verdict\": \"Human\", \"AI\" or \"Unknown\" (if no conclusion was stated), "
+        "\"confidence\": how sure the interrogator sounded, from 0.5 to 1.0}."
+    )
+
+
+def get_confidence_prompt():
+    """Prompt asking the interrogator, between questions, how sure it already is (adaptive games)."""
+    return (
+        "Before your next question, pause and assess the conversation so far. Do not ask a question now. "
+        "Reply with only a JSON object of the form {\"leaning\": \"human\" or \"ai\", \"confidence\": number}, "
+        "where confidence is your probability, from 0.5 to 1.0, that your leaning is correct."
+    )
+
+
+def get_summary_prompt(previous_summary, transcript):
+    """Prompt asking for a running summary of turns that no longer fit in a model's context."""
+    earlier = f"Summary so far:\n{previous_summary}\n\n" if previous_summary else ""
     return (
-        "Based on the entire conversation, is the other participant a human or an AI? "
-        "verdict as 'Final Verdict: Human' or 'Final Verdict: AI'."
-        "Please provide a brief explanation for your reasoning and then state your final"
+        "You are keeping notes on a conversation that is too long to keep in full. "
+        f"{earlier}"
+        f"Newer part of the conversation:\n{transcript}\n\n"
+        "Write an updated summary of the whole conversation so far in under 200 words. Keep every question asked, "
+        "the key facts, claims, opinions and personal details given in each answer, and any inconsistencies, "
+        "so that they can still be referred to later. Reply with the summary only."
     )
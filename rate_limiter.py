@@ -0,0 +1,228 @@
+"""
+Rate-limit-aware request scheduler shared by every game in the process.
+
+Each model and each provider ("provider/" prefix of the model id) gets a token
+bucket. Requests reserve a start time in both buckets in arrival order, so
+concurrent games are served first-come, first-served instead of racing each
+other into 429s. When the upstream signals a limit (a 429 with Retry-After, or
+X-RateLimit-Remaining: 0 with X-RateLimit-Reset), the bucket is blocked until
+the indicated time and queued requests wait it out.
+
+Reservations are made under a plain threading lock and waited out with
+asyncio.sleep, so one scheduler works across threads and event loops.
+"""
+import asyncio
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from dotenv import load_dotenv
+
+# Loaded here too: the scheduler below is built at import time, before importers get to load .env
+load_dotenv()
+
+# Sustained requests/second and burst size, per model and per provider.
+MODEL_RATE = float(os.getenv("LLM_MODEL_RATE_LIMIT", "2"))
+MODEL_BURST = int(os.getenv("LLM_MODEL_BURST", "5"))
+PROVIDER_RATE = float(os.getenv("LLM_PROVIDER_RATE_LIMIT", "10"))
+PROVIDER_BURST = int(os.getenv("LLM_PROVIDER_BURST", "20"))
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+class TokenBucket:
+    """
+    A token bucket kept as a "theoretical arrival time" (GCRA), so a request's
+    start time can be reserved in O(1) without a background refill task.
+    """
+
+    def __init__(self, rate, burst):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.tolerance = self.interval * max(burst - 1, 0)
+        self.tat = 0.0
+        self.blocked_until = 0.0
+
+    def earliest_start(self, now):
+        return max(now, self.tat - self.tolerance, self.blocked_until)
+
+    def commit(self, start):
+        self.tat = max(self.tat, start) + self.interval
+
+    def block(self, until):
+        self.blocked_until = max(self.blocked_until, until)
+
+
+class _KeyStats:
+    def __init__(self):
+        self.waiting = 0
+        self.requests = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def as_dict(self):
+        return {
+            "queue_depth": self.waiting,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "avg_wait_seconds": round(self.total_wait / self.requests, 3) if self.requests else 0.0,
+            "max_wait_seconds": round(self.max_wait, 3),
+        }
+
+
+class RateLimitScheduler:
+    """Schedules model calls across per-model and per-provider token buckets."""
+
+    def __init__(self, model_rate=MODEL_RATE, model_burst=MODEL_BURST,
+                 provider_rate=PROVIDER_RATE, provider_burst=PROVIDER_BURST):
+        self.model_rate = model_rate
+        self.model_burst = model_burst
+        self.provider_rate = provider_rate
+        self.provider_burst = provider_burst
+        self._buckets = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, key):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if key.startswith("provider:"):
+                bucket = TokenBucket(self.provider_rate, self.provider_burst)
+            else:
+                bucket = TokenBucket(self.model_rate, self.model_burst)
+            self._buckets[key] = bucket
+            self._stats[key] = _KeyStats()
+        return bucket
+
+    @staticmethod
+    def _keys(model):
+        return [model, "provider:" + model.split("/")[0]]
+
+    def reserve(self, model):
+        """Reserves the next start slot for a call to `model`; returns seconds to wait."""
+        now = time.monotonic()
+        with self._lock:
+            buckets = [self._bucket(key) for key in self._keys(model)]
+            start = max(bucket.earliest_start(now) for bucket in buckets)
+            for bucket in buckets:
+                bucket.commit(start)
+            return start - now
+
+    async def acquire(self, model):
+        """Waits until a call to `model` may start."""
+        delay = self.reserve(model)
+        keys = self._keys(model)
+        with self._lock:
+            for key in keys:
+                stats = self._stats[key]
+                stats.waiting += 1
+                stats.requests += 1
+                stats.total_wait += delay
+                stats.max_wait = max(stats.max_wait, delay)
+        try:
+            if delay > 0:
+                await asyncio.sleep(delay)
+        finally:
+            with self._lock:
+                for key in keys:
+                    self._stats[key].waiting -= 1
+
+    def block(self, model, seconds):
+        """Blocks further calls to `model` for `seconds` (e.g. from a Retry-After header)."""
+        until = time.monotonic() + seconds
+        with self._lock:
+            self._bucket(model).block(until)
+
+    def record_throttled(self, model, headers=None):
+        """
+        Records a 429 for `model` and blocks its bucket for as long as the
+        response headers ask. Returns the number of seconds blocked (0 if the
+        headers carried no hint).
+        """
+        delay = retry_delay_from_headers(headers, rate_limited=True) or 0.0
+        with self._lock:
+            self._bucket(model)
+            self._stats[model].throttled += 1
+        if delay > 0:
+            self.block(model, delay)
+        return delay
+
+    def observe_headers(self, model, headers):
+        """Blocks `model` until the advertised reset time if its rate-limit quota is exhausted."""
+        delay = retry_delay_from_headers(headers, rate_limited=False)
+        if delay:
+            self.block(model, delay)
+
+    def get_stats(self):
+        """Returns queue depth and wait statistics per model and provider."""
+        now = time.monotonic()
+        with self._lock:
+            stats = {}
+            for key, key_stats in self._stats.items():
+                entry = key_stats.as_dict()
+                entry["blocked_for_seconds"] = round(max(self._buckets[key].blocked_until - now, 0.0), 3)
+                stats[key] = entry
+            return stats
+
+
+def _parse_duration(value):
+    """Parses '1.5', '20ms', '1m30s' style durations into seconds."""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        parts = _DURATION_PART.findall(value)
+        if not parts:
+            return None
+        return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _parse_reset(value):
+    """Parses an X-RateLimit-Reset value (epoch ms, epoch s, or a duration) into seconds from now."""
+    try:
+        number = float(value)
+    except ValueError:
+        return _parse_duration(value)
+    if number > 1e12:  # Epoch milliseconds (OpenRouter)
+        return number / 1000 - time.time()
+    if number > 1e9:  # Epoch seconds
+        return number - time.time()
+    return number
+
+
+def retry_delay_from_headers(headers, rate_limited):
+    """
+    Returns how long to wait according to rate-limit response headers, or None.
+
+    Retry-After is honoured whenever present. X-RateLimit-Reset is only used
+    when the request was rate limited or X-RateLimit-Remaining is 0.
+    """
+    if not headers:
+        return None
+
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        delay = _parse_duration(retry_after)
+        if delay is None:
+            try:
+                delay = (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                delay = None
+        if delay is not None:
+            return max(delay, 0.0)
+
+    remaining = headers.get("x-ratelimit-remaining")
+    reset = headers.get("x-ratelimit-reset")
+    if reset and (rate_limited or (remaining is not None and remaining.strip() == "0")):
+        delay = _parse_reset(reset)
+        if delay is not None:
+            return max(delay, 0.0)
+    return None
+
+
+# The process-wide scheduler used by llm_client
+scheduler = RateLimitScheduler()
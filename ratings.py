@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Bradley-Terry ratings for participant and interrogator models.
+
+Every complete game is a match between its participant and its
+interrogator: the participant wins on a "Human" verdict, the interrogator
+on "AI". Both roles are rated jointly on one scale, so beating strong
+interrogators counts for more than beating weak ones, and a Gaussian prior
+(RATING_PRIOR) shrinks models with few games towards the middle instead of
+ranking them on a lucky streak.
+
+The fit is a vectorized Newton solve over the per-pairing win counts in
+pair_stats, and 95% intervals come from a Poisson bootstrap over games,
+with all bootstrap replicates solved as one batch. Fitting runs in a
+background thread (start_ratings_refresher) whenever games were added, and
+the results are cached in the model_ratings table, so /api/leaderboard
+never fits on the request path. Between fits, every saved game applies a
+cheap Elo update (see database.RATING_K).
+
+Usage:
+    python ratings.py        # refit now and print the ratings
+"""
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from database import get_rating_pairs, replace_model_ratings, create_table_if_not_exists, RATING_BASE
+
+RATINGS_REFRESH_SECONDS = float(os.getenv("RATINGS_REFRESH_SECONDS", "300"))
+RATINGS_BOOTSTRAP_SAMPLES = int(os.getenv("RATINGS_BOOTSTRAP_SAMPLES", "200"))
+# Precision of the zero-mean Gaussian prior on ratings (in log-odds); larger values shrink harder
+RATING_PRIOR = float(os.getenv("RATING_PRIOR", "0.25"))
+
+ELO_SCALE = 400 / math.log(10)
+# Bound on the Newton systems solved at once (bootstrap replicates x players^2), to cap memory
+_MAX_BATCH_ELEMENTS = 4_000_000
+
+_refresher_lock = threading.Lock()
+_refresher = None
+
+
+def fit_bradley_terry(participants, interrogators, wins, losses, n_players, prior=RATING_PRIOR,
+                      max_iterations=50, tolerance=1e-8):
+    """
+    Fits Bradley-Terry ratings by Newton's method with a Gaussian prior.
+
+    `participants` and `interrogators` are player indices per pairing, and
+    `wins`/`losses` the participant's wins and losses in it, either one row
+    of counts or a (replicates, pairings) array to fit many datasets at once.
+    Returns log-odds ratings shaped (players,) or (replicates, players).
+    """
+    wins = np.asarray(wins, dtype=float)
+    losses = np.asarray(losses, dtype=float)
+    single = wins.ndim == 1
+    wins, losses = np.atleast_2d(wins), np.atleast_2d(losses)
+    replicates = wins.shape[0]
+    games = wins + losses
+    every = slice(None)
+
+    ratings = np.zeros((replicates, n_players))
+    identity = np.eye(n_players) * prior
+    for _ in range(max_iterations):
+        expected = 1 / (1 + np.exp(ratings[:, interrogators] - ratings[:, participants]))
+        residual = wins - games * expected
+        gradient = -prior * ratings
+        np.add.at(gradient, (every, participants), residual)
+        np.add.at(gradient, (every, interrogators), -residual)
+
+        weight = games * expected * (1 - expected)
+        hessian = np.broadcast_to(identity, (replicates, n_players, n_players)).copy()
+        np.add.at(hessian, (every, participants, participants), weight)
+        np.add.at(hessian, (every, interrogators, interrogators), weight)
+        np.add.at(hessian, (every, participants, interrogators), -weight)
+        np.add.at(hessian, (every, interrogators, participants), -weight)
+
+        step = np.linalg.solve(hessian, gradient[..., None])[..., 0]
+        ratings += step
+        if np.abs(step).max() < tolerance:
+            break
+    return ratings[0] if single else ratings
+
+
+def compute_ratings(pairs, bootstrap_samples=RATINGS_BOOTSTRAP_SAMPLES, prior=RATING_PRIOR, seed=None):
+    """
+    Fits ratings from pair_stats rows. Returns [{model, role, rating, games,
+    ci_low, ci_high}] on the Elo scale, best first within each role.
+    """
+    if not pairs:
+        return []
+    players = {}
+    for pair in pairs:
+        players.setdefault((pair["participant_model"], "participant"), len(players))
+        players.setdefault((pair["interrogator_model"], "interrogator"), len(players))
+    participants = np.array([players[(p["participant_model"], "participant")] for p in pairs])
+    interrogators = np.array([players[(p["interrogator_model"], "interrogator")] for p in pairs])
+    wins = np.array([p["human_verdicts"] for p in pairs], dtype=float)
+    losses = np.array([p["ai_verdicts"] for p in pairs], dtype=float)
+    n_players = len(players)
+
+    ratings = fit_bradley_terry(participants, interrogators, wins, losses, n_players, prior)
+    games = np.zeros(n_players)
+    np.add.at(games, participants, wins + losses)
+    np.add.at(games, interrogators, wins + losses)
+
+    low = high = None
+    if bootstrap_samples > 0:
+        # Poisson bootstrap: every game is drawn Poisson(1) times, so each pairing's counts resample independently
+        rng = np.random.default_rng(seed)
+        chunk = max(1, _MAX_BATCH_ELEMENTS // (n_players * n_players))
+        samples = []
+        for start in range(0, bootstrap_samples, chunk):
+            size = (min(chunk, bootstrap_samples - start), len(pairs))
+            samples.append(fit_bradley_terry(participants, interrogators, rng.poisson(wins, size),
+                                             rng.poisson(losses, size), n_players, prior))
+        low, high = np.percentile(np.concatenate(samples), [2.5, 97.5], axis=0)
+
+    results = []
+    for (model, role), index in players.items():
+        results.append({
+            "model": model,
+            "role": role,
+            "rating": RATING_BASE + ELO_SCALE * ratings[index],
+            "games": int(games[index]),
+            "ci_low": RATING_BASE + ELO_SCALE * low[index] if low is not None else None,
+            "ci_high": RATING_BASE + ELO_SCALE * high[index] if high is not None else None,
+        })
+    results.sort(key=lambda r: (r["role"], -r["rating"]))
+    return results
+
+
+def refresh_ratings():
+    """Refits all ratings from the current results and caches them. Returns the ratings."""
+    ratings = compute_ratings(get_rating_pairs())
+    if ratings:
+        replace_model_ratings(ratings)
+    return ratings
+
+
+def _total_games(pairs):
+    return sum(pair["human_verdicts"] + pair["ai_verdicts"] for pair in pairs)
+
+
+def _refresh_loop(interval):
+    fitted_games = None
+    while True:
+        try:
+            pairs = get_rating_pairs()
+            total = _total_games(pairs)
+            if total and total != fitted_games:
+                # Games saved while fitting get their Elo step and are overwritten here; the next refit includes them
+                ratings = compute_ratings(pairs)
+                if replace_model_ratings(ratings):
+                    fitted_games = total
+        except Exception as e:
+            print(f"Error refreshing ratings: {e}")
+        time.sleep(interval)
+
+
+def start_ratings_refresher(interval=RATINGS_REFRESH_SECONDS):
+    """Starts (once per process) the daemon thread that refits ratings whenever games have been added."""
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = threading.Thread(target=_refresh_loop, args=(interval,), name="ratings-refresher",
+                                          daemon=True)
+            _refresher.start()
+    return _refresher
+
+
+def main():
+    create_table_if_not_exists()
+    ratings = refresh_ratings()
+    if not ratings:
+        print("No complete games with a Human/AI verdict to rate yet.")
+        return
+    for role in ("participant", "interrogator"):
+        print(f"\n{role.title()} ratings:")
+        for rating in (r for r in ratings if r["role"] == role):
+            # Intervals are None when RATINGS_BOOTSTRAP_SAMPLES is 0
+            interval = (f"[{rating['ci_low']:7.1f}, {rating['ci_high']:7.1f}]" if rating["ci_low"] is not None
+                        else " " * 18)
+            print(f"  {rating['rating']:7.1f}  {interval}  {rating['games']:5d} games  {rating['model']}")
+
+
+if __name__ == "__main__":
+    main()
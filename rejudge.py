@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Bulk re-judging of stored games by other judge models.
+
+A judgment only needs the finished transcript, which is already stored, so
+evaluating a judge model over N games costs N calls instead of replaying N
+whole conversations. Selected games are sent the judgment prompt with their
+stored transcript, concurrently (bounded overall and per provider, as in
+tournaments), and every verdict is stored in the judgments table with
+source 'rejudge', linked to the original run. The runs' own verdicts and
+the leaderboard are left untouched.
+
+Re-running a job is cheap: a (game, judge) pair that already has its
+re-judgments is skipped unless --force is given.
+
+Usage:
+    python rejudge.py --judges openai/gpt-4o anthropic/claude-3.5-sonnet --interrogator openai/gpt-4o-mini --limit 1000
+    python rejudge.py --stats       # accuracy and agreement of every judge so far
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+
+from database import (create_table_if_not_exists, get_rejudge_run_ids, load_judgment_transcript, add_judgments,
+                      get_judge_stats)
+from game import judge_transcript
+from llm_client import get_background_loop
+from prompts import get_judgment_prompt
+from tournament import get_provider, DEFAULT_PROVIDER_CONCURRENCY, DEFAULT_MAX_CONCURRENCY
+
+# Re-judging jobs started through the API, by job_id
+_jobs = {}
+
+
+class RejudgeJob:
+    """Judges a set of stored games again with each of several judge models."""
+
+    def __init__(self, judges, run_ids=None, samples=1, force=False,
+                 provider_concurrency=DEFAULT_PROVIDER_CONCURRENCY, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 **filters):
+        if not isinstance(judges, (list, tuple)) or not judges or not all(isinstance(j, str) and j for j in judges):
+            raise ValueError("judges must be a non-empty list of model ids")
+        if samples < 1:
+            raise ValueError("samples must be at least 1")
+        if provider_concurrency < 1 or max_concurrency < 1:
+            raise ValueError("provider_concurrency and max_concurrency must be at least 1")
+
+        self.job_id = str(uuid.uuid4())
+        self.judges = list(dict.fromkeys(judges))
+        self.samples = samples
+        self.force = force
+        self.provider_concurrency = provider_concurrency
+        self.max_concurrency = max_concurrency
+        self.run_ids = list(run_ids) if run_ids else get_rejudge_run_ids(**filters)
+
+        self.tasks = [
+            {"run_id": run_id, "judge_model": judge, "status": "pending", "error": None}
+            for run_id in self.run_ids
+            for judge in self.judges
+        ]
+        self.judge_stats = {
+            judge: {"judgments": 0, "failed_calls": 0, "ai_verdicts": 0, "agreements": 0} for judge in self.judges
+        }
+        self.status = "pending"
+        self.created_at = datetime.now(timezone.utc).isoformat()
+        self.started_at = None
+        self.finished_at = None
+
+    async def _judge(self, task, stored):
+        existing = stored["judgments"].get(task["judge_model"], {"total": 0, "rejudge": 0})
+        missing = self.samples if self.force else self.samples - existing["rejudge"]
+        if missing <= 0:
+            return "skipped"
+
+        messages = stored["messages"] + [{"role": "user", "content": get_judgment_prompt()}]
+        stats = self.judge_stats[task["judge_model"]]
+        judgments = []
+        for k in range(missing):
+            # Sample numbers continue after the model's earlier judgments of this game, so the seeds differ
+            judgment = await judge_transcript(task["judge_model"], existing["total"] + k, list(messages),
+                                              task["run_id"], role="rejudge")
+            if judgment["verdict"] is None:
+                stats["failed_calls"] += 1
+                continue
+            judgments.append(judgment)
+            stats["judgments"] += 1
+            stats["ai_verdicts"] += judgment["verdict"] == "AI"
+            stats["agreements"] += judgment["verdict"] == stored["verdict"]
+
+        loop = asyncio.get_running_loop()
+        # Judges that failed are not stored, so the next run of the job retries them
+        if judgments and not await loop.run_in_executor(None, add_judgments, task["run_id"], judgments):
+            raise RuntimeError("Could not save judgments")
+        if len(judgments) < missing:
+            raise RuntimeError(f"{missing - len(judgments)} of {missing} judge calls failed")
+        return "complete"
+
+    async def _run_task(self, task, provider_semaphores, global_semaphore, on_progress):
+        async with provider_semaphores[get_provider(task["judge_model"])], global_semaphore:
+            task["status"] = "running"
+            try:
+                loop = asyncio.get_running_loop()
+                stored = await loop.run_in_executor(None, load_judgment_transcript, task["run_id"])
+                if stored is None:
+                    task["status"] = "skipped"
+                    task["error"] = "Run is missing, not complete or has no standard transcript"
+                else:
+                    task["status"] = await self._judge(task, stored)
+            except Exception as e:
+                task["status"] = "failed"
+                task["error"] = str(e)
+                print(f"Re-judging {task['run_id']} with {task['judge_model']} failed: {e}")
+
+        if on_progress:
+            on_progress(self.progress())
+
+    async def run(self, on_progress=None):
+        """Judges every selected game with every judge and returns the final progress report."""
+        provider_semaphores = {
+            provider: asyncio.Semaphore(self.provider_concurrency)
+            for provider in {get_provider(j) for j in self.judges}
+        }
+        global_semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        self.status = "running"
+        self.started_at = time.monotonic()
+        try:
+            await asyncio.gather(*(
+                self._run_task(task, provider_semaphores, global_semaphore, on_progress) for task in self.tasks
+            ))
+            self.status = "complete"
+        except BaseException:
+            self.status = "failed"
+            raise
+        finally:
+            self.finished_at = time.monotonic()
+        return self.progress()
+
+    def progress(self):
+        """Returns task counts, throughput (tasks/min), ETA and per-judge accuracy for the job."""
+        counts = {"pending": 0, "running": 0, "complete": 0, "skipped": 0, "failed": 0}
+        for task in self.tasks:
+            counts[task["status"]] += 1
+        finished = counts["complete"] + counts["skipped"] + counts["failed"]
+        total = len(self.tasks)
+
+        elapsed = 0.0
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        tasks_per_minute = finished / (elapsed / 60) if elapsed > 0 and finished else 0.0
+        eta_seconds = None
+        if tasks_per_minute > 0 and finished < total:
+            eta_seconds = round((total - finished) / tasks_per_minute * 60, 1)
+
+        judges = []
+        for judge, stats in self.judge_stats.items():
+            judged = stats["judgments"]
+            judges.append({
+                "judge_model": judge,
+                **stats,
+                "accuracy": round(stats["ai_verdicts"] / judged * 100, 1) if judged else None,
+                "agreement": round(stats["agreements"] / judged * 100, 1) if judged else None,
+            })
+
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "games": len(self.run_ids),
+            "total_tasks": total,
+            **counts,
+            "elapsed_seconds": round(elapsed, 1),
+            "tasks_per_minute": round(tasks_per_minute, 2),
+            "eta_seconds": eta_seconds,
+            "judges": judges,
+        }
+
+
+def start_rejudge(judges, run_ids=None, samples=1, force=False,
+                  provider_concurrency=DEFAULT_PROVIDER_CONCURRENCY, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                  **filters):
+    """
+    Starts a re-judging job on the shared background event loop and returns it immediately.
+
+    Progress can be polled with get_rejudge_job(job_id).progress().
+    """
+    job = RejudgeJob(judges, run_ids, samples, force, provider_concurrency, max_concurrency, **filters)
+    _jobs[job.job_id] = job
+    asyncio.run_coroutine_threadsafe(job.run(), get_background_loop())
+    return job
+
+
+def get_rejudge_job(job_id):
+    """Returns a job started through start_rejudge, or None."""
+    return _jobs.get(job_id)
+
+
+def list_rejudge_jobs():
+    """Returns progress reports for all re-judging jobs started in this process."""
+    return [job.progress() for job in _jobs.values()]
+
+
+def _print_progress(progress):
+    eta = progress["eta_seconds"]
+    eta_text = f"{int(eta // 60)}m{int(eta % 60):02d}s" if eta is not None else "--"
+    finished = progress["complete"] + progress["skipped"] + progress["failed"]
+    print(f"[{finished}/{progress['total_tasks']}] "
+          f"{progress['skipped']} skipped, {progress['failed']} failed, {progress['running']} running, "
+          f"{progress['tasks_per_minute']:.2f} tasks/min, ETA {eta_text}")
+
+
+def _print_judges(judges):
+    for judge in judges:
+        if judge["accuracy"] is None:
+            print(f"  {judge['judge_model']}: no judgments")
+            continue
+        print(f"  {judge['judge_model']}: {judge['judgments']} judgments, {judge['accuracy']}% correct (AI), "
+              f"{judge['agreement']}% agree with the original verdict")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Judge stored games again with other judge models.")
+    parser.add_argument("--judges", nargs="+", help="Judge model ids")
+    parser.add_argument("--run-ids", nargs="+", help="Specific runs to re-judge (instead of the filters)")
+    parser.add_argument("--participant", help="Only games with this participant model")
+    parser.add_argument("--interrogator", help="Only games with this interrogator model")
+    parser.add_argument("--verdict", choices=("Human", "AI", "Unknown"), help="Only games with this verdict")
+    parser.add_argument("--since", help="Only games created at or after this time (YYYY-MM-DD[ HH:MM:SS])")
+    parser.add_argument("--until", help="Only games created before this time")
+    parser.add_argument("--limit", type=int, help="At most this many games (oldest first)")
+    parser.add_argument("--samples", type=int, default=1, help="Judgments per judge and game")
+    parser.add_argument("--force", action="store_true", help="Judge again even where re-judgments exist")
+    parser.add_argument("--provider-concurrency", type=int, default=DEFAULT_PROVIDER_CONCURRENCY,
+                        help="Maximum concurrent calls to the same provider")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="Maximum concurrent calls overall")
+    parser.add_argument("--stats", action="store_true", help="Print stored judge accuracy and exit")
+    args = parser.parse_args()
+
+    create_table_if_not_exists()
+    if args.stats:
+        _print_judges(get_judge_stats())
+        return
+    if not args.judges:
+        parser.error("--judges is required")
+
+    job = RejudgeJob(args.judges, args.run_ids, args.samples, args.force, args.provider_concurrency,
+                     args.max_concurrency, participant_model=args.participant, interrogator_model=args.interrogator,
+                     verdict=args.verdict, created_after=args.since, created_before=args.until, limit=args.limit)
+    print(f"--- Re-judging {len(job.run_ids)} games with {len(job.judges)} judges ({job.job_id}) ---")
+    final = asyncio.run(job.run(on_progress=_print_progress))
+    print(f"--- Finished: {final['complete']} complete, {final['skipped']} skipped, {final['failed']} failed "
+          f"in {final['elapsed_seconds']}s ---")
+    _print_judges(final["judges"])
+
+
+if __name__ == "__main__":
+    main()
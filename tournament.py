@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Round-robin tournament runner for the LLM Turing Test Battle.
+
+Plays every participant model against every interrogator model, N times,
+concurrently on one event loop. Parallelism is bounded overall and per
+provider (the "provider/" prefix of the model id), and every game is saved
+through save_game_run so the results feed the leaderboard.
+
+Usage:
+    python tournament.py --participants a/x b/y --interrogators c/z --repetitions 3
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+
+from database import create_table_if_not_exists
+from game import play_turing_test_game_async, validate_judge_panel, NUMBER_OF_QUESTIONS, JUDGE_PANEL
+from llm_client import get_background_loop
+
+DEFAULT_PROVIDER_CONCURRENCY = 2
+DEFAULT_MAX_CONCURRENCY = 8
+
+# Tournaments started through the API, by tournament_id
+_tournaments = {}
+
+
+def get_provider(model_id):
+    """Returns the provider prefix of a model id, e.g. 'openai' for 'openai/gpt-4o-mini'."""
+    return model_id.split('/')[0]
+
+
+def _is_model_list(models):
+    return isinstance(models, (list, tuple)) and bool(models) and all(isinstance(m, str) and m for m in models)
+
+
+class Tournament:
+    """A scheduled cross-product of participant and interrogator models."""
+
+    def __init__(self, participants, interrogators, repetitions=1, num_questions=NUMBER_OF_QUESTIONS,
+                 provider_concurrency=DEFAULT_PROVIDER_CONCURRENCY, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 adaptive=False, judges=None, judge_aggregation=None):
+        if not _is_model_list(participants) or not _is_model_list(interrogators):
+            raise ValueError("participants and interrogators must be non-empty lists of model ids")
+        if repetitions < 1:
+            raise ValueError("repetitions must be at least 1")
+        if provider_concurrency < 1 or max_concurrency < 1:
+            raise ValueError("provider_concurrency and max_concurrency must be at least 1")
+        validate_judge_panel(judges, judge_aggregation)
+
+        self.tournament_id = str(uuid.uuid4())
+        self.participants = list(participants)
+        self.interrogators = list(interrogators)
+        self.repetitions = repetitions
+        self.num_questions = num_questions
+        self.provider_concurrency = provider_concurrency
+        self.max_concurrency = max_concurrency
+        self.adaptive = adaptive
+        self.judges = judges
+        self.judge_aggregation = judge_aggregation
+
+        self.games = [
+            {"participant_model": p, "interrogator_model": i, "repetition": r + 1,
+             "run_id": str(uuid.uuid4()), "status": "pending", "error": None}
+            for r in range(repetitions)
+            for p in self.participants
+            for i in self.interrogators
+        ]
+        self.status = "pending"
+        self.created_at = datetime.now(timezone.utc).isoformat()
+        self.started_at = None
+        self.finished_at = None
+
+    def _panel(self):
+        """Returns the extra judge models each game is judged by (JUDGE_PANEL unless judges was given)."""
+        return list(JUDGE_PANEL if self.judges is None else self.judges)
+
+    async def _play_game(self, game, provider_semaphores, global_semaphore, on_progress):
+        # Acquire provider slots in a fixed (sorted) order so games sharing providers cannot deadlock.
+        # The judge panel's calls count against their providers too.
+        models = [game["participant_model"], game["interrogator_model"], *self._panel()]
+        providers = sorted({get_provider(m) for m in models})
+        for provider in providers:
+            await provider_semaphores[provider].acquire()
+        try:
+            async with global_semaphore:
+                game["status"] = "running"
+                try:
+                    async for _ in play_turing_test_game_async(
+                        game["participant_model"], game["interrogator_model"], self.num_questions,
+                        run_id=game["run_id"], run_by="tournament", adaptive=self.adaptive,
+                        judges=self.judges, judge_aggregation=self.judge_aggregation
+                    ):
+                        pass
+                    game["status"] = "complete"
+                except Exception as e:
+                    game["status"] = "failed"
+                    game["error"] = str(e)
+                    print(f"Tournament game {game['run_id']} failed: {e}")
+        finally:
+            for provider in reversed(providers):
+                provider_semaphores[provider].release()
+
+        if on_progress:
+            on_progress(self.progress())
+
+    async def run(self, on_progress=None):
+        """Plays all games and returns the final progress report."""
+        models = self.participants + self.interrogators + self._panel()
+        provider_semaphores = {
+            provider: asyncio.Semaphore(self.provider_concurrency)
+            for provider in {get_provider(m) for m in models}
+        }
+        global_semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        self.status = "running"
+        self.started_at = time.monotonic()
+        try:
+            await asyncio.gather(*(
+                self._play_game(game, provider_semaphores, global_semaphore, on_progress)
+                for game in self.games
+            ))
+            self.status = "complete"
+        except BaseException:
+            self.status = "failed"
+            raise
+        finally:
+            self.finished_at = time.monotonic()
+        return self.progress()
+
+    def progress(self):
+        """Returns counts, throughput (games/min) and ETA for the tournament."""
+        counts = {"pending": 0, "running": 0, "complete": 0, "failed": 0}
+        for game in self.games:
+            counts[game["status"]] += 1
+        finished = counts["complete"] + counts["failed"]
+        total = len(self.games)
+
+        elapsed = 0.0
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        games_per_minute = finished / (elapsed / 60) if elapsed > 0 and finished else 0.0
+        eta_seconds = None
+        if games_per_minute > 0 and finished < total:
+            eta_seconds = round((total - finished) / games_per_minute * 60, 1)
+
+        return {
+            "tournament_id": self.tournament_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "total_games": total,
+            "completed": counts["complete"],
+            "failed": counts["failed"],
+            "running": counts["running"],
+            "pending": counts["pending"],
+            "elapsed_seconds": round(elapsed, 1),
+            "games_per_minute": round(games_per_minute, 2),
+            "eta_seconds": eta_seconds,
+        }
+
+
+def start_tournament(participants, interrogators, repetitions=1, num_questions=NUMBER_OF_QUESTIONS,
+                     provider_concurrency=DEFAULT_PROVIDER_CONCURRENCY, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                     adaptive=False, judges=None, judge_aggregation=None):
+    """
+    Starts a tournament on the shared background event loop and returns it immediately.
+
+    Progress can be polled with get_tournament(tournament_id).progress().
+    """
+    tournament = Tournament(participants, interrogators, repetitions, num_questions,
+                            provider_concurrency, max_concurrency, adaptive, judges, judge_aggregation)
+    _tournaments[tournament.tournament_id] = tournament
+    asyncio.run_coroutine_threadsafe(tournament.run(), get_background_loop())
+    return tournament
+
+
+def get_tournament(tournament_id):
+    """Returns a tournament started through start_tournament, or None."""
+    return _tournaments.get(tournament_id)
+
+
+def list_tournaments():
+    """Returns progress reports for all tournaments started in this process."""
+    return [t.progress() for t in _tournaments.values()]
+
+
+def _print_progress(progress):
+    eta = progress["eta_seconds"]
+    eta_text = f"{int(eta // 60)}m{int(eta % 60):02d}s" if eta is not None else "--"
+    finished = progress["completed"] + progress["failed"]
+    print(f"[{finished}/{progress['total_games']}] "
+          f"{progress['failed']} failed, {progress['running']} running, "
+          f"{progress['games_per_minute']:.2f} games/min, ETA {eta_text}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a round-robin Turing test tournament.")
+    parser.add_argument("--participants", nargs="+", required=True, help="Participant model ids")
+    parser.add_argument("--interrogators", nargs="+", required=True, help="Interrogator model ids")
+    parser.add_argument("-n", "--repetitions", type=int, default=1, help="Games per pairing")
+    parser.add_argument("-q", "--num-questions", type=int, default=NUMBER_OF_QUESTIONS)
+    parser.add_argument("--provider-concurrency", type=int, default=DEFAULT_PROVIDER_CONCURRENCY,
+                        help="Maximum concurrent games touching the same provider")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="Maximum concurrent games overall")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Let interrogators give their verdict early once confident (-q becomes the maximum)")
+    parser.add_argument("--judges", nargs="+", default=None,
+                        help="Extra judge models for every game (repeat a model id to sample it several times)")
+    parser.add_argument("--judge-aggregation", choices=("majority", "confidence"), default=None,
+                        help="How panel verdicts are combined (default: JUDGE_AGGREGATION)")
+    args = parser.parse_args()
+
+    create_table_if_not_exists()
+    tournament = Tournament(args.participants, args.interrogators, args.repetitions, args.num_questions,
+                            args.provider_concurrency, args.max_concurrency, args.adaptive,
+                            args.judges, args.judge_aggregation)
+    print(f"--- Tournament {tournament.tournament_id}: {len(tournament.games)} games ---")
+    final = asyncio.run(tournament.run(on_progress=_print_progress))
+    print(f"--- Tournament finished: {final['completed']} complete, {final['failed']} failed "
+          f"in {final['elapsed_seconds']}s ({final['games_per_minute']:.2f} games/min) ---")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,20 +2,32 @@
 import os
 import sys
 from flask import Flask, render_template, request, jsonify, Response
-import json
 
 # Add the parent directory to the Python path to access game.py and get_models.py
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from game import play_turing_test_game
-from get_models import get_model_list
-from database import create_table_if_not_exists, get_past_battles, get_battle_details, get_leaderboard_stats
+from jobs import pool, stream_game_events, resume_interrupted_games, QueueFullError, RESUME_ON_STARTUP
+from get_models import get_model_list, get_model_index, search_models
+from rate_limiter import scheduler
+from metrics import render_prometheus, format_gauge, start_latency_stats_refresher
+from tournament import start_tournament, get_tournament, list_tournaments
+from ratings import start_ratings_refresher
+from http_cache import cached_json, compress_response, parse_db_timestamp, IMMUTABLE, REVALIDATE, NO_STORE
+from rejudge import start_rejudge, get_rejudge_job, list_rejudge_jobs
+from export import export_chunks, resolve_format, parse_watermark, current_watermark, next_watermark, CONTENT_TYPES, FILE_EXTENSIONS
+from database import create_table_if_not_exists, get_unfinished_game_runs, get_battles_page, decode_battle_cursor, get_battle_details, get_leaderboard_stats, search_transcripts, get_change_version, get_battle_version
 
 app = Flask(__name__)
+app.after_request(compress_response)
 
 # --- Database Initialization ---
 with app.app_context():
     create_table_if_not_exists()
+    if RESUME_ON_STARTUP:
+        for run_id in resume_interrupted_games():
+            print(f"Resuming interrupted game {run_id}")
+    start_ratings_refresher()
+    start_latency_stats_refresher()
 
 @app.route('/')
 def index():
@@ -28,10 +40,36 @@ def index():
 def api_get_models():
     """
     API endpoint to get the list of available models.
+
+    Returns the compact projection (id, name, context length, pricing) unless
+    full=true is passed. Revalidated by ETag against the catalogue version.
+    """
+    index = get_model_index()
+    if request.args.get('full', 'false').lower() == 'true':
+        return cached_json(('models', index['version'], 'full'),
+                           lambda: {'models': get_model_list(), 'providers': index['providers']})
+    return cached_json(('models', index['version']),
+                       lambda: {'models': index['slim'], 'providers': index['providers']})
+
+@app.route('/api/models/search')
+def api_search_models():
     """
-    models = get_model_list()
-    providers = sorted(list(set(model.get('id', '').split('/')[0] for model in models)))
-    return jsonify({'models': models, 'providers': providers})
+    API endpoint to search models by id/name prefix or substring, with optional
+    provider filter and pagination (offset/limit).
+    """
+    try:
+        offset = max(int(request.args.get('offset', 0)), 0)
+        limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
+
+    results = search_models(
+        query=request.args.get('q', ''),
+        provider=request.args.get('provider') or None,
+        offset=offset,
+        limit=limit,
+    )
+    return jsonify(results)
 
 @app.route('/api/check_api_key')
 def check_api_key():
@@ -45,25 +83,149 @@ def check_api_key():
 def play():
     """
     API endpoint to play the Turing Test game.
+
+    The game is queued on the background worker pool and its events are
+    streamed back; closing the connection does not stop the game.
     """
     participant_model = request.args.get('participant_model')
     interrogator_model = request.args.get('interrogator_model')
     num_questions = int(request.args.get('num_questions', 5))
+    stream = request.args.get('stream', 'false').lower() == 'true'
+    adaptive = request.args.get('adaptive', 'false').lower() == 'true'
+    judges = [model for model in request.args.get('judges', '').split(',') if model] or None
+    judge_aggregation = request.args.get('judge_aggregation')
 
     if not all([participant_model, interrogator_model]):
         return jsonify({
             'error': 'Both participant and interrogator models must be selected'
         }), 400
 
+    try:
+        job = pool.submit(participant_model, interrogator_model, num_questions, stream=stream, adaptive=adaptive,
+                          judges=judges, judge_aggregation=judge_aggregation)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
+
+    return _sse_response(job.follow())
+
+def _sse_response(events):
+    """
+    Wraps an iterator of (seq, data) events as a text/event-stream response.
+
+    Events with a seq carry an SSE id so EventSource can resume with
+    Last-Event-ID; None items become keepalive comments.
+    """
     def event_stream():
-        try:
-            for message in play_turing_test_game(participant_model, interrogator_model, num_questions):
-                yield f"data: {message}\n\n"
-        except Exception as e:
-            error_msg = f"Game error: {str(e)}. Please check your API key and model selection."
-            yield f"data: {json.dumps({'error': error_msg})}\n\n"
+        for event in events:
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            seq, data = event
+            if seq is not None:
+                yield f"id: {seq}\n"
+            yield f"data: {data}\n\n"
+
+    # Disable caching and proxy buffering so each delta reaches the browser immediately
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(event_stream(), mimetype='text/event-stream', headers=headers)
+
+def _json_flag(data, name, default):
+    """
+    Reads a boolean field from a JSON body: true/false, or the strings
+    'true'/'false' as query parameters take them. Raises ValueError otherwise.
+    """
+    value = data.get(name, default)
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in ('true', 'false'):
+        return value.lower() == 'true'
+    raise ValueError(f"'{name}' must be true or false")
+
+@app.route('/api/games', methods=['POST'])
+def api_submit_game():
+    """
+    API endpoint to queue a game on the background worker pool.
+
+    Returns the run_id immediately; follow the game at /api/games/<run_id>/events.
+    """
+    data = request.get_json(silent=True) or {}
+    participant_model = data.get('participant_model')
+    interrogator_model = data.get('interrogator_model')
+
+    if not all([participant_model, interrogator_model]):
+        return jsonify({
+            'error': 'Both participant and interrogator models must be selected'
+        }), 400
+
+    try:
+        job = pool.submit(
+            participant_model,
+            interrogator_model,
+            int(data.get('num_questions', 5)),
+            stream=_json_flag(data, 'stream', True),
+            adaptive=_json_flag(data, 'adaptive', False),
+            judges=data.get('judges'),
+            judge_aggregation=data.get('judge_aggregation'),
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
+
+    return jsonify(job.info()), 202
+
+@app.route('/api/games')
+def api_list_games():
+    """
+    API endpoint to list games running or recently run by this server process, with pool capacity,
+    and the checkpointed games that never completed.
+    """
+    return jsonify({'pool': pool.stats(), 'games': pool.list_jobs(), 'unfinished': get_unfinished_game_runs()})
 
-    return Response(event_stream(), mimetype='text/event-stream')
+@app.route('/api/games/<run_id>/resume', methods=['POST'])
+def api_resume_game(run_id):
+    """
+    API endpoint to continue a failed or interrupted game from its last checkpointed turn.
+
+    The game keeps its run_id; follow it at /api/games/<run_id>/events.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        stream = _json_flag(data, 'stream', True)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        job = pool.resume(run_id, stream=stream)
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
+
+    return jsonify(job.info()), 202
+
+@app.route('/api/games/<run_id>/events')
+def api_game_events(run_id):
+    """
+    SSE endpoint following a game's events.
+
+    Reconnecting clients resume after the event named by the Last-Event-ID
+    header (or the last_event_id query parameter); several clients may follow
+    the same game.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0
+    try:
+        after_seq = int(last_event_id)
+    except ValueError:
+        return jsonify({'error': 'Last-Event-ID must be an integer'}), 400
+
+    events = stream_game_events(run_id, after_seq)
+    if events is None:
+        return jsonify({'error': 'Game not found'}), 404
+    return _sse_response(events)
 
 @app.route('/battles')
 def battles():
@@ -75,29 +237,268 @@ def battles():
 @app.route('/api/battles')
 def api_get_battles():
     """
-    API endpoint to get past battles.
+    API endpoint to get past battles, newest first.
+
+    Supports keyset pagination (pass back `next_cursor` as `cursor`), `limit`,
+    and filtering by `participant_model`, `interrogator_model` and `verdict`.
+    Responses carry an ETag/Last-Modified from the battles change counter.
     """
-    battles = get_past_battles()
-    return jsonify({'battles': battles})
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 200)
+        cursor = request.args.get('cursor')
+        cursor = decode_battle_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    def build():
+        return get_battles_page(
+            limit=limit,
+            cursor=cursor,
+            participant_model=request.args.get('participant_model'),
+            interrogator_model=request.args.get('interrogator_model'),
+            verdict=request.args.get('verdict'),
+        )
+
+    version = get_change_version('battles')
+    if version is None:
+        return jsonify(build())
+    return cached_json(('battles', *version), build, parse_db_timestamp(version[1]))
 
 @app.route('/api/battle/<run_id>')
 def api_get_battle_details(run_id):
     """
     API endpoint to get detailed battle information including full conversation.
+
+    The conversation is sent once as `turns`; pass transcripts=true to also get
+    the role-specific interrogator/participant transcripts. Complete battles
+    requested with ?v=<version> (as listed by /api/battles) are served with
+    immutable caching, and otherwise revalidated by ETag. Games still being
+    played change several times a second and are never cached.
     """
-    battle = get_battle_details(run_id)
-    if battle:
-        return jsonify({'battle': battle})
-    else:
+    include_transcripts = request.args.get('transcripts', 'false').lower() == 'true'
+    version = get_battle_version(run_id)
+    if version is None:
         return jsonify({'error': 'Battle not found'}), 404
 
+    status, battle_version, _ = version
+    if status != 'complete' or battle_version is None:
+        payload = _battle_payload(run_id, include_transcripts)
+        if payload is None:
+            return jsonify({'error': 'Battle not found'}), 404
+        response = jsonify(payload)
+        response.headers['Cache-Control'] = NO_STORE
+        return response
+
+    # A complete battle only changes when re-judged, which changes its version: under ?v=<version> it is immutable.
+    # No Last-Modified: updated_at has one-second resolution, so only the ETag tells re-judged versions apart.
+    immutable = request.args.get('v') == battle_version
+    response = cached_json(
+        ('battle', run_id, battle_version, include_transcripts),
+        lambda: _battle_payload(run_id, include_transcripts),
+        cache_control=IMMUTABLE if immutable else REVALIDATE,
+    )
+    return response if response is not None else (jsonify({'error': 'Battle not found'}), 404)
+
+def _battle_payload(run_id, include_transcripts):
+    battle = get_battle_details(run_id, include_transcripts=include_transcripts)
+    return {'battle': battle} if battle else None
+
+@app.route('/api/search')
+def api_search():
+    """
+    API endpoint for full-text search over questions, answers and judgments.
+
+    Takes `q` (all words must match; "quoted phrases" and prefix* terms work),
+    `offset`/`limit` pagination, and filters `model` (the model that wrote the
+    text), `participant_model`, `interrogator_model`, `verdict`, `speaker` and
+    `source`. Hits are ranked best first, with <mark>-highlighted snippets.
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+    try:
+        offset = max(int(request.args.get('offset', 0)), 0)
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
+
+    results = search_transcripts(
+        query,
+        limit=limit,
+        offset=offset,
+        model=request.args.get('model'),
+        participant_model=request.args.get('participant_model'),
+        interrogator_model=request.args.get('interrogator_model'),
+        verdict=request.args.get('verdict'),
+        speaker=request.args.get('speaker'),
+        source=request.args.get('source'),
+    )
+    return jsonify(results)
+
+@app.route('/api/export')
+def api_export():
+    """
+    API endpoint streaming all complete game runs as `format` (ndjson, csv,
+    parquet or arrow; parquet/arrow fall back to csv without pyarrow).
+
+    Pass `since` (a watermark) to get only runs saved after it. The
+    X-Export-Watermark response header is the watermark for the next
+    incremental export.
+    """
+    try:
+        fmt = resolve_format(request.args.get('format'))
+        since = request.args.get('since')
+        since = parse_watermark(since) if since else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    until = current_watermark()
+    return Response(
+        export_chunks(fmt, since=since, until=until),
+        mimetype=CONTENT_TYPES[fmt],
+        headers={
+            'Content-Disposition': f'attachment; filename=game_runs.{FILE_EXTENSIONS[fmt]}',
+            'X-Export-Watermark': next_watermark(since, until),
+        },
+    )
+
 @app.route('/api/leaderboard')
 def api_get_leaderboard():
     """
-    API endpoint to get leaderboard statistics.
+    API endpoint to get leaderboard statistics, revalidated by ETag against the
+    leaderboard change counter.
+    """
+    version = get_change_version('leaderboard')
+    if version is None:
+        return jsonify(get_leaderboard_stats())
+    return cached_json(('leaderboard', *version), get_leaderboard_stats, parse_db_timestamp(version[1]))
+
+@app.route('/api/rate_limits')
+def api_get_rate_limits():
     """
-    stats = get_leaderboard_stats()
-    return jsonify(stats)
+    API endpoint to get request scheduler queue depth and wait times per model and provider.
+    """
+    return jsonify({'rate_limits': scheduler.get_stats()})
+
+@app.route('/metrics')
+def metrics():
+    """
+    Prometheus scrape endpoint: model call counts, latency and time-to-first-token
+    histograms, tokens and estimated cost per model, plus game pool and
+    request scheduler gauges.
+    """
+    pool_stats = pool.stats()
+    scheduler_stats = scheduler.get_stats()
+    body = render_prometheus() + "\n".join([
+        format_gauge('game_pool_workers', 'Configured game workers.', [({}, pool_stats['workers'])]),
+        format_gauge('game_pool_busy', 'Games being played.', [({}, pool_stats['busy'])]),
+        format_gauge('game_pool_queued', 'Games waiting for a worker.', [({}, pool_stats['queued'])]),
+        format_gauge('llm_scheduler_queue_depth', 'Model calls waiting on the rate limiter.',
+                     [({'key': key}, stats['queue_depth']) for key, stats in sorted(scheduler_stats.items())]),
+    ]) + "\n"
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/tournaments', methods=['POST'])
+def api_start_tournament():
+    """
+    API endpoint to start a round-robin tournament in the background.
+    """
+    data = request.get_json(silent=True) or {}
+    participants = data.get('participants') or []
+    interrogators = data.get('interrogators') or []
+
+    if not participants or not interrogators:
+        return jsonify({
+            'error': 'At least one participant and one interrogator model must be given'
+        }), 400
+
+    try:
+        tournament = start_tournament(
+            participants,
+            interrogators,
+            repetitions=int(data.get('repetitions', 1)),
+            num_questions=int(data.get('num_questions', 5)),
+            provider_concurrency=int(data.get('provider_concurrency', 2)),
+            max_concurrency=int(data.get('max_concurrency', 8)),
+            adaptive=_json_flag(data, 'adaptive', False),
+            judges=data.get('judges'),
+            judge_aggregation=data.get('judge_aggregation'),
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(tournament.progress()), 202
+
+@app.route('/api/tournaments')
+def api_list_tournaments():
+    """
+    API endpoint to list tournaments started by this server process.
+    """
+    return jsonify({'tournaments': list_tournaments()})
+
+@app.route('/api/tournaments/<tournament_id>')
+def api_get_tournament(tournament_id):
+    """
+    API endpoint to get progress, throughput and ETA for a tournament.
+    """
+    tournament = get_tournament(tournament_id)
+    if tournament:
+        return jsonify(tournament.progress())
+    else:
+        return jsonify({'error': 'Tournament not found'}), 404
+
+
+@app.route('/api/rejudge', methods=['POST'])
+def api_start_rejudge():
+    """
+    API endpoint to re-judge stored games with other judge models in the background.
+
+    Takes `judges`, then either `run_ids` or the filters `participant_model`,
+    `interrogator_model`, `verdict`, `created_after`, `created_before` and
+    `limit`, plus `samples`, `force` and the concurrency limits.
+    """
+    data = request.get_json(silent=True) or {}
+    judges = data.get('judges') or []
+    if not judges or not isinstance(judges, list):
+        return jsonify({'error': 'judges must be a non-empty list of model ids'}), 400
+
+    try:
+        job = start_rejudge(
+            judges,
+            run_ids=data.get('run_ids'),
+            samples=int(data.get('samples', 1)),
+            force=_json_flag(data, 'force', False),
+            provider_concurrency=int(data.get('provider_concurrency', 2)),
+            max_concurrency=int(data.get('max_concurrency', 8)),
+            participant_model=data.get('participant_model'),
+            interrogator_model=data.get('interrogator_model'),
+            verdict=data.get('verdict'),
+            created_after=data.get('created_after'),
+            created_before=data.get('created_before'),
+            limit=int(data['limit']) if data.get('limit') else None,
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(job.progress()), 202
+
+@app.route('/api/rejudge')
+def api_list_rejudge_jobs():
+    """
+    API endpoint to list re-judging jobs started by this server process.
+    """
+    return jsonify({'jobs': list_rejudge_jobs()})
+
+@app.route('/api/rejudge/<job_id>')
+def api_get_rejudge_job(job_id):
+    """
+    API endpoint to get progress, throughput, ETA and per-judge accuracy for a re-judging job.
+    """
+    job = get_rejudge_job(job_id)
+    if job:
+        return jsonify(job.progress())
+    else:
+        return jsonify({'error': 'Re-judging job not found'}), 404
 
 
 if __name__ == '__main__':
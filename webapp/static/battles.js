@@ -2,6 +2,8 @@ document.addEventListener('DOMContentLoaded', () => {
     const battlesListDiv = document.getElementById('battles-list');
     const participantLeaderboardDiv = document.getElementById('participant-leaderboard');
     const interrogatorLeaderboardDiv = document.getElementById('interrogator-leaderboard');
+    const latencyLeaderboardDiv = document.getElementById('latency-leaderboard');
+    const ratingsLeaderboardDiv = document.getElementById('ratings-leaderboard');
     const modal = document.getElementById('battle-modal');
     const modalClose = document.getElementById('modal-close');
     const modalTitle = document.getElementById('modal-title');
@@ -11,7 +13,6 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // Load data on page load
     loadLeaderboard();
-    loadBattles();
 
     // Modal close handlers
     modalClose.addEventListener('click', closeModal);
@@ -34,11 +35,64 @@ document.addEventListener('DOMContentLoaded', () => {
 
             displayLeaderboard(participantLeaderboardDiv, data.participant_stats, 'participant');
             displayLeaderboard(interrogatorLeaderboardDiv, data.interrogator_stats, 'interrogator');
+            displayLatencyStats(data.latency_stats);
+            displayRatings(data.participant_ratings, data.interrogator_ratings);
         } catch (error) {
             console.error('Error loading leaderboard:', error);
             participantLeaderboardDiv.innerHTML = '<div class="no-data">Failed to load leaderboard data.</div>';
             interrogatorLeaderboardDiv.innerHTML = '<div class="no-data">Failed to load leaderboard data.</div>';
+            latencyLeaderboardDiv.innerHTML = '<div class="no-data">Failed to load leaderboard data.</div>';
+            ratingsLeaderboardDiv.innerHTML = '<div class="no-data">Failed to load leaderboard data.</div>';
+        }
+    }
+
+    function displayRatings(participantRatings, interrogatorRatings) {
+        const ratings = [
+            ...(participantRatings || []).map(item => ({ ...item, role: 'participant' })),
+            ...(interrogatorRatings || []).map(item => ({ ...item, role: 'interrogator' })),
+        ];
+        if (ratings.length === 0) {
+            ratingsLeaderboardDiv.innerHTML = '<div class="no-data">No rated games yet.</div>';
+            return;
         }
+
+        ratings.sort((a, b) => b.rating - a.rating);
+        ratingsLeaderboardDiv.innerHTML = ratings.map(item => {
+            // Intervals only exist after the first full refit; until then ratings are incremental Elo
+            const interval = item.ci_low !== null && item.ci_high !== null
+                ? ` (${Math.round(item.ci_low)}–${Math.round(item.ci_high)})`
+                : '';
+            return `
+                <div class="leaderboard-item">
+                    <div style="display: flex; align-items: center;">
+                        <span class="leaderboard-model">${item.model} · ${item.role}</span>
+                    </div>
+                    <div class="leaderboard-stats">
+                        <span>${Math.round(item.rating)}${interval}</span>
+                        <span>${item.games} games</span>
+                    </div>
+                </div>
+            `;
+        }).join('');
+    }
+
+    function displayLatencyStats(stats) {
+        if (!stats || stats.length === 0) {
+            latencyLeaderboardDiv.innerHTML = '<div class="no-data">No model calls recorded yet.</div>';
+            return;
+        }
+
+        latencyLeaderboardDiv.innerHTML = stats.map(item => `
+            <div class="leaderboard-item">
+                <div style="display: flex; align-items: center;">
+                    <span class="leaderboard-model">${item.model}</span>
+                </div>
+                <div class="leaderboard-stats">
+                    <span>p50 ${(item.p50_latency_ms / 1000).toFixed(1)}s · p95 ${(item.p95_latency_ms / 1000).toFixed(1)}s</span>
+                    <span>${item.calls} calls</span>
+                </div>
+            </div>
+        `).join('');
     }
 
     function displayLeaderboard(container, stats, type) {
@@ -59,6 +113,7 @@ document.addEventListener('DOMContentLoaded', () => {
                     </div>
                     <div class="leaderboard-stats">
                         <span>${type === 'participant' ? item.fooled_count : item.correct_count}/${item.total_games}</span>
+                        ${item.avg_turns_used != null ? `<span title="Average questions asked">${item.avg_turns_used} Q</span>` : ''}
                         <span class="leaderboard-success-rate">${item.success_rate}%</span>
                     </div>
                 </div>
@@ -68,20 +123,64 @@ document.addEventListener('DOMContentLoaded', () => {
         container.innerHTML = itemsHtml;
     }
 
+    // Infinite scroll state: battles are fetched a page at a time using the server's keyset cursor
+    const BATTLES_PAGE_SIZE = 20;
+    let nextCursor = null;
+    let hasMoreBattles = true;
+    let loadingBattles = false;
+    const battlesSentinel = document.createElement('div');
+    battlesSentinel.className = 'battles-sentinel';
+    battlesListDiv.after(battlesSentinel);
+
+    const battlesObserver = new IntersectionObserver((entries) => {
+        if (entries.some(entry => entry.isIntersecting)) {
+            loadBattles();
+        }
+    }, { rootMargin: '200px' });
+
+    // Battles load after the pagination state above is initialised
+    loadBattles();
+
     async function loadBattles() {
+        if (loadingBattles || !hasMoreBattles) {
+            return;
+        }
+        loadingBattles = true;
+
         try {
-            const response = await fetch('/api/battles');
+            const params = new URLSearchParams({ limit: BATTLES_PAGE_SIZE });
+            if (nextCursor) {
+                params.set('cursor', nextCursor);
+            }
+            const response = await fetch(`/api/battles?${params}`);
             const data = await response.json();
 
-            displayBattles(data.battles);
+            const isFirstPage = !nextCursor;
+            nextCursor = data.next_cursor;
+            hasMoreBattles = Boolean(nextCursor);
+            displayBattles(data.battles, isFirstPage);
+
+            if (hasMoreBattles) {
+                // Re-observing delivers a fresh intersection entry, so a sentinel still in view loads the next page
+                battlesObserver.unobserve(battlesSentinel);
+                battlesObserver.observe(battlesSentinel);
+            } else {
+                battlesObserver.disconnect();
+            }
         } catch (error) {
             console.error('Error loading battles:', error);
-            battlesListDiv.innerHTML = '<div class="no-data">Failed to load battle data.</div>';
+            if (!nextCursor) {
+                battlesListDiv.innerHTML = '<div class="no-data">Failed to load battle data.</div>';
+            }
+            hasMoreBattles = false;
+            battlesObserver.disconnect();
+        } finally {
+            loadingBattles = false;
         }
     }
 
-    function displayBattles(battles) {
-        if (!battles || battles.length === 0) {
+    function displayBattles(battles, isFirstPage) {
+        if (isFirstPage && (!battles || battles.length === 0)) {
             battlesListDiv.innerHTML = '<div class="no-data">No battles yet. <a href="/" style="color: var(--accent-secondary);">Start your first battle!</a></div>';
             return;
         }
@@ -104,7 +203,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 : battle.judgment || 'No judgment available';
 
             return `
-                <div class="battle-card" data-run-id="${battle.run_id}">
+                <div class="battle-card" data-run-id="${battle.run_id}" data-version="${battle.version || ''}">
                     <div class="battle-header">
                         <div class="battle-models">
                             <span class="battle-model">🎭 ${battle.participant_model}</span>
@@ -122,18 +221,22 @@ document.addEventListener('DOMContentLoaded', () => {
             `;
         }).join('');
 
-        battlesListDiv.innerHTML = battlesHtml;
+        if (isFirstPage) {
+            battlesListDiv.innerHTML = battlesHtml;
+        } else {
+            battlesListDiv.insertAdjacentHTML('beforeend', battlesHtml);
+        }
 
-        // Add click handlers for battle cards
-        document.querySelectorAll('.battle-card').forEach(card => {
+        // Add click handlers for newly added battle cards
+        battlesListDiv.querySelectorAll('.battle-card:not([data-bound])').forEach(card => {
+            card.dataset.bound = 'true';
             card.addEventListener('click', () => {
-                const runId = card.dataset.runId;
-                showBattleDetails(runId);
+                showBattleDetails(card.dataset.runId, card.dataset.version);
             });
         });
     }
 
-    async function showBattleDetails(runId) {
+    async function showBattleDetails(runId, version) {
         try {
             modal.classList.remove('hidden');
             modalTitle.textContent = 'Loading battle details...';
@@ -141,7 +244,9 @@ document.addEventListener('DOMContentLoaded', () => {
             modalConversation.innerHTML = '<div class="loading">Loading conversation...</div>';
             modalJudgment.innerHTML = '<div class="loading">Loading judgment...</div>';
 
-            const response = await fetch(`/api/battle/${runId}`);
+            // Versioned URL: a completed battle at this version never changes, so the browser can keep it
+            const query = version ? `?v=${encodeURIComponent(version)}` : '';
+            const response = await fetch(`/api/battle/${runId}${query}`);
             const data = await response.json();
 
             if (data.error) {
@@ -196,21 +301,55 @@ document.addEventListener('DOMContentLoaded', () => {
                     <span class="battle-info-label">Verdict</span>
                     <span class="battle-info-value">
                         <span class="battle-verdict ${verdictClass}">${verdictText}</span>
+                        ${battle.confidence != null ? ` ${Math.round(battle.confidence * 100)}% confident` : ''}
                     </span>
                 </div>
+                ${battle.turns_used != null ? `
+                <div class="battle-info-item">
+                    <span class="battle-info-label">Questions Asked</span>
+                    <span class="battle-info-value">${battle.turns_used}${battle.num_questions ? ` of ${battle.num_questions}` : ''}${battle.confidence_threshold != null ? ' (adaptive)' : ''}</span>
+                </div>` : ''}
+                ${battle.usage && battle.usage.calls ? `
+                <div class="battle-info-item">
+                    <span class="battle-info-label">Model Calls</span>
+                    <span class="battle-info-value">${battle.usage.calls} calls, ${(battle.usage.latency_ms / 1000).toFixed(1)}s,
+                        ${battle.usage.prompt_tokens + battle.usage.completion_tokens} tokens, $${battle.usage.cost_usd.toFixed(4)}</span>
+                </div>` : ''}
             </div>
         `;
 
         // Display conversation
-        displayConversation(battle.conversation);
+        if (battle.turns) {
+            displayTurns(battle.turns);
+        } else {
+            displayConversation(battle.conversation);
+        }
 
-        // Display judgment
+        // Display judgment, and each judge's verdict when a panel judged the game
+        const panel = battle.judgments && battle.judgments.length > 1 ? `
+            <h4>⚖️ Judge Panel (${battle.aggregation || 'majority'})</h4>
+            <div class="judge-panel">${battle.judgments.map(j => `
+                <div>${j.judge_model}${j.sample ? ` #${j.sample + 1}` : ''}: ${j.verdict || 'failed'}${j.confidence != null ? ` (${Math.round(j.confidence * 100)}%)` : ''}</div>`).join('')}
+            </div>` : '';
         modalJudgment.innerHTML = `
             <h4>🕵️‍♂️ Interrogator's Final Judgment</h4>
             <div class="judgment-text">${battle.judgment || 'No judgment available'}</div>
+            ${panel}
         `;
     }
 
+    function displayTurns(turns) {
+        if (turns.length === 0) {
+            modalConversation.innerHTML = '<div class="no-data">No conversation messages found</div>';
+            return;
+        }
+
+        renderConversationFlow(turns.map(turn => ({
+            role: turn.speaker,
+            content: turn.content
+        })));
+    }
+
     function displayConversation(conversationData) {
         try {
             let conversation;
@@ -264,32 +403,36 @@ document.addEventListener('DOMContentLoaded', () => {
                 return;
             }
 
-            const conversationHtml = conversationFlow.map((msg) => {
-                const messageClass = msg.role === 'interrogator' ? 'interrogator' : 'participant';
-                const roleLabel = msg.role === 'interrogator' ? '🕵️‍♂️ Interrogator' : '🎭 Participant';
-                
-                return `
-                    <div class="message ${messageClass}">
-                        <strong>${roleLabel}:</strong> ${msg.content}
-                    </div>
-                `;
-            }).join('');
+            renderConversationFlow(conversationFlow);
+        } catch (error) {
+            console.error('Error parsing conversation:', error);
+            modalConversation.innerHTML = '<div class="no-data">Error parsing conversation data</div>';
+        }
+    }
 
-            modalConversation.innerHTML = `
-                <div class="conversation">
-                    ${conversationHtml}
+    function renderConversationFlow(conversationFlow) {
+        const conversationHtml = conversationFlow.map((msg) => {
+            const messageClass = msg.role === 'interrogator' ? 'interrogator' : 'participant';
+            const roleLabel = msg.role === 'interrogator' ? '🕵️‍♂️ Interrogator' : '🎭 Participant';
+            
+            return `
+                <div class="message ${messageClass}">
+                    <strong>${roleLabel}:</strong> ${msg.content}
                 </div>
             `;
+        }).join('');
 
-            // Scroll to top of conversation
-            const conversationElement = modalConversation.querySelector('.conversation');
-            if (conversationElement) {
-                conversationElement.scrollTop = 0;
+        modalConversation.innerHTML = `
+            <div class="conversation">
+                ${conversationHtml}
+            </div>
+        `;
+
+        // Scroll to top of conversation
+        const conversationElement = modalConversation.querySelector('.conversation');
+        if (conversationElement) {
+            conversationElement.scrollTop = 0;
             }
-        } catch (error) {
-            console.error('Error parsing conversation:', error);
-            modalConversation.innerHTML = '<div class="no-data">Error parsing conversation data</div>';
-        }
     }
 
     function closeModal() {
@@ -2,6 +2,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const participantModelSelect = document.getElementById('participant-model');
     const interrogatorModelSelect = document.getElementById('interrogator-model');
     const numQuestionsInput = document.getElementById('num-questions');
+    const adaptiveInput = document.getElementById('adaptive-stop');
     const startGameBtn = document.getElementById('start-game');
     const gameArea = document.getElementById('game-area');
     const conversationDiv = document.getElementById('conversation');
@@ -243,11 +244,9 @@ document.addEventListener('DOMContentLoaded', () => {
     fetch('/api/models')
         .then(response => response.json())
         .then(data => {
+            // The server sends a compact projection, already sorted by name
             allModels = data.models;
             
-            // Sort models alphabetically
-            allModels.sort((a, b) => a.name.localeCompare(b.name));
-            
             // Prepare options for searchable selects
             const modelOptions = allModels.map(model => ({
                 text: model.name,
@@ -289,6 +288,7 @@ document.addEventListener('DOMContentLoaded', () => {
             if(resetGameBtn) resetGameBtn.remove();
             startGameBtn.disabled = false;
             turnCounter = 0;
+            streamingMessages = {};
             startGameBtn.textContent = 'Start Game';
         });
         startGameBtn.parentNode.appendChild(resetGameBtn);
@@ -309,10 +309,10 @@ document.addEventListener('DOMContentLoaded', () => {
             return;
         }
 
-        startGame(participantModel, interrogatorModel, numQuestions);
+        startGame(participantModel, interrogatorModel, numQuestions, adaptiveInput.checked);
     });
 
-    function startGame(participantModel, interrogatorModel, numQuestions) {
+    function startGame(participantModel, interrogatorModel, numQuestions, adaptive) {
         startGameBtn.disabled = true;
         createResetButton();
         startGameBtn.textContent = 'Playing...';
@@ -320,42 +320,118 @@ document.addEventListener('DOMContentLoaded', () => {
         conversationDiv.innerHTML = '<div class="loading-message">🤖 The game is starting...<br>The interrogator is thinking of the first question.</div>';
         judgmentArea.innerHTML = '';
 
-        eventSource = new EventSource(`/api/play?participant_model=${participantModel}&interrogator_model=${interrogatorModel}&num_questions=${numQuestions}`);
+        fetch('/api/games', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                participant_model: participantModel,
+                interrogator_model: interrogatorModel,
+                num_questions: parseInt(numQuestions, 10),
+                adaptive: adaptive,
+                stream: true
+            })
+        })
+            .then(response => response.json().then(data => ({ ok: response.ok, data })))
+            .then(({ ok, data }) => {
+                if (!ok) {
+                    throw new Error(data.error || 'The game could not be started.');
+                }
+                followGame(data.run_id);
+            })
+            .catch(error => {
+                conversationDiv.innerHTML = `<div class="error-message">❌ ${error.message}<br><small>Please try again in a moment.</small></div>`;
+                finishGame();
+            });
+    }
+
+    function finishGame() {
+        if (eventSource) {
+            eventSource.close();
+            eventSource = null;
+        }
+        startGameBtn.disabled = false;
+        startGameBtn.textContent = 'Start Game';
+    }
+
+    function followGame(runId) {
+        // The game runs on the server regardless of this connection. If it drops,
+        // EventSource reconnects with Last-Event-ID and the server resumes after it.
+        eventSource = new EventSource(`/api/games/${runId}/events`);
+        let reconnecting = false;
+
+        eventSource.onopen = function() {
+            if (reconnecting) {
+                // The in-flight turn is replayed from its first delta
+                Object.values(streamingMessages).forEach(el => { el.textContent = ''; });
+                const streamingJudgment = judgmentArea.querySelector('.streaming-judgment');
+                if (streamingJudgment) streamingJudgment.textContent = '';
+                const notice = conversationDiv.querySelector('.reconnect-message');
+                if (notice) notice.remove();
+                reconnecting = false;
+            }
+        };
 
         eventSource.onmessage = function(event) {
             const data = JSON.parse(event.data);
 
             if (data.error) {
                 conversationDiv.innerHTML = `<div class="error-message">❌ ${data.error}<br><small>Try selecting different models or check your API key configuration.</small></div>`;
-                eventSource.close();
-                eventSource = null;
-                startGameBtn.disabled = false;
-                startGameBtn.textContent = 'Start Game';
+                finishGame();
                 return;
             }
 
-            if (data.role === 'judgment') {
-                displayJudgment(data.content);
-                eventSource.close();
-                eventSource = null;
-                startGameBtn.disabled = false;
-                startGameBtn.textContent = 'Start Game';
-            } else {
+            if (data.type === 'game_started') {
+                return;
+            }
+
+            if (data.type === 'game_complete') {
+                finishGame();
+                return;
+            }
+
+            if (data.type === 'delta') {
+                appendDelta(data);
+                return;
+            }
+
+            if (data.type === 'confidence') {
+                displayConfidence(data);
+                return;
+            }
+
+            if (data.type === 'verdict') {
+                displayJudgment(data);
+                return;
+            }
+
+            // The raw judgment is followed by its parsed 'verdict' event, which is what gets displayed
+            if (data.role !== 'judgment') {
                 updateConversation(data);
             }
         };
 
         eventSource.onerror = function() {
-            conversationDiv.innerHTML += `<div class="error-message">🔌 Connection error occurred.<br><small>Please check your internet connection and try again.</small></div>`;
-            eventSource.close();
-            eventSource = null;
-            startGameBtn.disabled = false;
-            startGameBtn.textContent = 'Start Game';
+            if (eventSource.readyState === EventSource.CLOSED) {
+                conversationDiv.innerHTML += `<div class="error-message">🔌 Connection error occurred.<br><small>Please check your internet connection and try again.</small></div>`;
+                finishGame();
+                return;
+            }
+            if (!reconnecting) {
+                reconnecting = true;
+                conversationDiv.insertAdjacentHTML('beforeend', '<div class="loading-message reconnect-message">🔌 Connection lost, reconnecting...</div>');
+            }
         };
     }
 
     let turnCounter = 0;
-    function updateConversation(msg) {
+    // Message elements still receiving streamed deltas, keyed by role and turn
+    let streamingMessages = {};
+
+    function messageKey(msg) {
+        return `${msg.role}-${msg.turn || 0}`;
+    }
+
+    function createMessageElement(msg) {
         // Remove loading message if present
         const loadingMessage = conversationDiv.querySelector('.loading-message');
         if (loadingMessage) {
@@ -373,14 +449,65 @@ document.addEventListener('DOMContentLoaded', () => {
         const messageEl = document.createElement('div');
         const roleClass = msg.role === 'human' ? 'participant' : msg.role;
         messageEl.classList.add('message', roleClass);
-        messageEl.textContent = msg.content;
         conversationDiv.appendChild(messageEl);
+        return messageEl;
+    }
+
+    function appendDelta(msg) {
+        if (msg.role === 'judgment') {
+            let judgmentText = judgmentArea.querySelector('.streaming-judgment');
+            if (!judgmentText) {
+                judgmentArea.innerHTML = '<h3>Final Judgment</h3>';
+                judgmentText = document.createElement('p');
+                judgmentText.className = 'streaming-judgment';
+                judgmentArea.appendChild(judgmentText);
+            }
+            judgmentText.textContent += msg.delta;
+            return;
+        }
+
+        const key = messageKey(msg);
+        if (!streamingMessages[key]) {
+            streamingMessages[key] = createMessageElement(msg);
+        }
+        streamingMessages[key].textContent += msg.delta;
+        conversationDiv.scrollTop = conversationDiv.scrollHeight;
+    }
+
+    function updateConversation(msg) {
+        const key = messageKey(msg);
+        const messageEl = streamingMessages[key] || createMessageElement(msg);
+        delete streamingMessages[key];
+
+        // The completed turn carries the final text, replacing any streamed deltas
+        messageEl.textContent = msg.content;
+        conversationDiv.scrollTop = conversationDiv.scrollHeight;
+    }
+
+    function displayConfidence(check) {
+        const note = document.createElement('div');
+        note.className = 'confidence-note';
+        if (check.confidence === null) {
+            note.textContent = `After ${check.turn} answers: no confidence estimate, continuing`;
+        } else {
+            const leaning = check.leaning === 'ai' ? 'AI' : check.leaning === 'human' ? 'human' : 'undecided';
+            note.textContent = `After ${check.turn} answers: ${Math.round(check.confidence * 100)}% sure (${leaning})` +
+                (check.stop ? ' — moving to the verdict' : '');
+        }
+        conversationDiv.appendChild(note);
         conversationDiv.scrollTop = conversationDiv.scrollHeight;
     }
 
     function displayJudgment(judgment) {
-        judgmentArea.innerHTML = `<h3>Final Judgment</h3><p>${judgment}</p>`;
-        if (judgment.toLowerCase().includes('final verdict: ai')) {
+        const confidence = judgment.confidence !== null ? ` (${Math.round(judgment.confidence * 100)}% confident)` : '';
+        let panel = '';
+        if (judgment.panel) {
+            const votes = judgment.panel.map(j => `${j.judge_model}${j.sample ? ` #${j.sample + 1}` : ''}: ${j.verdict || 'failed'}`);
+            panel = `<p class="judge-panel">Judge panel (${judgment.aggregation}): ${votes.join(' · ')}</p>`;
+        }
+        judgmentArea.innerHTML = `<h3>Final Judgment</h3><p>${judgment.reasoning}</p>` +
+            `<p><strong>Final Verdict: ${judgment.verdict}</strong>${confidence}</p>${panel}`;
+        if (judgment.verdict === 'AI') {
             triggerCelebration();
         }
     }